@@ -5,6 +5,8 @@ from .utils import get_or_create_game, get_or_create_genre, fetch_steam_library
 from django.db import transaction, IntegrityError
 import logging
 from django.utils.timezone import now
+from pickmate.tasks import refresh_user_recommendations
+from chatmate.user_context import invalidate_user_context
 
 logger = logging.getLogger(__name__)
 
@@ -68,6 +70,10 @@ def fetch_and_save_user_games(user_id):
 
     user.is_syncing = False
     user.save()
+
+    # 변경된 라이브러리로 해당 사용자의 추천 결과만 다시 계산하고 챗봇 컨텍스트 캐시 무효화
+    refresh_user_recommendations.delay(user.id)
+    invalidate_user_context(user.id)
     return {"status": "success", "message": "라이브러리 저장 완료"}
 
 
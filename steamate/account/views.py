@@ -29,6 +29,8 @@ import logging
 from django.db.utils import IntegrityError
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .tasks import send_verification_email, fetch_and_save_user_games
+from pickmate.tasks import refresh_user_recommendations
+from chatmate.user_context import invalidate_user_context
 
 load_dotenv()
 STEAM_API_KEY = os.getenv("STEAM_API_KEY")
@@ -462,6 +464,10 @@ class MyPageAPIView(APIView):
         if preferred_tag_objs:
             UserPreferredTag.objects.bulk_create(preferred_tag_objs)
         
+        # 선호 정보가 바뀐 사용자의 추천 결과만 다시 계산하고 챗봇 컨텍스트 캐시 무효화
+        refresh_user_recommendations.delay(user.id)
+        invalidate_user_context(user.id)
+        
         return Response({
             "message": "선호 게임/장르 수정 완료",
                 "preferred_games": preferred_game_titles,
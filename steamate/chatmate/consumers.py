@@ -1,16 +1,25 @@
+import asyncio
 import json
+import uuid
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.shortcuts import get_object_or_404
-from .models import ChatSession, ChatMessage
+from .models import ChatMessage
 from .serializers import ChatMessageSerializer
-from .utils_v5 import get_chatbot_message
-from .history import delete_session_history, delete_messages_from_history
+from .history import bring_session_history, delete_messages_from_history
+from .streaming import ResponseStreamer, negotiate_protocol
+from .user_context import load_chat_context
+from .scheduler import SessionGenerations, SchedulerBusy
+from .generation import produce_response
+from .stream_buffer import replay_stream, DONE, CANCELLED, BUSY
+from config.settings import CHAT_CONCURRENCY, CHAT_GENERATION, CHAT_STREAM_BUFFER
 
-@database_sync_to_async
-def get_session_and_user(session_id):
-    session = get_object_or_404(ChatSession, pk=session_id)
-    return session, session.user_id
+def prepare_connection(session_id, user):
+    session, context = load_chat_context(session_id, user)
+    if session is not None:
+        # 다른 워커에서 재연결된 경우에도 대화 맥락이 이어지도록 공유 저장소(없으면 DB)에서 불러옴
+        bring_session_history(session_id)
+    return session, context
 
 class ChatConsumer(AsyncWebsocketConsumer):
     """
@@ -19,20 +28,28 @@ class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         """웹소켓 연결 시 호출되는 메서드"""
         self.session_id = self.scope['url_route']['kwargs']['session_id']
-        self.session, session_user = await get_session_and_user(self.session_id)
         self.user = self.scope['user']
+        self.protocol = negotiate_protocol(self.scope)
+        self.generations = SessionGenerations(CHAT_CONCURRENCY['max_in_flight_per_session'])
+        self.message_count = 0
+        self.disconnected = False
+        self.remote_generations = {}
+        self.group_name = f"chat_session_{self.session_id}"
         
-        # 사용자 정보 가져오기
-        self.tags = await database_sync_to_async(lambda: [tags.tag.name for tags in self.user.preferred_tags.all()])()
-        library_games = await database_sync_to_async(lambda: self.user.library_games.all())()
-        self.appid = await database_sync_to_async(lambda: [games.game.appid for games in library_games])()
-        self.game = await database_sync_to_async(lambda: [games.game.title + ' (' + '플레이 시간: ' + str(games.playtime) + '분)' + ' ('+ 'appid: ' + str(games.game.appid) + ')' for games in library_games.order_by('-playtime')])()
-        self.preferred_games = await database_sync_to_async(lambda: [preferred_games.game.title for preferred_games in self.user.preferred_games.all()])()
-        
-        # 권한 확인 - 세션 소유자만 접근 가능
-        if self.user.is_anonymous or session_user.id != self.user.id:
+        # 권한 확인(세션 소유자만 접근 가능) 후 사용자 정보와 대화 내역을 한 번의 동기 호출로 불러옴
+        self.session, context = await database_sync_to_async(prepare_connection)(self.session_id, self.user)
+        if self.session is None:
             await self.close(code=4003)
             return
+        self.tags = context['tags']
+        self.appid = context['appid']
+        self.game = context['game']
+        self.preferred_games = context['preferred_games']
+        
+        # 채널 레이어 모드에서는 별도 생성 워커가 보내는 응답 조각을 받기 위해 세션 그룹에 참여
+        self.joined_group = CHAT_GENERATION['backend'] == 'channels' and self.channel_layer is not None
+        if self.joined_group:
+            await self.channel_layer.group_add(self.group_name, self.channel_name)
         
         # 웹소켓 연결 수락
         await self.accept()
@@ -40,7 +57,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
         # 연결 확인 메시지 전송
         await self.send(text_data=json.dumps({
             'status': 'connected',
-            'message': '웹소켓 연결이 설정되었습니다.'
+            'message': '웹소켓 연결이 설정되었습니다.',
+            'protocol': self.protocol
         }))
     
     async def receive(self, text_data):
@@ -54,68 +72,219 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'message': 'Connection is alive!'
             }))
             return
-            
+        
+        # 응답 생성은 별도 작업으로 실행하여 생성 중에도 다음 메시지를 받을 수 있게 함
+        # 같은 메시지 수정이나 세션당 한도를 넘는 새 메시지가 오면 이전 생성은 취소됨
+        
+        # 연결이 끊겼던 클라이언트의 응답 이어받기 (마지막으로 받은 seq 이후부터)
+        if data.get('type') == 'resume':
+            generation_id = data.get('generation_id')
+            try:
+                last_seq = int(data.get('last_seq', 0))
+            except (TypeError, ValueError):
+                last_seq = -1
+            if last_seq < 0:
+                await self.send(text_data=json.dumps({
+                    'status': 'error',
+                    'generation_id': generation_id,
+                    'message': 'last_seq는 0 이상의 정수여야 합니다.'
+                }))
+                return
+            self.generations.start(('resume', generation_id), self.resume_generation(generation_id, last_seq))
+            return
+        
         # 메시지 수정 처리
         if data.get('type') == 'message_modify':
-            await self.message_modify(text_data)
+            self.generations.start(('modify', data.get('message_id')), self.message_modify(text_data))
             return
             
         # 일반 메시지 처리
         if 'message' in data:
-            user_message = data['message']
-            
-            # 처리 시작 알림
+            self.message_count += 1
+            self.generations.start(('message', self.message_count), self.message_create(data['message']))
+    
+    async def stream_response(self, generation_id, user_message, message_id=None):
+        """
+        챗봇 응답을 스트리밍하고 최종 프레임(메시지 ID 포함) 전송
+        CHAT_GENERATION["backend"]가 "local"이면 이 프로세스에서 생성하고, "channels"이면 채널 레이어를 통해 별도 생성 워커에 맡김
+        어느 쪽이든 생성된 조각은 generation_id로 스트림 버퍼에 기록되고 응답은 생성하는 쪽에서 DB에 저장
+        """
+        # 스트리밍 응답 처리 (프로토콜 1은 전체 응답, 2는 새로 생성된 부분만 전송)
+        streamer = ResponseStreamer(self.send, self.protocol)
+        try:
+            if CHAT_GENERATION['backend'] == 'channels':
+                message_id = await self.remote_stream(generation_id, user_message, streamer, message_id)
+            else:
+                message_id = await produce_response(
+                    generation_id, self.session_id, user_message, self.tags, self.appid, self.preferred_games,
+                    on_chunk=streamer.push, message_id=message_id,
+                )
+        except asyncio.CancelledError:
+            streamer.discard()
+            raise
+        await streamer.close()
+        
+        # 최종 응답 전송 (메시지 ID 포함)
+        await streamer.send_final(message_id=message_id, generation_id=generation_id)
+    
+    async def remote_stream(self, generation_id, user_message, streamer, message_id=None):
+        """
+        채널 레이어로 생성 작업을 생성 워커에 보내고, 워커가 세션 그룹으로 보내는 조각을 streamer로 전달 (저장된 메시지 ID 반환)
+        생성이 취소되거나 시간 안에 끝나지 않으면 워커에도 취소 요청을 보냄 (워커가 아직 시작하지 않은 작업도 포함)
+        (연결이 끊겨서 정리되는 경우에는 재연결 후 이어받을 수 있도록 워커의 생성을 그대로 둠)
+        """
+        done = asyncio.get_running_loop().create_future()
+        self.remote_generations[generation_id] = {'streamer': streamer, 'done': done, 'worker_channel': None}
+        try:
+            await self.channel_layer.send(CHAT_GENERATION['channel'], {
+                'type': 'generate',
+                'generation_id': generation_id,
+                'group': self.group_name,
+                'session_id': self.session_id,
+                'user_message': user_message,
+                'tags': self.tags,
+                'appid': self.appid,
+                'preferred_games': self.preferred_games,
+                'message_id': message_id,
+            })
+            return await asyncio.wait_for(done, CHAT_GENERATION['timeout'])
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            worker_channel = self.remote_generations[generation_id]['worker_channel']
+            keep_running = self.disconnected and CHAT_STREAM_BUFFER['enabled']
+            if not keep_running:
+                # 아직 generation.started를 받지 못했으면 작업 채널로 보내 작업을 받은 워커가 시작하지 않게 함
+                await self.channel_layer.send(worker_channel or CHAT_GENERATION['channel'], {
+                    'type': 'generation.cancel',
+                    'generation_id': generation_id,
+                    'broadcast': worker_channel is None,
+                })
+            raise
+        finally:
+            self.remote_generations.pop(generation_id, None)
+    
+    def finish_remote_generation(self, event, exception=None):
+        generation = self.remote_generations.get(event['generation_id'])
+        if generation is None or generation['done'].done():
+            return
+        if exception is None:
+            generation['done'].set_result(event.get('message_id'))
+        else:
+            generation['done'].set_exception(exception)
+    
+    # 생성 워커가 세션 그룹으로 보내는 이벤트 처리 (다른 연결이 요청한 generation_id는 무시)
+    async def generation_started(self, event):
+        generation = self.remote_generations.get(event['generation_id'])
+        if generation is not None:
+            generation['worker_channel'] = event['worker_channel']
+    
+    async def generation_chunk(self, event):
+        generation = self.remote_generations.get(event['generation_id'])
+        if generation is not None:
+            await generation['streamer'].push(event['text'])
+    
+    async def generation_done(self, event):
+        self.finish_remote_generation(event)
+    
+    async def generation_busy(self, event):
+        self.finish_remote_generation(event, SchedulerBusy())
+    
+    async def generation_error(self, event):
+        self.finish_remote_generation(event, Exception(event['message']))
+    
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        # 연결이 끊긴 뒤에도 생성은 계속될 수 있으므로(재연결 시 이어받기) 보낼 곳이 없는 프레임은 버림
+        if self.disconnected:
+            return
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+    
+    async def resume_generation(self, generation_id, last_seq):
+        """
+        재연결한 클라이언트에게 스트림 버퍼에 남아 있는 응답을 이어서 전송 (LLM 파이프라인은 다시 실행하지 않음)
+        생성이 아직 진행 중이면 끝날 때까지 버퍼를 따라가며 전송
+        """
+        try:
+            status = await replay_stream(
+                self.send, generation_id, self.session_id, last_seq, self.protocol,
+                timeout=CHAT_GENERATION['timeout'],
+            )
+        except Exception as e:
             await self.send(text_data=json.dumps({
-                'status': 'processing',
-                'message': '메시지 처리 중입니다.'
+                'status': 'error',
+                'message': f'응답 이어받기 중 오류가 발생했습니다: {str(e)}'
+            }))
+            return
+        
+        if status is None:
+            await self.send(text_data=json.dumps({
+                'status': 'expired',
+                'generation_id': generation_id,
+                'message': '이어받을 응답이 없습니다. 메시지를 다시 보내 주세요.'
+            }))
+        elif status == CANCELLED:
+            await self.send_cancelled()
+        elif status == BUSY:
+            await self.send_busy()
+        elif status != DONE:
+            await self.send(text_data=json.dumps({
+                'status': 'error',
+                'generation_id': generation_id,
+                'message': '응답 생성 중 오류가 발생했습니다. 메시지를 다시 보내 주세요.'
+            }))
+    
+    async def send_busy(self):
+        await self.send(text_data=json.dumps({
+            'status': 'busy',
+            'message': '요청이 많아 메시지를 처리할 수 없습니다. 잠시 후 다시 시도해 주세요.'
+        }))
+    
+    async def send_cancelled(self):
+        await self.send(text_data=json.dumps({
+            'status': 'cancelled',
+            'message': '새 메시지가 도착하여 이전 응답 생성을 중단했습니다.'
+        }))
+    
+    async def message_create(self, user_message):
+        """새 메시지에 대한 응답 생성"""
+        generation_id = uuid.uuid4().hex
+        
+        # 처리 시작 알림 (연결이 끊기면 generation_id와 마지막 seq로 이어받을 수 있음)
+        await self.send(text_data=json.dumps({
+            'status': 'processing',
+            'message': '메시지 처리 중입니다.',
+            'generation_id': generation_id
+        }))
+        
+        try:
+            # 메시지 유효성 검사
+            serializer = ChatMessageSerializer(data={'user_message': user_message})
+            if serializer.is_valid(raise_exception=True):
+                await self.stream_response(generation_id, user_message)
+        
+        except SchedulerBusy:
+            await self.send_busy()
+        except asyncio.CancelledError:
+            await self.send_cancelled()
+            raise
+        except Exception as e:
+            # 오류 처리
+            await self.send(text_data=json.dumps({
+                'status': 'error',
+                'message': f'메시지 처리 중 오류가 발생했습니다: {str(e)}'
             }))
-            
-            try:
-                # 메시지 유효성 검사
-                serializer = ChatMessageSerializer(data={'user_message': user_message})
-                if serializer.is_valid(raise_exception=True):
-                    # 스트리밍 응답 처리
-                    aggregated_response = ""
-                    async for chunk in get_chatbot_message(user_message, self.session_id, self.tags, self.appid, self.preferred_games):
-                        aggregated_response += chunk
-                        # 각 청크마다 스트리밍 응답 전송
-                        await self.send(text_data=json.dumps({
-                            'response': aggregated_response,
-                            'is_streaming': True
-                        }))
-                    # DB에 메시지 저장
-                    await database_sync_to_async(serializer.save)(
-                        session_id=self.session,
-                        chatbot_message=aggregated_response
-                    )                    
-                    
-                    # 최종 응답 전송 및 DB 저장
-                    await self.send(text_data=json.dumps({
-                        'response': aggregated_response,
-                        'is_streaming': False,
-                        'message_id': serializer.data['id']
-                    }))
-                    
-                    
-                
-            except Exception as e:
-                # 오류 처리
-                await self.send(text_data=json.dumps({
-                    'status': 'error',
-                    'message': f'메시지 처리 중 오류가 발생했습니다: {str(e)}'
-                }))
         
     async def message_modify(self, text_data):
         """메시지 수정 시 호출되는 메서드"""
         data = json.loads(text_data)
         message_id = data['message_id']
         new_message = data['new_message']
+        generation_id = uuid.uuid4().hex
         
         try:
             # 처리 시작 알림
             await self.send(text_data=json.dumps({
                 'status': 'processing',
-                'message': '메시지 수정 중입니다.'
+                'message': '메시지 수정 중입니다.',
+                'generation_id': generation_id
             }))
             
             # DB에서 메시지 가져오기
@@ -129,27 +298,13 @@ class ChatConsumer(AsyncWebsocketConsumer):
             serializer = ChatMessageSerializer(message, data={'user_message': new_message})
             if serializer.is_valid(raise_exception=True):
                 # 새로운 챗봇 응답 생성 및 스트리밍
-                aggregated_response = ""
-                async for chunk in get_chatbot_message(new_message, self.session_id, self.tags, self.appid, self.preferred_games):
-                    aggregated_response += chunk
-                    await self.send(text_data=json.dumps({
-                        'response': aggregated_response,
-                        'is_streaming': True
-                    }))
-                
-                # DB 업데이트
-                updated_message = await database_sync_to_async(serializer.save)(
-                    session_id=self.session,
-                    chatbot_message=aggregated_response
-                )
-                
-                # 최종 응답 전송 (메시지 ID 포함)
-                await self.send(text_data=json.dumps({
-                    'response': aggregated_response,
-                    'is_streaming': False,
-                    'message_id': updated_message.id
-                }))
+                await self.stream_response(generation_id, new_message, message_id=message.id)
             
+        except SchedulerBusy:
+            await self.send_busy()
+        except asyncio.CancelledError:
+            await self.send_cancelled()
+            raise
         except Exception as e:
             await self.send(text_data=json.dumps({
                 'status': 'error',
@@ -158,10 +313,13 @@ class ChatConsumer(AsyncWebsocketConsumer):
     
     async def disconnect(self, close_code):
         """웹소켓 연결 종료 시 호출되는 메서드"""
-        try:
-            # 세션 내역 메모리에서 삭제 코드가 필요한 경우 여기에 작성
-            await database_sync_to_async(delete_session_history)(self.session_id)
-        except Exception as e:
-            print(f"세션 내역 삭제 중 오류가 발생했습니다: {str(e)}")
-    
-    
\ No newline at end of file
+        self.disconnected = True
+        # 스트림 버퍼를 쓰면 진행 중인 생성은 끝까지 실행하여 재연결한 클라이언트가 이어받게 하고,
+        # 쓰지 않으면 받을 클라이언트가 없으므로 취소하여 LLM 호출을 아낌
+        # (채널 레이어 모드에서 이 연결의 작업은 워커 응답을 기다리는 것뿐이므로 정리하고 워커의 생성은 그대로 둠)
+        if not CHAT_STREAM_BUFFER['enabled'] or CHAT_GENERATION['backend'] == 'channels':
+            self.generations.cancel_all()
+        if getattr(self, 'joined_group', False):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        # 대화 내역은 워커 간 공유 저장소에 있고 TTL로 만료되므로 삭제하지 않음
+        # (곧바로 다른 워커로 재연결된 세션의 맥락을 지우지 않기 위함)
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import numpy as np
+from cachetools import LRUCache
+from langchain_core.embeddings import Embeddings
+from .tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    텍스트 내용의 해시를 키로 임베딩 결과를 보관하는 캐시 래퍼
+    프로세스 로컬 LRU를 먼저 보고, redis_url이 있으면 워커 간에 공유되는 Redis 계층(float32 바이트)을 조회
+    같은 텍스트는 질의/문서 구분 없이 같은 벡터로 취급 (OpenAI 임베딩 모델은 두 호출 결과가 동일)
+    redis_client를 직접 넘기면 redis_url 대신 사용 (fakeredis로 테스트 가능)
+    """
+    redis_prefix = "chatmate:embedding:"
+
+    def __init__(self, underlying, namespace, maxsize=5000, redis_url=None, redis_ttl=604800,
+                 price_per_million_tokens=0.02, redis_client=None):
+        self.underlying = underlying
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.redis_ttl = redis_ttl
+        self.price_per_million_tokens = price_per_million_tokens
+        self._local = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._redis_url = redis_url
+        self._redis = redis_client
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+        self.saved_tokens = 0
+
+    @property
+    def redis(self):
+        if self._redis is None and self._redis_url:
+            import redis
+            self._redis = redis.Redis.from_url(self._redis_url)
+        return self._redis
+
+    def _key(self, text):
+        # 모델이 바뀌면 다른 벡터가 나오므로 namespace(모델 이름)를 키에 포함
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def _get_local(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._local.get(key)
+                if vector is not None:
+                    found[key] = vector
+        return found
+
+    def _store_local(self, vectors):
+        with self._lock:
+            for key, vector in vectors.items():
+                self._local[key] = vector
+
+    def _redis_get_many(self, keys):
+        if not self.redis or not keys:
+            return {}
+        try:
+            values = self.redis.mget([self.redis_prefix + key for key in keys])
+        except Exception as e:
+            logger.warning(f"임베딩 Redis 캐시 조회 실패: {e}")
+            return {}
+        return {
+            key: np.frombuffer(value, dtype=np.float32)
+            for key, value in zip(keys, values) if value is not None
+        }
+
+    def _redis_set_many(self, vectors):
+        if not self.redis or not vectors:
+            return
+        try:
+            pipeline = self.redis.pipeline()
+            for key, vector in vectors.items():
+                pipeline.setex(self.redis_prefix + key, self.redis_ttl, vector.tobytes())
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"임베딩 Redis 캐시 저장 실패: {e}")
+
+    def _lookup(self, texts):
+        """
+        캐시에서 찾은 벡터와, 아직 없는 (key, text) 목록(중복 제거)을 반환
+        """
+        keys = [self._key(text) for text in texts]
+        found = self._get_local(keys)
+        local_hit_keys = set(found)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        from_redis = self._redis_get_many(list(missing))
+        if from_redis:
+            self._store_local(from_redis)
+            found.update(from_redis)
+
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in local_hit_keys:
+                    self.hits += 1
+                elif key in from_redis:
+                    self.redis_hits += 1
+                else:
+                    continue
+                self.saved_tokens += count_tokens(text)
+
+        missing = [(key, text) for key, text in missing.items() if key not in from_redis]
+        return keys, found, missing
+
+    def _record_misses(self, missing, embedded, elapsed):
+        vectors = {
+            key: np.asarray(vector, dtype=np.float32)
+            for (key, _), vector in zip(missing, embedded)
+        }
+        with self._lock:
+            self.misses += len(missing)
+            self.miss_seconds += elapsed
+        self._store_local(vectors)
+        return vectors
+
+    def embed_documents(self, texts):
+        keys, found, missing = self._lookup(texts)
+        if missing:
+            start = time.perf_counter()
+            embedded = self.underlying.embed_documents([text for _, text in missing])
+            vectors = self._record_misses(missing, embedded, time.perf_counter() - start)
+            self._redis_set_many(vectors)
+            found.update(vectors)
+        # 캐시 적중 여부와 관계없이 같은 float32 값을 반환하도록 저장된 벡터를 사용
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        # Redis 조회/저장은 동기 클라이언트이므로 이벤트 루프를 막지 않도록 스레드에서 실행
+        keys, found, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            start = time.perf_counter()
+            embedded = await self.underlying.aembed_documents([text for _, text in missing])
+            vectors = self._record_misses(missing, embedded, time.perf_counter() - start)
+            await asyncio.to_thread(self._redis_set_many, vectors)
+            found.update(vectors)
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        """
+        적중률과 캐시로 절약한 API 호출 시간/비용 추정치
+        절약 시간은 미스 한 건의 평균 임베딩 시간에 적중 수를 곱한 값
+        """
+        lookups = self.hits + self.redis_hits + self.misses
+        avg_miss_seconds = self.miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "size": len(self._local),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.redis_hits) / lookups if lookups else 0.0,
+            "avg_miss_ms": avg_miss_seconds * 1000,
+            "saved_seconds": avg_miss_seconds * (self.hits + self.redis_hits),
+            "saved_tokens": self.saved_tokens,
+            "saved_usd": self.saved_tokens / 1_000_000 * self.price_per_million_tokens,
+        }
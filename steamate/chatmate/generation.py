@@ -0,0 +1,46 @@
+import asyncio
+from channels.db import database_sync_to_async
+from .models import ChatMessage
+from .serializers import ChatMessageSerializer
+from .utils_v5 import get_chatbot_message
+from .scheduler import SchedulerBusy, generation_scheduler
+from .stream_buffer import StreamRecorder, DONE, CANCELLED, BUSY, ERROR
+
+
+def save_chat_message(session_id, user_message, chatbot_message, message_id=None):
+    """
+    생성된 응답을 DB에 저장하고 메시지 ID 반환 (message_id가 있으면 해당 메시지를 수정)
+    """
+    instance = ChatMessage.objects.get(pk=message_id) if message_id is not None else None
+    serializer = ChatMessageSerializer(instance, data={'user_message': user_message})
+    serializer.is_valid(raise_exception=True)
+    # 세션은 pk만 알고 있으므로 FK 컬럼(session_id_id)에 바로 저장
+    return serializer.save(session_id_id=session_id, chatbot_message=chatbot_message).id
+
+
+async def produce_response(generation_id, session_id, user_message, tags, appid, preferred_games, on_chunk, message_id=None):
+    """
+    응답 하나를 생성하여 조각마다 on_chunk를 호출하고, 전체 응답을 DB에 저장한 뒤 메시지 ID 반환
+    생성된 조각과 최종 상태는 generation_id로 스트림 버퍼에 기록되므로, 클라이언트 연결이 끊겨도
+    생성은 끝까지 진행되고 재연결한 클라이언트가 이어서 받을 수 있음
+    (웹소켓 서버에서 직접 생성할 때와 채널 레이어 생성 워커에서 공통으로 사용)
+    """
+    recorder = StreamRecorder(generation_id, session_id)
+    await recorder.start()
+    try:
+        async with generation_scheduler.slot():
+            async for chunk in get_chatbot_message(user_message, session_id, tags, appid, preferred_games):
+                await recorder.add(chunk)
+                await on_chunk(chunk)
+        message_id = await database_sync_to_async(save_chat_message)(session_id, user_message, recorder.text, message_id)
+    except asyncio.CancelledError:
+        await recorder.close(CANCELLED)
+        raise
+    except SchedulerBusy:
+        await recorder.close(BUSY)
+        raise
+    except Exception as e:
+        await recorder.close(ERROR, message=str(e))
+        raise
+    await recorder.close(DONE, message_id=message_id)
+    return message_id
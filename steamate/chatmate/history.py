@@ -1,57 +1,312 @@
+import hashlib
+import json
+import logging
 from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import message_to_dict, messages_from_dict, SystemMessage
 from langchain.schema import HumanMessage, AIMessage
 from cachetools import TTLCache
+from config.settings import CHAT_HISTORY, CHAT_HISTORY_WINDOW
 from .models import ChatMessage
+from .tokens import count_message_tokens
 
-# store를 TTLCache로 변경 (maxsize=1000개, ttl=1800초(30분))
-store = TTLCache(maxsize=1000, ttl=1800)
+logger = logging.getLogger(__name__)
 
-# RDB에 있는 대화 내역을 메모리에 저장하는 함수
+
+class RedisChatHistory(BaseChatMessageHistory):
+    """
+    세션 대화 내역을 Redis 리스트 하나에 저장하는 히스토리
+    추가는 RPUSH + LTRIM으로 O(1)이며 최근 max_messages개만 유지, 마지막 사용 후 ttl초가 지나면 만료
+    모든 워커가 같은 키를 보므로 재연결이 다른 프로세스로 가도 대화 맥락이 유지됨
+    """
+    def __init__(self, client, key, ttl, max_messages):
+        self.client = client
+        self.key = key
+        self.ttl = ttl
+        self.max_messages = max_messages
+
+    @property
+    def messages(self):
+        values = self.client.lrange(self.key, 0, -1)
+        return messages_from_dict([json.loads(value) for value in values])
+
+    def window(self, count):
+        """
+        최근 count개의 메시지만 조회
+        """
+        values = self.client.lrange(self.key, -count, -1) if count > 0 else []
+        return messages_from_dict([json.loads(value) for value in values])
+
+    def add_messages(self, messages):
+        if not messages:
+            return
+        pipeline = self.client.pipeline()
+        pipeline.rpush(self.key, *[json.dumps(message_to_dict(message)) for message in messages])
+        pipeline.ltrim(self.key, -self.max_messages, -1)
+        pipeline.expire(self.key, self.ttl)
+        pipeline.execute()
+
+    def update(self, func):
+        """
+        func(messages)가 반환한 목록으로 내역을 교체 (None이면 변경 없음)
+        WATCH 트랜잭션으로 실행하여 다른 워커의 추가와 겹치면 다시 읽어서 재시도
+        """
+        def update(pipeline):
+            values = pipeline.lrange(self.key, 0, -1)
+            messages = func(messages_from_dict([json.loads(value) for value in values]))
+            if messages is None:
+                return False
+            pipeline.multi()
+            pipeline.delete(self.key)
+            if messages:
+                pipeline.rpush(self.key, *[json.dumps(message_to_dict(message)) for message in messages[-self.max_messages:]])
+                pipeline.expire(self.key, self.ttl)
+            return True
+
+        return self.client.transaction(update, self.key, value_from_callable=True)
+
+    def clear(self):
+        self.client.delete(self.key)
+
+
+class RedisHistoryStore:
+    """
+    세션별 RedisChatHistory를 만들어 주는 저장소 (client를 직접 넘기면 fakeredis로 테스트 가능)
+    """
+    prefix = "chatmate:history:"
+    summary_prefix = "chatmate:history_summary:"
+
+    def __init__(self, client=None, redis_url=None, ttl=1800, max_messages=40):
+        self._client = client
+        self._redis_url = redis_url
+        self.ttl = ttl
+        self.max_messages = max_messages
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self._redis_url)
+        return self._client
+
+    def get(self, session_id):
+        return RedisChatHistory(self.client, f"{self.prefix}{session_id}", self.ttl, self.max_messages)
+
+    def exists(self, session_id):
+        return bool(self.client.exists(f"{self.prefix}{session_id}"))
+
+    def delete(self, session_id):
+        self.client.delete(f"{self.prefix}{session_id}", f"{self.summary_prefix}{session_id}")
+
+    def get_summary(self, session_id):
+        value = self.client.get(f"{self.summary_prefix}{session_id}")
+        return json.loads(value) if value else None
+
+    def set_summary(self, session_id, summary):
+        self.client.setex(f"{self.summary_prefix}{session_id}", self.ttl, json.dumps(summary))
+
+
+class BoundedChatMessageHistory(ChatMessageHistory):
+    """
+    최근 max_messages개만 유지하는 메모리 히스토리
+    """
+    max_messages: int = 40
+
+    def add_message(self, message):
+        super().add_message(message)
+        del self.messages[:-self.max_messages]
+
+    def window(self, count):
+        return self.messages[-count:] if count > 0 else []
+
+    def update(self, func):
+        messages = func(list(self.messages))
+        if messages is None:
+            return False
+        self.messages = messages[-self.max_messages:]
+        return True
+
+
+class MemoryHistoryStore:
+    """
+    프로세스 로컬 TTLCache 저장소 (단일 워커 개발 환경용)
+    """
+    def __init__(self, maxsize=1000, ttl=1800, max_messages=40):
+        self.store = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.summaries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.max_messages = max_messages
+
+    def get(self, session_id):
+        session_id = str(session_id)
+        if session_id not in self.store:
+            self.store[session_id] = BoundedChatMessageHistory(max_messages=self.max_messages)
+        return self.store[session_id]
+
+    def exists(self, session_id):
+        return str(session_id) in self.store
+
+    def delete(self, session_id):
+        self.store.pop(str(session_id), None)
+        self.summaries.pop(str(session_id), None)
+
+    def get_summary(self, session_id):
+        return self.summaries.get(str(session_id))
+
+    def set_summary(self, session_id, summary):
+        self.summaries[str(session_id)] = summary
+
+
+def build_history_store(options=None):
+    options = dict(CHAT_HISTORY if options is None else options)
+    backend = options.pop("backend", "redis")
+    if backend == "redis":
+        return RedisHistoryStore(**options)
+    if backend == "memory":
+        options.pop("redis_url", None)
+        return MemoryHistoryStore(**options)
+    raise ValueError(f"지원하지 않는 대화 내역 저장소입니다: {backend}")
+
+
+# 워커 간에 공유되는 대화 내역 저장소 (settings.CHAT_HISTORY로 선택)
+history_store = build_history_store()
+
+
+def select_history_window(messages, max_tokens, summary=None):
+    """
+    최근 메시지부터 토큰 예산(max_tokens) 안에 들어가는 만큼만 남김
+    대화 내역 안의 SystemMessage와 이전 대화 요약은 항상 유지하고, 잘린 경계가 AI 응답으로 시작하지 않도록 정리
+    """
+    system_messages = [message for message in messages if isinstance(message, SystemMessage)]
+    if summary:
+        system_messages.insert(0, SystemMessage(content=f"이전 대화 요약: {summary}"))
+    budget = max_tokens - sum(count_message_tokens(message) for message in system_messages)
+
+    kept = []
+    for message in reversed(messages):
+        if isinstance(message, SystemMessage):
+            continue
+        tokens = count_message_tokens(message)
+        if tokens > budget:
+            break
+        budget -= tokens
+        kept.append(message)
+    kept.reverse()
+
+    while kept and not isinstance(kept[0], HumanMessage):
+        kept.pop(0)
+    return system_messages + kept
+
+
+class WindowedChatHistory(BaseChatMessageHistory):
+    """
+    프롬프트에 넣을 대화 내역만 보여주는 히스토리 뷰
+    조회는 최근 max_turns 턴 중 토큰 예산 안의 메시지(+ 이전 대화 요약), 추가/삭제는 원래 히스토리에 위임
+    """
+    def __init__(self, session_id, history, max_tokens, max_turns):
+        self.session_id = session_id
+        self.history = history
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+
+    @property
+    def messages(self):
+        summary = history_store.get_summary(self.session_id)
+        return select_history_window(
+            self.history.window(self.max_turns * 2),
+            self.max_tokens,
+            summary["text"] if summary else None,
+        )
+
+    def add_messages(self, messages):
+        self.history.add_messages(messages)
+
+    def clear(self):
+        self.history.clear()
+
+
+# RDB에 있는 대화 내역을 히스토리 저장소에 불러오는 함수
 def bring_session_history(session_id):
     try:
-        # 세션이 없거나 만료되었으면 새로 생성
-        if session_id not in store:
-            history = ChatMessageHistory()
+        # 세션이 없거나 만료되었으면 DB에서 다시 채움
+        if not history_store.exists(session_id):
+            messages = []
             for message in ChatMessage.objects.filter(session_id=session_id).order_by('created_at')[:5]:
-                history.add_message(HumanMessage(content=message.user_message))
-                history.add_message(AIMessage(content=message.chatbot_message))
-            store[session_id] = history
-        return store[session_id]
+                messages.append(HumanMessage(content=message.user_message))
+                messages.append(AIMessage(content=message.chatbot_message))
+            history = history_store.get(session_id)
+            if messages:
+                history.add_messages(messages)
+            return history
+        return history_store.get(session_id)
     except Exception as e:
         print(f"Session {session_id} expired or error occurred: {e}")
         return None
 
+def remove_exchange(messages, user_message):
+    """
+    user_message와 같은 HumanMessage와 그 다음 AI 응답을 뺀 목록 반환 (없으면 None)
+    """
+    # HumanMessage의 content로 인덱스 찾기
+    for i, msg in enumerate(messages):
+        if (isinstance(msg, HumanMessage) and
+            msg.content == user_message):
+            # 해당 메시지와 다음 AI 메시지 삭제
+            return messages[:i] + messages[i+2:]
+    return None
+
 def delete_messages_from_history(session_id, user_message):
     """
     채팅 히스토리에서 특정 메시지와 그에 대한 AI 응답을 삭제합니다.
     """
     try:
-        session_history = store.get(session_id)
-        if not session_history:
+        if not history_store.exists(session_id):
             print(f"세션 {session_id}의 히스토리를 찾을 수 없습니다.")
             return False
-            
-        # HumanMessage의 content로 인덱스 찾기
-        for i, msg in enumerate(session_history.messages):
-            if (isinstance(msg, HumanMessage) and 
-                msg.content == user_message):
-                # 해당 메시지와 다음 AI 메시지 삭제
-                del session_history.messages[i:i+2]
-                return True
-                
-        return False
-        
+        session_history = history_store.get(session_id)
+        return session_history.update(lambda messages: remove_exchange(messages, user_message))
+
     except Exception as e:
         print(f"메시지 삭제 중 오류 발생: {e}")
         return False
-    
+
+def message_fingerprint(message):
+    return hashlib.sha1(f"{message.type}\0{message.content}".encode("utf-8")).hexdigest()
+
+def collect_unsummarized_messages(session_id):
+    """
+    프롬프트 창 밖으로 밀려났지만 아직 요약에 반영되지 않은 메시지와 기존 요약 텍스트 반환
+    요약에는 마지막으로 반영한 메시지의 fingerprint를 저장해 두고 그 이후 메시지만 골라냄
+    (해당 메시지가 저장소 상한으로 이미 잘려 나갔다면 남은 메시지는 모두 그 이후의 것)
+    """
+    messages = [message for message in history_store.get(session_id).messages if not isinstance(message, SystemMessage)]
+    summary = history_store.get_summary(session_id)
+    # WindowedChatHistory.messages와 같은 창을 쓰도록 요약이 차지하는 토큰도 예산에서 뺌
+    window = select_history_window(
+        messages[-CHAT_HISTORY_WINDOW["max_turns"] * 2:],
+        CHAT_HISTORY_WINDOW["max_tokens"],
+        summary["text"] if summary else None,
+    )
+    kept = sum(1 for message in window if not isinstance(message, SystemMessage))
+    dropped = messages[:len(messages) - kept]
+
+    if summary and summary.get("last"):
+        fingerprints = [message_fingerprint(message) for message in dropped]
+        if summary["last"] in fingerprints:
+            dropped = dropped[len(fingerprints) - fingerprints[::-1].index(summary["last"]):]
+    return (summary["text"] if summary else None), dropped
+
 # 세션 내역 가져오기
 def get_session_history(session_id):
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
+    return history_store.get(session_id)
 
-def delete_session_history(session_id):
-    if session_id in store:
-        del store[session_id]
+# 프롬프트용으로 토큰 예산에 맞춰 자른 세션 내역 가져오기
+def get_prompt_history(session_id):
+    return WindowedChatHistory(
+        session_id,
+        history_store.get(session_id),
+        max_tokens=CHAT_HISTORY_WINDOW["max_tokens"],
+        max_turns=CHAT_HISTORY_WINDOW["max_turns"],
+    )
 
+def delete_session_history(session_id):
+    history_store.delete(session_id)
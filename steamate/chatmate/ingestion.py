@@ -0,0 +1,385 @@
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from django.db import connection, transaction
+from langchain.schema import Document
+from .models import IngestionCheckpoint, EmbeddingManifest
+from .vector_index import EMBEDDING_TABLE, COLLECTION_NAME, get_collection_id, drop_ann_indexes, ensure_vector_indexes
+
+logger = logging.getLogger(__name__)
+
+GAMES_CSV_PATH = 'chatmate/data/games_v3.csv'
+
+
+def read_games_csv(path=GAMES_CSV_PATH):
+    return pd.read_csv(os.path.abspath(path), encoding="utf-8")
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(os.path.abspath(path), "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_documents(data):
+    """
+    iterrows 없이 열 단위 문자열 연산으로 "col: value | col: value" 형태의 문서를 생성
+    JSONB에 NaN을 넣을 수 없으므로 metadata의 결측값은 None으로 저장
+    appid가 없는 행은 건너뛰고, 결측값 때문에 float(570.0)로 읽힌 appid는 정수로 되돌림
+    """
+    appids = pd.to_numeric(data["appid"], errors="coerce")
+    if appids.isna().any():
+        logger.warning(f"appid가 없는 행 {int(appids.isna().sum())}개를 건너뜀")
+    data = data[appids.notna()].assign(appid=appids[appids.notna()].astype("Int64"))
+
+    content = None
+    for col in data.columns:
+        part = f"{col}: " + data[col].map(str)
+        content = part if content is None else content + " | " + part
+
+    metadata = data[["appid", "genres"]].astype(object).where(data[["appid", "genres"]].notna(), None)
+    return [
+        Document(page_content=page_content, metadata={"appid": appid, "genres": genres})
+        for page_content, appid, genres in zip(
+            content.tolist(), metadata["appid"].tolist(), metadata["genres"].tolist()
+        )
+    ]
+
+
+class RateLimiter:
+    """
+    period초 동안 최대 max_calls번만 호출되도록 막는 스레드 안전 제한기 (임베딩 API 요청 수 제한용)
+    """
+    def __init__(self, max_calls, period=60.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                wait = self._calls[0] + self.period - now
+            time.sleep(wait)
+
+
+def embed_batch(embeddings, texts, rate_limiter, retries=3):
+    """
+    한 배치를 임베딩 (요청 제한/일시 오류에 대비해 지수 백오프로 재시도)
+    """
+    for attempt in range(retries):
+        rate_limiter.acquire()
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            logger.warning(f"임베딩 배치 실패, 재시도 {attempt + 1}/{retries - 1}: {e}")
+            time.sleep(2 ** attempt)
+
+
+def vector_literal(vector):
+    return "[" + ",".join(str(float(value)) for value in vector) + "]"
+
+
+def copy_embeddings(cursor, collection_id, documents, vectors):
+    """
+    langchain_pg_embedding에 COPY로 한 번에 적재 (PGVector.add_documents의 행 단위 INSERT 대체)
+    uuid/custom_id는 langchain이 클라이언트에서 만드는 것과 같은 방식으로 생성
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for document, vector in zip(documents, vectors):
+        writer.writerow([
+            uuid.uuid4(),
+            collection_id,
+            vector_literal(vector),
+            document.page_content,
+            json.dumps(document.metadata, ensure_ascii=False),
+            uuid.uuid4(),
+        ])
+
+    sql = (
+        f"COPY {EMBEDDING_TABLE} (uuid, collection_id, embedding, document, cmetadata, custom_id) "
+        f"FROM STDIN WITH (FORMAT csv)"
+    )
+    raw_cursor = cursor.cursor
+    if hasattr(raw_cursor, "copy"):
+        # psycopg 3
+        with raw_cursor.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+    else:
+        # psycopg2
+        buffer.seek(0)
+        raw_cursor.copy_expert(sql, buffer)
+
+
+def content_hash(page_content, model_name):
+    """
+    임베딩 모델과 문서 내용의 해시 (둘 중 하나라도 바뀌면 다시 임베딩해야 함)
+    """
+    return hashlib.sha256(f"{model_name}\n{page_content}".encode("utf-8")).hexdigest()
+
+
+def save_manifest(documents, model_name):
+    """
+    적재한 문서의 appid별 내용 해시를 upsert
+    """
+    entries = {
+        int(document.metadata["appid"]): EmbeddingManifest(
+            appid=int(document.metadata["appid"]),
+            content_hash=content_hash(document.page_content, model_name),
+        )
+        for document in documents if document.metadata.get("appid") is not None
+    }
+    if entries:
+        EmbeddingManifest.objects.bulk_create(
+            entries.values(),
+            update_conflicts=True,
+            unique_fields=["appid"],
+            update_fields=["content_hash", "updated_at"],
+        )
+
+
+def delete_embeddings(cursor, collection_id, appids):
+    """
+    정수형 appid 컬럼 기준으로 컬렉션의 임베딩 삭제
+    """
+    cursor.execute(
+        f"DELETE FROM {EMBEDDING_TABLE} WHERE collection_id = %s AND appid = ANY(%s)",
+        [collection_id, list(appids)],
+    )
+
+
+def write_batch(collection_id, documents, vectors, model_name, checkpoint=None, rows_done=None, replace=False):
+    """
+    임베딩 적재, 게임 정보/내용 해시 저장, 진행 상황 갱신을 한 트랜잭션으로 처리 (중단되어도 중복 적재 없음)
+    replace=True이면 같은 appid의 기존 임베딩을 먼저 삭제 (증분 동기화)
+    """
+    from pickmate.utils import save_game_details
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            if replace:
+                delete_embeddings(cursor, collection_id, [int(document.metadata["appid"]) for document in documents])
+            copy_embeddings(cursor, collection_id, documents, vectors)
+        save_game_details(documents)
+        save_manifest(documents, model_name)
+        if checkpoint is not None:
+            checkpoint.rows_done = rows_done
+            checkpoint.save(update_fields=["rows_done", "updated_at"])
+
+
+def embed_and_write(documents, embeddings, write, batch_size, concurrency, max_calls_per_minute,
+                    offset=0, total=None, progress=None):
+    """
+    documents를 batch_size개씩 나누어 concurrency개의 임베딩 요청을 동시에 보내고,
+    완료된 배치는 순서대로 write(batch_end, batch, vectors)로 적재
+    progress(rows_done, total_rows, rows_per_sec)가 있으면 배치마다 호출
+    반환값: (적재한 행 수, 걸린 시간)
+    """
+    total = len(documents) if total is None else total
+    rate_limiter = RateLimiter(max_calls_per_minute)
+    start_time = time.perf_counter()
+    rows_written = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = deque()
+
+        def flush():
+            nonlocal rows_written
+            batch_end, batch, future = in_flight.popleft()
+            write(batch_end, batch, future.result())
+            rows_written += len(batch)
+            if progress:
+                elapsed = time.perf_counter() - start_time
+                progress(batch_end, total, rows_written / elapsed if elapsed else 0.0)
+
+        for batch_start in range(offset, len(documents), batch_size):
+            batch = documents[batch_start:batch_start + batch_size]
+            texts = [document.page_content for document in batch]
+            future = executor.submit(embed_batch, embeddings, texts, rate_limiter)
+            in_flight.append((batch_start + len(batch), batch, future))
+            # 메모리에 쌓이는 임베딩 결과를 제한하기 위해 앞선 배치부터 순서대로 적재
+            if len(in_flight) >= concurrency * 2:
+                flush()
+        while in_flight:
+            flush()
+
+    return rows_written, time.perf_counter() - start_time
+
+
+def prepare_checkpoint(collection_id, source_hash, restart):
+    """
+    이어서 적재할 checkpoint를 반환하고, 처음부터 적재해야 하면 컬렉션의 기존 행과 내용 해시를 삭제
+    """
+    checkpoint, _ = IngestionCheckpoint.objects.get_or_create(
+        name=COLLECTION_NAME, defaults={"source_hash": source_hash},
+    )
+    if restart or checkpoint.source_hash != source_hash:
+        checkpoint.source_hash = source_hash
+        checkpoint.rows_done = 0
+        checkpoint.completed = False
+        checkpoint.save()
+
+    if checkpoint.rows_done == 0 and not checkpoint.completed:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {EMBEDDING_TABLE} WHERE collection_id = %s", [collection_id])
+            drop_ann_indexes(cursor)
+        EmbeddingManifest.objects.all().delete()
+    return checkpoint
+
+
+def open_collection(embeddings):
+    """
+    테이블/컬렉션이 없으면 langchain이 생성하도록 한 번 연결한 뒤 컬렉션 uuid 반환
+    """
+    from .vectorstore import open_vectorstore
+
+    open_vectorstore(embeddings)
+    with connection.cursor() as cursor:
+        return get_collection_id(cursor)
+
+
+def resolve_embeddings(embeddings, model_name):
+    from .vectorstore import base_embeddings, EMBEDDING_MODEL
+
+    if embeddings is None:
+        return base_embeddings, EMBEDDING_MODEL
+    return embeddings, model_name or type(embeddings).__name__
+
+
+def finish_ingestion():
+    """
+    적재가 끝나면 정수형 appid 컬럼과 ANN/appid 인덱스 생성
+    실패하면 appid 컬럼이 없어 delete_embeddings와 appid 조회가 깨질 수 있으므로 오류 메시지를 반환하여 통계에 남김
+    """
+    try:
+        ensure_vector_indexes()
+    except Exception as e:
+        logger.exception("벡터 인덱스 생성 중 오류")
+        return str(e)
+    return None
+
+
+def run_ingestion(embeddings=None, model_name=None, csv_path=GAMES_CSV_PATH, batch_size=500, concurrency=4,
+                  max_calls_per_minute=500, restart=False, progress=None):
+    """
+    games CSV 전체를 적재하며 배치마다 checkpoint를 남김 (중단되면 이어서 적재)
+    embeddings를 넘기면 model_name(없으면 클래스 이름)을 내용 해시에 사용
+    반환값: 적재 통계 dict
+    """
+    embeddings, model_name = resolve_embeddings(embeddings, model_name)
+    collection_id = open_collection(embeddings)
+
+    documents = build_documents(read_games_csv(csv_path))
+    checkpoint = prepare_checkpoint(collection_id, file_hash(csv_path), restart)
+    total = len(documents)
+    resumed_from = checkpoint.rows_done
+
+    if checkpoint.completed:
+        return {"rows": 0, "total": total, "resumed_from": resumed_from, "seconds": 0.0, "rows_per_sec": 0.0,
+                "index_error": None}
+
+    def write(batch_end, batch, vectors):
+        write_batch(collection_id, batch, vectors, model_name, checkpoint=checkpoint, rows_done=batch_end)
+
+    rows_written, seconds = embed_and_write(
+        documents, embeddings, write, batch_size, concurrency, max_calls_per_minute,
+        offset=resumed_from, progress=progress,
+    )
+
+    checkpoint.completed = True
+    checkpoint.save(update_fields=["completed", "updated_at"])
+    index_error = finish_ingestion()
+
+    return {
+        "rows": rows_written,
+        "total": total,
+        "resumed_from": resumed_from,
+        "seconds": seconds,
+        "rows_per_sec": rows_written / seconds if seconds else 0.0,
+        "index_error": index_error,
+    }
+
+
+def run_incremental_sync(embeddings=None, model_name=None, csv_path=GAMES_CSV_PATH, batch_size=500, concurrency=4,
+                         max_calls_per_minute=500, dry_run=False, progress=None):
+    """
+    appid별 내용 해시를 비교하여 새로 추가되거나 바뀐 게임만 다시 임베딩하고, CSV에서 사라진 게임은 삭제
+    처리량이 카탈로그 크기가 아니라 변경된 게임 수에 비례
+    반환값: 동기화 통계 dict
+    """
+    embeddings, model_name = resolve_embeddings(embeddings, model_name)
+    collection_id = open_collection(embeddings)
+
+    source_hash = file_hash(csv_path)
+    all_documents = build_documents(read_games_csv(csv_path))
+
+    # 같은 appid가 여러 번 나오면 마지막 행을 사용
+    documents = {}
+    for document in all_documents:
+        if document.metadata.get("appid") is not None:
+            documents[int(document.metadata["appid"])] = document
+
+    manifest = dict(EmbeddingManifest.objects.values_list("appid", "content_hash"))
+    changed = [
+        document for appid, document in documents.items()
+        if manifest.get(appid) != content_hash(document.page_content, model_name)
+    ]
+    vanished = [appid for appid in manifest if appid not in documents]
+    stats = {
+        "total": len(documents),
+        "added": sum(1 for document in changed if int(document.metadata["appid"]) not in manifest),
+        "updated": sum(1 for document in changed if int(document.metadata["appid"]) in manifest),
+        "deleted": len(vanished),
+        "unchanged": len(documents) - len(changed),
+        "seconds": 0.0,
+        "rows_per_sec": 0.0,
+        "index_error": None,
+    }
+    if dry_run:
+        return stats
+
+    if vanished:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                delete_embeddings(cursor, collection_id, vanished)
+            EmbeddingManifest.objects.filter(appid__in=vanished).delete()
+
+    if changed:
+        def write(batch_end, batch, vectors):
+            write_batch(collection_id, batch, vectors, model_name, replace=True)
+
+        rows_written, seconds = embed_and_write(
+            changed, embeddings, write, batch_size, concurrency, max_calls_per_minute, progress=progress,
+        )
+        stats["seconds"] = seconds
+        stats["rows_per_sec"] = rows_written / seconds if seconds else 0.0
+
+    if changed or vanished:
+        stats["index_error"] = finish_ingestion()
+
+    # 동기화한 CSV로 전체 적재가 끝난 것으로 기록하여 다음 run_ingestion이 해시 불일치로 전체를 다시 적재하지 않도록 함
+    IngestionCheckpoint.objects.update_or_create(
+        name=COLLECTION_NAME,
+        defaults={"source_hash": source_hash, "rows_done": len(all_documents), "completed": True},
+    )
+    return stats
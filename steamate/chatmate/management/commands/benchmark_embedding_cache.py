@@ -0,0 +1,85 @@
+import asyncio
+import random
+import time
+from django.core.management.base import BaseCommand
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from chatmate.embedding_cache import CachedEmbeddings
+
+
+class SlowFakeEmbedding(DeterministicFakeEmbedding):
+    """
+    텍스트마다 항상 같은 벡터를 반환하고, 호출당 API 왕복 지연을 흉내 내는 가짜 임베딩 모델
+    """
+    latency: float = 0.2
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    async def aembed_documents(self, texts):
+        await asyncio.sleep(self.latency)
+        return super().embed_documents(texts)
+
+
+QUERIES = [
+    "추천해줘", "게임 추천해줘", "RPG", "액션", "전략", "시뮬레이션", "인디 게임",
+    "오픈월드 RPG 추천", "협동 멀티플레이 게임", "스토리가 좋은 게임", "공포 게임",
+    "로그라이크", "퍼즐 게임", "레이싱", "스포츠", "힐링 게임",
+]
+
+
+class Command(BaseCommand):
+    """
+    python manage.py benchmark_embedding_cache 명령어로
+    네트워크 없이 가짜 임베딩 모델에 반복되는 검색어를 보내 캐시 적중률과 절약 시간을 측정
+    """
+    help = "Measure query-embedding cache hit rate and saved latency with a deterministic fake model"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--queries-per-request", type=int, default=4)
+        parser.add_argument("--latency", type=float, default=0.05)
+        parser.add_argument("--unique-ratio", type=float, default=0.2, help="처음 보는 검색어가 섞이는 비율")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def make_workload(self, options):
+        rng = random.Random(options["seed"])
+        # 자주 쓰이는 검색어일수록 많이 등장하도록 순위 기반 가중치 사용
+        weights = [1 / (rank + 1) for rank in range(len(QUERIES))]
+        workload = []
+        for i in range(options["requests"]):
+            batch = []
+            for j in range(options["queries_per_request"]):
+                if rng.random() < options["unique_ratio"]:
+                    batch.append(f"새로운 검색어 {i}-{j}")
+                else:
+                    batch.append(rng.choices(QUERIES, weights)[0])
+            workload.append(batch)
+        return workload
+
+    def handle(self, *args, **options):
+        model = SlowFakeEmbedding(size=1536, latency=options["latency"])
+        cached = CachedEmbeddings(model, namespace="fake", maxsize=1000)
+        workload = self.make_workload(options)
+
+        start = time.perf_counter()
+        for batch in workload:
+            model.embed_documents(batch)
+        uncached_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for batch in workload:
+            vectors = cached.embed_documents(batch)
+        cached_seconds = time.perf_counter() - start
+
+        # 캐시된 벡터가 원래 모델 결과와 같은지(float32 오차 범위) 확인
+        expected = model.embed_documents(workload[-1])
+        max_error = max(abs(a - b) for va, vb in zip(vectors, expected) for a, b in zip(va, vb))
+
+        stats = cached.stats()
+        self.stdout.write(f"uncached: {uncached_seconds:.2f}s  cached: {cached_seconds:.2f}s")
+        self.stdout.write(
+            f"hit rate: {stats['hit_rate']:.1%}  hits: {stats['hits']}  misses: {stats['misses']}  "
+            f"saved: ~{stats['saved_seconds']:.2f}s, {stats['saved_tokens']} tokens (${stats['saved_usd']:.6f})"
+        )
+        self.stdout.write(f"max abs error vs model: {max_error:.2e}")
@@ -0,0 +1,55 @@
+import json
+import statistics
+import subprocess
+import sys
+from django.core.management.base import BaseCommand
+
+# 새 인터프리터에서 chatmate.utils_v5 import 시간과 벡터 스토어 준비 시간을 측정하는 스크립트
+STARTUP_SCRIPT = """
+import json, os, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+start = time.perf_counter()
+import chatmate.utils_v5
+imported = time.perf_counter() - start
+warm_up = None
+if {warm_up}:
+    from chatmate.vectorstore import warm_up_vectorstore
+    start = time.perf_counter()
+    warm_up_vectorstore()
+    warm_up = time.perf_counter() - start
+print(json.dumps({{"import": imported, "warm_up": warm_up}}))
+"""
+
+
+class Command(BaseCommand):
+    """
+    python manage.py benchmark_startup 명령어로 워커가 chatmate.utils_v5를 import하는 데 걸리는 시간 측정
+    (이전 커밋에서 같은 명령어를 실행하면 import 시점 벡터 스토어 초기화 비용과 비교 가능)
+    """
+    help = "Measure chatmate.utils_v5 import time in fresh interpreters"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--warm-up", action="store_true", help="import 후 warm_up_vectorstore 시간도 측정")
+
+    def handle(self, *args, **options):
+        script = STARTUP_SCRIPT.format(warm_up=options["warm_up"])
+        imports, warm_ups = [], []
+        for _ in range(options["runs"]):
+            output = subprocess.run(
+                [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(output)
+            imports.append(result["import"] * 1000)
+            if result["warm_up"] is not None:
+                warm_ups.append(result["warm_up"] * 1000)
+
+        self.stdout.write(
+            f"import chatmate.utils_v5  p50: {statistics.median(imports):.0f}ms  max: {max(imports):.0f}ms"
+        )
+        if warm_ups:
+            self.stdout.write(
+                f"warm_up_vectorstore       p50: {statistics.median(warm_ups):.0f}ms  max: {max(warm_ups):.0f}ms"
+            )
@@ -0,0 +1,33 @@
+import asyncio
+from django.core.management.base import BaseCommand
+from chatmate.streaming import measure_stream, SNAPSHOT_PROTOCOL, DELTA_PROTOCOL
+
+
+class Command(BaseCommand):
+    """
+    python manage.py benchmark_streaming 명령어로 스트리밍 프로토콜별 응답 1개당 전송 바이트와 CPU 시간 비교
+    LLM 토큰 청크를 흉내 낸 짧은 한글 청크(--tokens개)를 --chunk-delay 간격으로 흘려보냄
+    """
+    help = "Compare bytes sent and CPU time per response for snapshot vs delta streaming"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tokens", type=int, default=2000)
+        parser.add_argument("--chunk-delay", type=float, default=0.0, help="청크 사이 대기 시간(초), 0이면 대기 없음")
+        parser.add_argument("--flush-interval", type=float, default=None)
+        parser.add_argument("--min-chunk-chars", type=int, default=None)
+
+    def handle(self, *args, **options):
+        words = ["게임", " 추천", "드립", "니다", ".", " 스팀", "에서", " 플레이", "해", " 보세요", "!", "\n"]
+        chunks = [words[i % len(words)] for i in range(options["tokens"])]
+
+        for name, protocol in (("snapshot (v1)", SNAPSHOT_PROTOCOL), ("delta (v2)", DELTA_PROTOCOL)):
+            stats = asyncio.run(measure_stream(
+                chunks,
+                protocol,
+                flush_interval=options["flush_interval"],
+                min_chunk_chars=options["min_chunk_chars"],
+                chunk_delay=options["chunk_delay"],
+            ))
+            self.stdout.write(
+                f"{name:<14} frames: {stats['frames']:>5}  bytes: {stats['bytes']:>10,}  cpu: {stats['cpu_ms']:.1f}ms"
+            )
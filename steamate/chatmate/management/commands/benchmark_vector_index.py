@@ -0,0 +1,85 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+
+class Command(BaseCommand):
+    """
+    python manage.py benchmark_vector_index 명령어로
+    정확한 순차 검색 대비 ANN 인덱스의 recall@k와 지연 시간을 ef_search/probes 값별로 비교
+    """
+    help = "Recall vs latency of the pgvector ANN index against an exact scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=100)
+        parser.add_argument("--k", type=int, default=10)
+        parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 20, 40, 80, 160])
+        parser.add_argument("--probes", type=int, nargs="+", default=[1, 5, 10, 20, 50])
+
+    def sample_queries(self, count):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT embedding FROM langchain_pg_embedding
+                ORDER BY random()
+                LIMIT %s
+            """, [count])
+            return [row[0] for row in cursor.fetchall()]
+
+    def search(self, query_vectors, k, settings_sql):
+        """
+        주어진 세션 설정으로 KNN을 실행하고 (결과 목록, 지연 시간 목록)을 반환
+        SET LOCAL은 트랜잭션 안에서만 유효하므로 측정마다 트랜잭션으로 감쌈
+        """
+        results, latencies = [], []
+        with transaction.atomic(), connection.cursor() as cursor:
+            for statement in settings_sql:
+                cursor.execute(statement)
+            for vector in query_vectors:
+                start = time.perf_counter()
+                cursor.execute("""
+                    SELECT cmetadata->>'appid' FROM langchain_pg_embedding
+                    ORDER BY embedding <=> %s::vector
+                    LIMIT %s
+                """, [vector, k])
+                rows = cursor.fetchall()
+                latencies.append((time.perf_counter() - start) * 1000)
+                results.append({row[0] for row in rows})
+        return results, latencies
+
+    def report(self, label, results, latencies, exact_results, k):
+        recall = sum(len(r & e) for r, e in zip(results, exact_results)) / (k * len(exact_results))
+        latencies = sorted(latencies)
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[max(0, int(round(0.95 * len(latencies))) - 1)]
+        self.stdout.write(f"{label:<18} recall@{k}: {recall:.3f}  p50: {p50:.2f}ms  p95: {p95:.2f}ms")
+
+    def handle(self, *args, **options):
+        k = options["k"]
+        query_vectors = self.sample_queries(options["queries"])
+        if not query_vectors:
+            self.stdout.write(self.style.WARNING("langchain_pg_embedding에 데이터가 없습니다."))
+            return
+
+        # 인덱스 스캔을 끄고 정확한 순차 검색 결과를 기준값으로 사용
+        exact_results, exact_latencies = self.search(
+            query_vectors, k, ["SET LOCAL enable_indexscan = off", "SET LOCAL enable_bitmapscan = off"]
+        )
+        self.report("exact scan", exact_results, exact_latencies, exact_results, k)
+
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT indexdef FROM pg_indexes
+                WHERE tablename = 'langchain_pg_embedding' AND indexdef ILIKE '%%vector_cosine_ops%%'
+            """)
+            index_defs = " ".join(row[0].lower() for row in cursor.fetchall())
+
+        if "hnsw" in index_defs:
+            for ef_search in options["ef_search"]:
+                results, latencies = self.search(query_vectors, k, [f"SET LOCAL hnsw.ef_search = {int(ef_search)}"])
+                self.report(f"hnsw ef={ef_search}", results, latencies, exact_results, k)
+        elif "ivfflat" in index_defs:
+            for probes in options["probes"]:
+                results, latencies = self.search(query_vectors, k, [f"SET LOCAL ivfflat.probes = {int(probes)}"])
+                self.report(f"ivfflat probes={probes}", results, latencies, exact_results, k)
+        else:
+            self.stdout.write(self.style.WARNING("ANN 인덱스가 없습니다. python manage.py vector_index를 먼저 실행하세요."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from channels.layers import get_channel_layer
+from channels.worker import Worker
+from config.settings import CHAT_GENERATION
+from chatmate.workers import generation_worker_application
+
+
+class Command(BaseCommand):
+    """
+    python manage.py chat_generation_worker 명령어로 챗봇 응답 생성 워커 실행
+    CHAT_GENERATION["backend"]가 "channels"일 때 웹소켓 서버는 연결만 유지하고, 실제 LLM 호출은 이 프로세스들이 처리
+    (웹소켓 서버와 생성 워커 수를 따로 늘릴 수 있음)
+    """
+    help = "Run chat generation workers that consume jobs from the channel layer"
+
+    def handle(self, *args, **options):
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            raise CommandError("채널 레이어가 설정되지 않았습니다. CHAT_GENERATION_BACKEND=channels로 실행하세요.")
+        channel = CHAT_GENERATION["channel"]
+        self.stdout.write(f"채널 '{channel}'에서 응답 생성 작업을 기다립니다.")
+        worker = Worker(
+            application=generation_worker_application(),
+            channels=[channel],
+            channel_layer=channel_layer,
+        )
+        worker.run()
@@ -0,0 +1,157 @@
+import asyncio
+import time
+from django.core.management.base import BaseCommand
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda, RunnableWithMessageHistory
+
+
+async def fake_wait(latency, blocking):
+    if blocking:
+        time.sleep(latency)
+    else:
+        await asyncio.sleep(latency)
+
+
+def make_fake_llm(latency, text, blocking):
+    """
+    latency초 뒤에 고정된 AIMessage를 반환하는 가짜 LLM
+    blocking=True이면 비동기 호출 안에서도 time.sleep으로 이벤트 루프를 막아 기존 동기 호출을 재현
+    """
+    def invoke(_):
+        time.sleep(latency)
+        return AIMessage(content=text)
+
+    async def ainvoke(_):
+        await fake_wait(latency, blocking)
+        return AIMessage(content=text)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+class FakeEmbeddings:
+    """
+    호출당 latency초가 걸리는 가짜 임베딩 모델 (검색어 수와 무관하게 배치 한 번으로 처리)
+    """
+    def __init__(self, latency, blocking):
+        self.latency = latency
+        self.blocking = blocking
+
+    async def aembed_documents(self, texts):
+        await fake_wait(self.latency, self.blocking)
+        return [[0.0] for _ in texts]
+
+
+class FakeVectorStore:
+    """
+    latency초 뒤에 빈 검색 결과를 반환하는 가짜 벡터 스토어
+    """
+    def __init__(self, latency, blocking):
+        self.latency = latency
+        self.blocking = blocking
+        self.embeddings = FakeEmbeddings(latency, blocking)
+        self.retriever = make_fake_llm(latency, "", blocking) | RunnableLambda(lambda _: [])
+
+    def as_retriever(self, **kwargs):
+        return self.retriever
+
+    async def asimilarity_search_by_vector(self, embedding, k=4, **kwargs):
+        await fake_wait(self.latency, self.blocking)
+        return []
+
+
+class Command(BaseCommand):
+    """
+    python manage.py chat_load_test --sessions 20 명령어로
+    가짜 LLM/벡터 스토어를 사용해 한 워커(이벤트 루프)에서 동시 세션이 직렬화되는지 측정
+    """
+    help = "Load test get_chatbot_message with a fake LLM on a single event loop"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sessions", type=int, default=20)
+        parser.add_argument("--llm-latency", type=float, default=0.5)
+        parser.add_argument("--search-latency", type=float, default=0.1)
+        parser.add_argument(
+            "--blocking", action="store_true",
+            help="LLM/검색 호출이 이벤트 루프를 막는 기존 동작을 재현",
+        )
+        parser.add_argument(
+            "--no-response-cache", action="store_true",
+            help="라우팅/검색 질의 캐시를 끄고 측정",
+        )
+        parser.add_argument(
+            "--routing", choices=["serial", "speculative"],
+            help="라우팅 방식 (지정하지 않으면 CHAT_SPECULATIVE_ROUTING 설정을 따름)",
+        )
+
+    def install_fakes(self, options):
+        from chatmate import utils_v5, history
+        from chatmate.history import MemoryHistoryStore, get_prompt_history
+        from chatmate.prompt import main_prompt, choice_prompt
+
+        blocking = options["blocking"]
+        chat = make_fake_llm(options["llm_latency"], "fake response", blocking)
+        choice_chat = make_fake_llm(options["llm_latency"], "", blocking)
+
+        # 부하 테스트 세션은 Redis 없이 프로세스 메모리에 저장
+        history.history_store = MemoryHistoryStore()
+        utils_v5.history_store = history.history_store
+        utils_v5.chat = chat
+        utils_v5.response_cache.enabled = not options["no_response_cache"]
+        utils_v5.response_cache.clear()
+        utils_v5.ttft_recorder.clear()
+        if options["routing"]:
+            utils_v5.speculative_routing = options["routing"] == "speculative"
+        utils_v5.choice_chain = choice_prompt | choice_chat
+        fake_vector_store = FakeVectorStore(options["search_latency"], blocking)
+        utils_v5.get_vector_store = lambda: fake_vector_store
+        utils_v5.chain_with_history = RunnableWithMessageHistory(
+            main_prompt | chat | utils_v5.str_outputparser,
+            get_prompt_history,
+            input_messages_key="input",
+            history_messages_key="chat_history",
+        )
+        return utils_v5
+
+    async def run_session(self, utils_v5, session_id):
+        start = time.perf_counter()
+        async for _ in utils_v5.get_chatbot_message("게임 추천해줘", f"load-test-{session_id}", ["RPG"], [], []):
+            pass
+        return time.perf_counter() - start
+
+    async def measure_loop_lag(self, stop, interval=0.01):
+        """
+        이벤트 루프가 막힌 최대 시간 측정 (interval마다 깨어나야 하는 작업의 지연)
+        """
+        max_lag = 0.0
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            max_lag = max(max_lag, time.perf_counter() - start - interval)
+        return max_lag
+
+    async def run(self, utils_v5, sessions):
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(self.measure_loop_lag(stop))
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(self.run_session(utils_v5, i) for i in range(sessions)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        return elapsed, sorted(latencies), await lag_task
+
+    def handle(self, *args, **options):
+        utils_v5 = self.install_fakes(options)
+        sessions = options["sessions"]
+
+        # 세션 하나의 기준 지연 시간
+        single, _, _ = asyncio.run(self.run(utils_v5, 1))
+        elapsed, latencies, max_lag = asyncio.run(self.run(utils_v5, sessions))
+
+        p95 = latencies[max(0, int(round(0.95 * len(latencies))) - 1)]
+        mode = "blocking" if options["blocking"] else "async"
+        self.stdout.write(f"mode: {mode}, sessions: {sessions}")
+        self.stdout.write(f"single session: {single:.2f}s")
+        self.stdout.write(f"{sessions} concurrent sessions: {elapsed:.2f}s (serialized would be ~{single * sessions:.2f}s)")
+        self.stdout.write(f"session latency p50: {latencies[len(latencies) // 2]:.2f}s  p95: {p95:.2f}s")
+        self.stdout.write(f"max event loop lag: {max_lag * 1000:.1f}ms")
+        for label, stats in utils_v5.ttft_recorder.stats().items():
+            self.stdout.write(f"TTFT {label}: n={stats['count']}  p50: {stats['p50_ms']:.0f}ms  p95: {stats['p95_ms']:.0f}ms")
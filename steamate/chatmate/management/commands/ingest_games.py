@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from chatmate.ingestion import run_ingestion, run_incremental_sync, GAMES_CSV_PATH
+from chatmate.vector_index import get_index_options
+
+
+class Command(BaseCommand):
+    """
+    python manage.py ingest_games 명령어로 games CSV를 벡터 스토어에 적재
+    중단되면 같은 명령어로 마지막 checkpoint 이후부터 이어서 적재
+    --incremental을 주면 내용 해시가 바뀐 게임만 다시 임베딩하고 사라진 게임은 삭제
+    --fake-embeddings를 주면 OpenAI 호출 없이 결정적인 가짜 벡터로 파이프라인만 측정
+    """
+    help = "Ingest the games CSV into the pgvector collection with batched, concurrent embedding and COPY"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--csv", default=GAMES_CSV_PATH)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--max-calls-per-minute", type=int, default=500, help="임베딩 API 요청 수 제한")
+        parser.add_argument("--restart", action="store_true", help="checkpoint를 무시하고 처음부터 다시 적재")
+        parser.add_argument("--fake-embeddings", action="store_true", help="네트워크 없이 가짜 임베딩으로 적재")
+        parser.add_argument("--incremental", action="store_true", help="추가/변경/삭제된 게임만 동기화")
+        parser.add_argument("--dry-run", action="store_true", help="--incremental과 함께 사용, 변경 건수만 출력")
+
+    def progress(self, rows_done, total, rows_per_sec):
+        self.stdout.write(f"{rows_done}/{total} rows ({rows_per_sec:.1f} rows/s)")
+
+    def handle(self, *args, **options):
+        embeddings = None
+        if options["fake_embeddings"]:
+            embeddings = DeterministicFakeEmbedding(size=get_index_options()["dimensions"])
+
+        if options["incremental"]:
+            self.sync(embeddings, options)
+            return
+
+        stats = run_ingestion(
+            embeddings=embeddings,
+            csv_path=options["csv"],
+            batch_size=options["batch_size"],
+            concurrency=options["concurrency"],
+            max_calls_per_minute=options["max_calls_per_minute"],
+            restart=options["restart"],
+            progress=self.progress,
+        )
+
+        if stats["rows"] == 0 and stats["resumed_from"] == stats["total"]:
+            self.stdout.write(self.style.SUCCESS("이미 적재가 완료된 CSV입니다. (다시 적재하려면 --restart)"))
+            return
+        if stats["resumed_from"]:
+            self.stdout.write(f"{stats['resumed_from']}번째 행부터 이어서 적재했습니다.")
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['rows']} rows in {stats['seconds']:.1f}s ({stats['rows_per_sec']:.1f} rows/s)"
+        ))
+        self.report_index_error(stats)
+
+    def sync(self, embeddings, options):
+        stats = run_incremental_sync(
+            embeddings=embeddings,
+            csv_path=options["csv"],
+            batch_size=options["batch_size"],
+            concurrency=options["concurrency"],
+            max_calls_per_minute=options["max_calls_per_minute"],
+            dry_run=options["dry_run"],
+            progress=self.progress,
+        )
+        self.stdout.write(
+            f"total: {stats['total']}  added: {stats['added']}  updated: {stats['updated']}  "
+            f"deleted: {stats['deleted']}  unchanged: {stats['unchanged']}"
+        )
+        if stats["seconds"]:
+            self.stdout.write(self.style.SUCCESS(
+                f"{stats['added'] + stats['updated']} rows re-embedded in {stats['seconds']:.1f}s "
+                f"({stats['rows_per_sec']:.1f} rows/s)"
+            ))
+        self.report_index_error(stats)
+
+    def report_index_error(self, stats):
+        if stats["index_error"]:
+            self.stderr.write(self.style.ERROR(
+                f"벡터 인덱스 생성 실패: {stats['index_error']} (python manage.py vector_index로 다시 생성하세요)"
+            ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from chatmate.vector_index import ensure_vector_indexes, drop_vector_indexes, get_index_status, embedding_table_exists
+
+
+class Command(BaseCommand):
+    """
+    python manage.py vector_index 명령어로 langchain_pg_embedding의 ANN(HNSW/IVFFlat) 인덱스와
+    cmetadata->>'appid' B-tree 인덱스를 생성, 재생성, 삭제하거나 상태를 확인
+    """
+    help = "Build and maintain pgvector ANN and appid indexes on langchain_pg_embedding"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--method", choices=["hnsw", "ivfflat"], help="기본값은 settings.PGVECTOR_INDEX['method']")
+        parser.add_argument("--rebuild", action="store_true", help="ANN 인덱스를 삭제 후 다시 생성 (IVFFlat은 데이터 변경 후 권장)")
+        parser.add_argument("--drop", action="store_true", help="모든 벡터 인덱스 삭제")
+        parser.add_argument("--status", action="store_true", help="현재 인덱스 목록만 출력")
+
+    def handle(self, *args, **options):
+        if options["drop"]:
+            with connection.cursor() as cursor:
+                if embedding_table_exists(cursor):
+                    drop_vector_indexes(cursor)
+            self.stdout.write(self.style.SUCCESS("벡터 인덱스를 삭제했습니다."))
+        elif not options["status"]:
+            if ensure_vector_indexes(method=options["method"], rebuild=options["rebuild"]):
+                self.stdout.write(self.style.SUCCESS("벡터 인덱스를 생성했습니다."))
+            else:
+                self.stdout.write(self.style.WARNING("langchain_pg_embedding 테이블이 없습니다. 벡터 스토어를 먼저 적재하세요."))
+                return
+
+        for name, definition, size in get_index_status():
+            self.stdout.write(f"{name} ({size})\n    {definition}")
@@ -0,0 +1,83 @@
+# Generated by Django 4.2 on 2026-10-18 11:00
+
+from django.conf import settings
+from django.db import migrations
+
+# 마이그레이션 시점의 테이블/인덱스 이름을 고정하기 위해 chatmate.vector_index에서 복사해 둠
+EMBEDDING_TABLE = "langchain_pg_embedding"
+HNSW_INDEX_NAME = "ix_langchain_pg_embedding_hnsw"
+IVFFLAT_INDEX_NAME = "ix_langchain_pg_embedding_ivfflat"
+APPID_INDEX_NAME = "ix_langchain_pg_embedding_appid"
+
+
+def embedding_table_exists(cursor):
+    cursor.execute("SELECT to_regclass(%s)", [EMBEDDING_TABLE])
+    return cursor.fetchone()[0] is not None
+
+
+def create_vector_indexes(apps, schema_editor):
+    """
+    langchain_pg_embedding 테이블이 이미 있으면 ANN/appid 인덱스 생성
+    테이블이 없으면 벡터 스토어 적재 후 vector_index 명령어 또는 적재 과정에서 생성됨
+    """
+    options = {
+        "method": "hnsw",
+        "dimensions": 1536,
+        "hnsw_m": 16,
+        "hnsw_ef_construction": 64,
+        "ivfflat_lists": 100,
+    }
+    options.update(getattr(settings, "PGVECTOR_INDEX", {}))
+
+    if options["method"] == "hnsw":
+        index_name, other_name = HNSW_INDEX_NAME, IVFFLAT_INDEX_NAME
+        with_clause = f"m = {int(options['hnsw_m'])}, ef_construction = {int(options['hnsw_ef_construction'])}"
+    elif options["method"] == "ivfflat":
+        index_name, other_name = IVFFLAT_INDEX_NAME, HNSW_INDEX_NAME
+        with_clause = f"lists = {int(options['ivfflat_lists'])}"
+    else:
+        raise ValueError(f"지원하지 않는 인덱스 방식입니다: {options['method']}")
+
+    with schema_editor.connection.cursor() as cursor:
+        if not embedding_table_exists(cursor):
+            return
+
+        # 차원 없는 vector 컬럼에는 ANN 인덱스를 만들 수 없으므로 vector(dimensions)로 고정
+        cursor.execute("""
+            SELECT atttypmod FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attname = 'embedding'
+        """, [EMBEDDING_TABLE])
+        typmod = cursor.fetchone()[0]
+        if typmod in (-1, None):
+            cursor.execute(f"ALTER TABLE {EMBEDDING_TABLE} ALTER COLUMN embedding TYPE vector({int(options['dimensions'])})")
+        elif typmod != options["dimensions"]:
+            raise ValueError(f"embedding 컬럼 차원({typmod})이 설정({options['dimensions']})과 다릅니다.")
+
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS {APPID_INDEX_NAME}
+            ON {EMBEDDING_TABLE} ((cmetadata->>'appid'))
+        """)
+        cursor.execute(f"DROP INDEX IF EXISTS {other_name}")
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS {index_name}
+            ON {EMBEDDING_TABLE} USING {options['method']} (embedding vector_cosine_ops)
+            WITH ({with_clause})
+        """)
+
+
+def drop_vector_indexes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        if embedding_table_exists(cursor):
+            for index_name in (HNSW_INDEX_NAME, IVFFLAT_INDEX_NAME, APPID_INDEX_NAME):
+                cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatmate', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_vector_indexes, drop_vector_indexes),
+    ]
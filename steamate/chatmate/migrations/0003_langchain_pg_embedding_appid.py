@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+from django.db import migrations
+
+# 마이그레이션 시점의 테이블/인덱스 이름을 고정하기 위해 chatmate.vector_index에서 복사해 둠
+EMBEDDING_TABLE = "langchain_pg_embedding"
+APPID_COLUMN_INDEX_NAME = "ix_langchain_pg_embedding_appid_int"
+
+
+def embedding_table_exists(cursor):
+    cursor.execute("SELECT to_regclass(%s)", [EMBEDDING_TABLE])
+    return cursor.fetchone()[0] is not None
+
+
+def add_appid_column(apps, schema_editor):
+    """
+    이미 적재된 langchain_pg_embedding에 정수형 appid 생성 컬럼과 인덱스 추가
+    """
+    with schema_editor.connection.cursor() as cursor:
+        if not embedding_table_exists(cursor):
+            return
+        cursor.execute(f"""
+            ALTER TABLE {EMBEDDING_TABLE}
+            ADD COLUMN IF NOT EXISTS appid integer
+            GENERATED ALWAYS AS (
+                CASE WHEN cmetadata->>'appid' ~ '^[0-9]+$' THEN (cmetadata->>'appid')::integer END
+            ) STORED
+        """)
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS {APPID_COLUMN_INDEX_NAME}
+            ON {EMBEDDING_TABLE} (appid)
+        """)
+
+
+def drop_appid_column(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        if embedding_table_exists(cursor):
+            cursor.execute(f"ALTER TABLE {EMBEDDING_TABLE} DROP COLUMN IF EXISTS appid")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatmate', '0002_langchain_pg_embedding_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_appid_column, drop_appid_column),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+# 마이그레이션 시점의 테이블/컬렉션 이름을 고정하기 위해 chatmate.vector_index에서 복사해 둠
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+COLLECTION_NAME = "games_collection"
+
+
+def backfill_manifest(apps, schema_editor):
+    """
+    이미 적재된 임베딩 문서로 내용 해시를 채워 첫 증분 동기화가 전체를 다시 임베딩하지 않도록 함
+    (chatmate.ingestion.content_hash와 같은 "모델 이름 + 줄바꿈 + 문서" 형식)
+    같은 appid의 행이 여러 개면 COPY로 마지막에 적재된 행(ctid가 가장 큰 행)을 사용하여
+    증분 동기화의 "마지막 행 우선" 규칙과 맞춤
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [EMBEDDING_TABLE])
+        if cursor.fetchone()[0] is None:
+            return
+        cursor.execute(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = %s", [COLLECTION_NAME])
+        row = cursor.fetchone()
+        if row is None:
+            return
+        collection_id = row[0]
+        cursor.execute(f"""
+            INSERT INTO chatmate_embeddingmanifest (appid, content_hash, updated_at)
+            SELECT DISTINCT ON ((cmetadata->>'appid')::integer)
+                (cmetadata->>'appid')::integer,
+                encode(sha256(convert_to('text-embedding-3-small' || E'\\n' || document, 'UTF8')), 'hex'),
+                now()
+            FROM {EMBEDDING_TABLE}
+            WHERE collection_id = %s AND cmetadata->>'appid' ~ '^[0-9]+$'
+            ORDER BY (cmetadata->>'appid')::integer, ctid DESC
+            ON CONFLICT (appid) DO NOTHING
+        """, [collection_id])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatmate', '0004_ingestioncheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingManifest',
+            fields=[
+                ('appid', models.IntegerField(primary_key=True, serialize=False)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_manifest, migrations.RunPython.noop),
+    ]
@@ -10,4 +10,30 @@ class ChatMessage(models.Model):
     user_message = models.TextField()
     chatbot_message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    modified_at = models.DateTimeField(auto_now=True)
\ No newline at end of file
+    modified_at = models.DateTimeField(auto_now=True)
+
+class IngestionCheckpoint(models.Model):
+    """
+    벡터 스토어 적재 진행 상황 (중단되면 rows_done 이후부터 이어서 적재)
+    source_hash가 바뀌면 다른 CSV로 보고 처음부터 다시 적재
+    """
+    name = models.CharField(max_length=100, unique=True)
+    source_hash = models.CharField(max_length=64)
+    rows_done = models.IntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} - {self.rows_done}"
+
+
+class EmbeddingManifest(models.Model):
+    """
+    벡터 컬렉션에 적재된 게임 문서의 appid별 내용 해시 (바뀐 게임만 다시 임베딩하기 위해 사용)
+    """
+    appid = models.IntegerField(primary_key=True)
+    content_hash = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.appid} - {self.content_hash[:12]}"
@@ -1,4 +1,5 @@
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import get_buffer_string
 from langchain import hub
 
 main_prompt = ChatPromptTemplate.from_messages([
@@ -48,10 +49,8 @@ main_prompt = ChatPromptTemplate.from_messages([
 ])
 
 
-def generate_pseudo_document(user_input, chat, str_outputparser, tag, preferred_games, chat_history):
-    """Query2doc/HyDE approach to generate a pseudo document."""
-    pseudo_doc_prompt = ChatPromptTemplate.from_messages([
-        ("system", """
+pseudo_doc_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
         당신은 게임 특성 분석 전문가입니다. 사용자의 취향과 요구사항을 분석하여 게임 특성 목록을 생성해야 합니다.
         
         사용자는 직접적으로 게임 추천을 요청할 수 있지만, 당신의 임무는 게임 제목을 추천하는 것이 아니라 
@@ -82,16 +81,24 @@ def generate_pseudo_document(user_input, chat, str_outputparser, tag, preferred_
         - 직접적인 게임 추천이나 설명을 제공하지 마세요
         - 키워드만 나열하고 문장이나 설명은 포함하지 마세요
         """),
-        ("human", "{input}")
-    ])
+    ("human", "{input}")
+])
+
+
+def generate_pseudo_document(user_input, chat, str_outputparser, tag, preferred_games, chat_history):
+    """Query2doc/HyDE approach to generate a pseudo document."""
     pseudo_doc_chain = pseudo_doc_prompt | chat | str_outputparser
     return pseudo_doc_chain.invoke({"input": user_input, "tag": tag, "preferred_games": preferred_games, "chat_history": chat_history})
 
 
-def decompose_query(pseudo_doc, chat, str_outputparser):
-    """Decompose the pseudo document into sub-queries."""
-    decompose_prompt = ChatPromptTemplate.from_messages([
-        ("system", """
+async def agenerate_pseudo_document(user_input, chat, str_outputparser, tag, preferred_games, chat_history):
+    """Async version of generate_pseudo_document that does not block the event loop."""
+    pseudo_doc_chain = pseudo_doc_prompt | chat | str_outputparser
+    return await pseudo_doc_chain.ainvoke({"input": user_input, "tag": tag, "preferred_games": preferred_games, "chat_history": chat_history})
+
+
+decompose_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
         주어진 게임 특성 키워드 목록을 분석하여 효과적인 검색 질의어를 생성하세요.
 
         키워드 목록: {input}    
@@ -106,10 +113,50 @@ def decompose_query(pseudo_doc, chat, str_outputparser):
         - 키워드들을 자연스럽게 조합하여 사용하세요
         - 각 줄에 하나의 검색 질의어만 작성하세요
         """)
-    ])
-    
+])
+
+
+def split_sub_queries(text):
+    return [q.strip() for q in text.split('\n') if q.strip()]
+
+
+def decompose_query(pseudo_doc, chat, str_outputparser):
+    """Decompose the pseudo document into sub-queries."""
     decompose_chain = decompose_prompt | chat | str_outputparser
-    return [q.strip() for q in decompose_chain.invoke({"input": pseudo_doc}).split('\n') if q.strip()]
+    return split_sub_queries(decompose_chain.invoke({"input": pseudo_doc}))
+
+
+async def adecompose_query(pseudo_doc, chat, str_outputparser):
+    """Async version of decompose_query that does not block the event loop."""
+    decompose_chain = decompose_prompt | chat | str_outputparser
+    return split_sub_queries(await decompose_chain.ainvoke({"input": pseudo_doc}))
+
+
+summary_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
+        당신은 게임 추천 챗봇의 대화 요약 담당입니다. 이전 요약과 새로 밀려난 대화를 합쳐 하나의 요약을 작성하세요.
+
+        이전 요약:
+        {summary}
+
+        새로 요약할 대화:
+        {messages}
+
+        가이드라인:
+        - 사용자의 게임 취향, 언급한 게임, 이미 추천받은 게임 제목을 빠짐없이 유지하세요
+        - 인사말이나 반복되는 설명은 제외하세요
+        - 5문장 이내의 한국어로 작성하세요
+        """)
+])
+
+
+async def asummarize_history(previous_summary, messages, chat, str_outputparser):
+    """Fold turns that fell out of the prompt window into the running session summary."""
+    summary_chain = summary_prompt | chat | str_outputparser
+    return await summary_chain.ainvoke({
+        "summary": previous_summary or "없음",
+        "messages": get_buffer_string(messages),
+    })
 
 choice_prompt = ChatPromptTemplate.from_messages([
     ("system", """
@@ -0,0 +1,111 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import defaultdict, deque
+from cachetools import TTLCache
+
+# 끝에 붙은 문장 부호/이모티콘성 반복 문자는 의미를 바꾸지 않으므로 정규화 시 제거
+TRAILING_PUNCTUATION = re.compile(r"[\s.,!?~…ㅎㅋㅠㅜ^]+$")
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """
+    "게임 추천해줘!!", " 게임  추천해줘" 처럼 표기만 다른 입력이 같은 키가 되도록 정규화
+    """
+    # NFKC는 "ㅋ" 같은 호환 자모를 조합형으로 바꾸므로 끝 문자 제거를 먼저 수행
+    text = TRAILING_PUNCTUATION.sub("", text or "")
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = WHITESPACE.sub(" ", text).strip()
+    return TRAILING_PUNCTUATION.sub("", text)
+
+
+def make_cache_key(*parts):
+    """
+    문자열/리스트 입력을 정규화하여 하나의 해시 키로 만듦 (리스트는 순서와 무관하게 정렬)
+    """
+    normalized = []
+    for part in parts:
+        if isinstance(part, (list, tuple, set)):
+            normalized.append("\x1f".join(sorted(normalize_text(str(item)) for item in part)))
+        else:
+            normalized.append(normalize_text(str(part)))
+    return hashlib.sha256("\x1e".join(normalized).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    입력만으로 결과가 정해지는 LLM 단계(라우팅, 검색 질의 생성)의 결과를 단계별로 보관하는 TTL 캐시
+    """
+    def __init__(self, maxsize=5000, ttl=3600, enabled=True):
+        self.enabled = enabled
+        self.maxsize = maxsize
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    def get(self, stage, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._local.get((stage, key))
+            if value is None:
+                self.misses[stage] += 1
+            else:
+                self.hits[stage] += 1
+            return value
+
+    def set(self, stage, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._local[(stage, key)] = value
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        stages = {}
+        for stage in set(self.hits) | set(self.misses):
+            lookups = self.hits[stage] + self.misses[stage]
+            stages[stage] = {
+                "hits": self.hits[stage],
+                "misses": self.misses[stage],
+                "hit_rate": self.hits[stage] / lookups if lookups else 0.0,
+            }
+        return {"enabled": self.enabled, "size": len(self._local), "maxsize": self.maxsize, "stages": stages}
+
+
+class LatencyRecorder:
+    """
+    라벨별(예: 캐시 적중/미스) 최근 지연 시간을 보관하고 p50/p95를 계산
+    """
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds):
+        with self._lock:
+            self._samples[label].append(seconds)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def stats(self):
+        result = {}
+        with self._lock:
+            for label, samples in self._samples.items():
+                values = sorted(samples)
+                if not values:
+                    continue
+                result[label] = {
+                    "count": len(values),
+                    "p50_ms": values[len(values) // 2] * 1000,
+                    "p95_ms": values[max(0, int(round(0.95 * len(values))) - 1)] * 1000,
+                }
+        return result
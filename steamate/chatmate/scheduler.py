@@ -0,0 +1,124 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from config.settings import CHAT_CONCURRENCY
+from .response_cache import LatencyRecorder
+
+
+class SchedulerBusy(Exception):
+    """
+    대기열이 가득 차서 새 응답 생성을 받을 수 없을 때 발생
+    """
+
+
+class GenerationScheduler:
+    """
+    워커(프로세스) 하나에서 동시에 실행되는 챗봇 응답 생성 수를 제한하는 스케줄러
+    max_concurrent개까지 바로 실행하고, 나머지는 max_queued개까지 순서대로 대기시키며 그 이상은 SchedulerBusy로 거절
+
+    사용법:
+        async with generation_scheduler.slot():
+            async for chunk in get_chatbot_message(...):
+                ...
+    """
+    def __init__(self, max_concurrent=32, max_queued=64):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._semaphore = None
+        self.active = 0
+        self.queued = 0
+        self.stats_counter = {"completed": 0, "rejected": 0, "cancelled": 0}
+        self.wait_recorder = LatencyRecorder()
+
+    @property
+    def semaphore(self):
+        # 이벤트 루프가 뜬 뒤 처음 사용할 때 생성
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.semaphore.locked() and self.queued >= self.max_queued:
+            self.stats_counter["rejected"] += 1
+            raise SchedulerBusy()
+
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            await self.semaphore.acquire()
+        except asyncio.CancelledError:
+            self.stats_counter["cancelled"] += 1
+            raise
+        finally:
+            self.queued -= 1
+        self.wait_recorder.record("wait", time.perf_counter() - started)
+
+        self.active += 1
+        try:
+            yield
+            self.stats_counter["completed"] += 1
+        except asyncio.CancelledError:
+            self.stats_counter["cancelled"] += 1
+            raise
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+
+    def stats(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "active": self.active,
+            "queue_depth": self.queued,
+            **self.stats_counter,
+            "wait": self.wait_recorder.stats().get("wait", {}),
+        }
+
+
+# 워커 하나에서 공유하는 응답 생성 스케줄러 (settings.CHAT_CONCURRENCY)
+generation_scheduler = GenerationScheduler(
+    max_concurrent=CHAT_CONCURRENCY["max_concurrent_generations"],
+    max_queued=CHAT_CONCURRENCY["max_queued_generations"],
+)
+
+
+class SessionGenerations:
+    """
+    웹소켓 연결(세션) 하나에서 진행 중인 응답 생성 작업 관리
+    같은 키(같은 메시지의 수정)나 max_in_flight를 넘는 새 메시지가 들어오면 가장 오래된 작업을 취소
+    """
+    def __init__(self, max_in_flight=1):
+        self.max_in_flight = max_in_flight
+        self.tasks = {}
+
+    def start(self, key, coroutine):
+        """
+        coroutine을 작업으로 실행하고, 밀려난 작업들은 취소 (취소한 작업 수 반환)
+        """
+        cancelled = 0
+        previous = self.tasks.pop(key, None)
+        if previous is not None and not previous.done():
+            previous.cancel()
+            cancelled += 1
+        while len(self.tasks) >= self.max_in_flight:
+            oldest = next(iter(self.tasks))
+            self.tasks.pop(oldest).cancel()
+            cancelled += 1
+
+        task = asyncio.create_task(coroutine)
+        self.tasks[key] = task
+        task.add_done_callback(lambda done: self.tasks.pop(key, None) if self.tasks.get(key) is done else None)
+        return cancelled
+
+    def cancel(self, key):
+        task = self.tasks.pop(key, None)
+        if task is not None and not task.done():
+            task.cancel()
+            return True
+        return False
+
+    def cancel_all(self):
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from cachetools import TTLCache
+from config.settings import CHAT_STREAM_BUFFER
+from .streaming import SNAPSHOT_PROTOCOL
+
+logger = logging.getLogger(__name__)
+
+# 응답 생성 상태 (running이 아니면 더 이상 조각이 추가되지 않음)
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+BUSY = "busy"
+ERROR = "error"
+
+
+class RedisStreamBuffer:
+    """
+    생성 중인 응답 조각을 generation_id별 Redis 리스트에 보관하는 버퍼
+    조각 목록(:chunks)과 상태(:meta, session_id/status/message_id 등)를 ttl 동안 유지하여
+    연결이 끊긴 클라이언트가 다른 워커로 재연결해도 이어서 받을 수 있게 함
+    """
+    prefix = "chatmate:stream:"
+
+    def __init__(self, client=None, redis_url=None, ttl=300):
+        self._client = client
+        self._redis_url = redis_url
+        self.ttl = ttl
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self._redis_url)
+        return self._client
+
+    def start(self, generation_id, session_id):
+        pipeline = self.client.pipeline()
+        pipeline.delete(f"{self.prefix}{generation_id}:chunks")
+        pipeline.set(f"{self.prefix}{generation_id}:meta", json.dumps({"session_id": str(session_id), "status": RUNNING}), ex=self.ttl)
+        pipeline.execute()
+
+    def append(self, generation_id, chunks):
+        key = f"{self.prefix}{generation_id}:chunks"
+        pipeline = self.client.pipeline()
+        pipeline.rpush(key, *chunks)
+        pipeline.expire(key, self.ttl)
+        pipeline.expire(f"{self.prefix}{generation_id}:meta", self.ttl)
+        pipeline.execute()
+
+    def finish(self, generation_id, status, **meta):
+        key = f"{self.prefix}{generation_id}:meta"
+        value = self.client.get(key)
+        if value is None:
+            return
+        self.client.set(key, json.dumps({**json.loads(value), **meta, "status": status}), ex=self.ttl)
+
+    def read(self, generation_id, after_seq=0):
+        """
+        after_seq번째 이후의 조각 목록과 상태 반환 (버퍼가 없거나 만료되었으면 ([], None))
+        조각과 상태를 한 트랜잭션으로 읽으므로 상태가 running이 아니면 모든 조각이 포함됨
+        """
+        pipeline = self.client.pipeline()
+        pipeline.lrange(f"{self.prefix}{generation_id}:chunks", after_seq, -1)
+        pipeline.get(f"{self.prefix}{generation_id}:meta")
+        chunks, meta = pipeline.execute()
+        if meta is None:
+            return [], None
+        return [chunk.decode("utf-8") for chunk in chunks], json.loads(meta)
+
+
+class MemoryStreamBuffer:
+    """
+    프로세스 로컬 TTLCache 버퍼 (단일 워커 개발 환경용, 같은 프로세스로 재연결한 경우에만 이어받기 가능)
+    """
+    def __init__(self, maxsize=1000, ttl=300):
+        self.store = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def start(self, generation_id, session_id):
+        with self._lock:
+            self.store[generation_id] = {"chunks": [], "meta": {"session_id": str(session_id), "status": RUNNING}}
+
+    def append(self, generation_id, chunks):
+        with self._lock:
+            entry = self.store.get(generation_id)
+            if entry is not None:
+                entry["chunks"].extend(chunks)
+                self.store[generation_id] = entry
+
+    def finish(self, generation_id, status, **meta):
+        with self._lock:
+            entry = self.store.get(generation_id)
+            if entry is not None:
+                entry["meta"] = {**entry["meta"], **meta, "status": status}
+                self.store[generation_id] = entry
+
+    def read(self, generation_id, after_seq=0):
+        with self._lock:
+            entry = self.store.get(generation_id)
+            if entry is None:
+                return [], None
+            return entry["chunks"][after_seq:], dict(entry["meta"])
+
+
+def build_stream_buffer(options=None):
+    options = dict(CHAT_STREAM_BUFFER if options is None else options)
+    backend = options.pop("backend", "redis")
+    options.pop("enabled", None)
+    options.pop("flush_interval", None)
+    if backend == "redis":
+        options.pop("maxsize", None)
+        return RedisStreamBuffer(**options)
+    if backend == "memory":
+        options.pop("redis_url", None)
+        return MemoryStreamBuffer(**options)
+    raise ValueError(f"지원하지 않는 스트림 버퍼 저장소입니다: {backend}")
+
+
+# 워커 간에 공유되는 생성 중 응답 버퍼 (settings.CHAT_STREAM_BUFFER로 선택)
+stream_buffer = build_stream_buffer()
+
+
+class StreamRecorder:
+    """
+    응답 생성 쪽에서 조각을 버퍼에 기록하는 클래스
+    조각마다 저장소를 호출하지 않도록 flush_interval 동안 모았다가 한 번에 추가하고, 저장소 오류는 생성을 막지 않음
+    """
+    def __init__(self, generation_id, session_id, buffer=None, flush_interval=None):
+        self.generation_id = generation_id
+        self.session_id = session_id
+        self.buffer = stream_buffer if buffer is None else buffer
+        self.flush_interval = CHAT_STREAM_BUFFER["flush_interval"] if flush_interval is None else flush_interval
+        self.enabled = CHAT_STREAM_BUFFER["enabled"]
+        self.parts = []
+        self.recorded = 0
+        self.last_flush = time.monotonic()
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    async def _call(self, method, *args, **kwargs):
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(method, self.generation_id, *args, **kwargs)
+        except Exception as e:
+            logger.warning(f"응답 스트림 버퍼 기록 실패 (generation_id: {self.generation_id}): {e}")
+
+    async def start(self):
+        await self._call(self.buffer.start, self.session_id)
+
+    async def flush(self):
+        if self.recorded < len(self.parts):
+            chunks = self.parts[self.recorded:]
+            self.recorded = len(self.parts)
+            self.last_flush = time.monotonic()
+            await self._call(self.buffer.append, chunks)
+
+    async def add(self, chunk):
+        if not chunk:
+            return
+        self.parts.append(chunk)
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def close(self, status, **meta):
+        """
+        남은 조각을 기록하고 최종 상태 저장 (취소된 경우에도 저장소에 반영되도록 취소를 막음)
+        """
+        await asyncio.shield(self._close(status, meta))
+
+    async def _close(self, status, meta):
+        await self.flush()
+        await self._call(self.buffer.finish, status, length=len(self.text), **meta)
+
+
+async def replay_stream(send, generation_id, session_id, after_seq, protocol, buffer=None, poll_interval=None, timeout=120):
+    """
+    버퍼에 기록된 after_seq 이후 조각을 클라이언트에 보내고, 생성이 아직 진행 중이면 끝날 때까지 이어서 전송
+    프로토콜 2는 새 조각만(delta, seq=지금까지 받은 조각 수), 프로토콜 1은 처음부터의 전체 응답을 보냄
+    반환값: 최종 상태 (버퍼가 없거나 다른 세션의 생성이면 None)
+    """
+    buffer = stream_buffer if buffer is None else buffer
+    poll_interval = CHAT_STREAM_BUFFER["flush_interval"] if poll_interval is None else poll_interval
+    seq = 0 if protocol == SNAPSHOT_PROTOCOL else after_seq
+    parts = []
+    deadline = time.monotonic() + timeout
+
+    while True:
+        chunks, meta = await asyncio.to_thread(buffer.read, generation_id, seq)
+        if meta is None or meta["session_id"] != str(session_id):
+            return None
+
+        if chunks:
+            seq += len(chunks)
+            parts.extend(chunks)
+            if protocol == SNAPSHOT_PROTOCOL:
+                await send(text_data=json.dumps({'response': ''.join(parts), 'is_streaming': True}))
+            else:
+                await send(text_data=json.dumps({'delta': ''.join(chunks), 'seq': seq, 'is_streaming': True}))
+
+        status = meta["status"]
+        if status == DONE:
+            if protocol == SNAPSHOT_PROTOCOL:
+                payload = {'response': ''.join(parts), 'is_streaming': False}
+            else:
+                payload = {'is_streaming': False, 'seq': seq, 'length': meta.get("length", 0)}
+            payload.update(message_id=meta.get("message_id"), generation_id=generation_id)
+            await send(text_data=json.dumps(payload))
+            return status
+        if status != RUNNING:
+            return status
+        if time.monotonic() > deadline:
+            raise asyncio.TimeoutError()
+        await asyncio.sleep(poll_interval)
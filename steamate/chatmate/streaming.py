@@ -0,0 +1,157 @@
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs
+from config.settings import CHAT_STREAMING
+
+# 스트리밍 프로토콜 버전
+# 1: 매 청크마다 지금까지의 전체 응답을 보냄 (기존 클라이언트 호환)
+# 2: 새로 생성된 부분(delta)만 순번(seq)과 함께 보내고, 짧은 간격 안의 작은 청크는 합쳐서 보냄
+#    seq는 지금까지 보낸 청크 수(누적)이므로 합쳐 보낸 프레임에서는 1보다 크게 증가하며, 재연결 시 마지막 seq부터 이어받음
+SNAPSHOT_PROTOCOL = 1
+DELTA_PROTOCOL = 2
+SUPPORTED_PROTOCOLS = (SNAPSHOT_PROTOCOL, DELTA_PROTOCOL)
+
+
+def negotiate_protocol(scope):
+    """
+    웹소켓 연결 쿼리 파라미터(?protocol=2)로 요청한 스트리밍 프로토콜 버전 반환
+    지정하지 않았거나 지원하지 않는 값이면 기본값 사용
+    """
+    query_params = parse_qs(scope.get('query_string', b'').decode())
+    try:
+        protocol = int(query_params.get('protocol', [CHAT_STREAMING['default_protocol']])[0])
+    except ValueError:
+        return CHAT_STREAMING['default_protocol']
+    return protocol if protocol in SUPPORTED_PROTOCOLS else CHAT_STREAMING['default_protocol']
+
+
+class ResponseStreamer:
+    """
+    챗봇 응답 청크를 웹소켓 프레임으로 보내는 클래스
+    응답 텍스트는 리스트에 모아 두었다가 끝날 때 한 번만 합침
+
+    사용법:
+        streamer = ResponseStreamer(self.send, protocol)
+        async for chunk in ...:
+            await streamer.push(chunk)
+        text = await streamer.close()
+        ...  # DB 저장
+        await streamer.send_final(message_id=...)
+    """
+    def __init__(self, send, protocol=SNAPSHOT_PROTOCOL, flush_interval=None, min_chunk_chars=None):
+        self.send = send
+        self.protocol = protocol
+        self.flush_interval = CHAT_STREAMING['flush_interval'] if flush_interval is None else flush_interval
+        self.min_chunk_chars = CHAT_STREAMING['min_chunk_chars'] if min_chunk_chars is None else min_chunk_chars
+        self.parts = []
+        self.pending = []
+        self.pending_chars = 0
+        self.seq = 0
+        self.frames = 0
+        self.bytes_sent = 0
+        self._timer = None
+        self._lock = asyncio.Lock()
+
+    async def _send(self, payload):
+        text_data = json.dumps(payload)
+        self.frames += 1
+        self.bytes_sent += len(text_data.encode('utf-8'))
+        await self.send(text_data=text_data)
+
+    async def push(self, chunk):
+        if not chunk:
+            return
+        self.parts.append(chunk)
+
+        if self.protocol == SNAPSHOT_PROTOCOL:
+            await self._send({
+                'response': ''.join(self.parts),
+                'is_streaming': True
+            })
+            return
+
+        self.pending.append(chunk)
+        self.pending_chars += len(chunk)
+        if self.pending_chars >= self.min_chunk_chars or self.flush_interval <= 0:
+            await self.flush()
+        elif self._timer is None:
+            # 작은 청크는 flush_interval 동안 모았다가 한 프레임으로 보냄
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        """
+        모아 둔 delta를 한 프레임으로 전송
+        """
+        async with self._lock:
+            if not self.pending:
+                return
+            delta = ''.join(self.pending)
+            self.pending = []
+            self.pending_chars = 0
+            self.seq = len(self.parts)
+            await self._send({
+                'delta': delta,
+                'seq': self.seq,
+                'is_streaming': True
+            })
+
+    async def close(self):
+        """
+        남은 delta를 보내고 전체 응답 텍스트 반환
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.protocol == DELTA_PROTOCOL:
+            await self.flush()
+        return ''.join(self.parts)
+
+    def discard(self):
+        """
+        응답 생성이 취소되었을 때 아직 보내지 않은 delta와 대기 중인 전송 타이머 폐기
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.pending = []
+        self.pending_chars = 0
+
+    async def send_final(self, **extra):
+        """
+        스트리밍 종료 프레임 전송
+        프로토콜 1은 전체 응답을 다시 보내고, 프로토콜 2는 마지막 순번과 전체 길이만 보냄
+        """
+        if self.protocol == SNAPSHOT_PROTOCOL:
+            payload = {'response': ''.join(self.parts), 'is_streaming': False}
+        else:
+            payload = {'is_streaming': False, 'seq': self.seq, 'length': sum(len(part) for part in self.parts)}
+        payload.update(extra)
+        await self._send(payload)
+
+
+async def measure_stream(chunks, protocol, flush_interval=None, min_chunk_chars=None, chunk_delay=0.0):
+    """
+    가짜 send로 chunks를 스트리밍하고 전송 바이트/프레임 수/CPU 시간 측정 (benchmark_streaming 명령어에서 사용)
+    """
+    async def send(text_data):
+        pass
+
+    streamer = ResponseStreamer(send, protocol, flush_interval, min_chunk_chars)
+    cpu_start = time.process_time()
+    for chunk in chunks:
+        await streamer.push(chunk)
+        if chunk_delay:
+            await asyncio.sleep(chunk_delay)
+    await streamer.close()
+    await streamer.send_final(message_id=0)
+    return {
+        'frames': streamer.frames,
+        'bytes': streamer.bytes_sent,
+        'cpu_ms': (time.process_time() - cpu_start) * 1000,
+    }
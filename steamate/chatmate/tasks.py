@@ -0,0 +1,33 @@
+from celery import shared_task
+from .ingestion import run_ingestion, run_incremental_sync
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def sync_game_embeddings():
+    """
+    games CSV에서 추가/변경/삭제된 게임만 벡터 스토어에 반영 (매일 실행)
+    """
+    try:
+        stats = run_incremental_sync()
+        logger.info(f"게임 임베딩 동기화 완료: {stats}")
+        if stats["index_error"]:
+            logger.error(f"게임 임베딩 동기화 후 벡터 인덱스 생성 실패: {stats['index_error']}")
+        return stats
+    except Exception as e:
+        logger.error(f"게임 임베딩 동기화 중 오류 발생: {e}")
+
+@shared_task
+def ingest_games(restart=False):
+    """
+    games CSV 전체를 벡터 스토어에 적재 (ASGI 워커 시작 시 적재하지 않도록 별도 작업으로 실행)
+    """
+    try:
+        stats = run_ingestion(restart=restart)
+        logger.info(f"게임 임베딩 적재 완료: {stats}")
+        if stats["index_error"]:
+            logger.error(f"게임 임베딩 적재 후 벡터 인덱스 생성 실패: {stats['index_error']}")
+        return stats
+    except Exception as e:
+        logger.error(f"게임 임베딩 적재 중 오류 발생: {e}")
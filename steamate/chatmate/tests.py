@@ -1,3 +1,768 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+import fakeredis
+import numpy as np
+import pandas as pd
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from channels.worker import Worker
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from langchain.schema import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain.schema import HumanMessage, AIMessage
+from langchain_core.messages import SystemMessage, message_to_dict
+from account.models import Game, Tag, User, UserLibraryGame, UserPreferredGame, UserPreferredTag
+from . import consumers, generation, history, ingestion, stream_buffer, user_context, vectorstore, workers
+from .embedding_cache import CachedEmbeddings
+from .ingestion import (RateLimiter, build_documents, content_hash, embed_and_write, embed_batch, file_hash,
+                        run_incremental_sync, run_ingestion)
+from .history import (MemoryHistoryStore, RedisHistoryStore, bring_session_history, collect_unsummarized_messages,
+                      delete_messages_from_history, get_prompt_history)
+from .stream_buffer import MemoryStreamBuffer
+from .scheduler import GenerationScheduler, SchedulerBusy, SessionGenerations
+from .streaming import DELTA_PROTOCOL, SNAPSHOT_PROTOCOL, ResponseStreamer
+from .models import ChatSession, ChatMessage, EmbeddingManifest, IngestionCheckpoint
+from .tokens import count_message_tokens
+from .routing import websocket_urlpatterns
+from .user_context import UserContextCache, load_user_context, load_chat_context, invalidate_user_context
 
-# Create your tests here.
+
+class ChatSessionTestMixin:
+    """
+    채팅 테스트 공통 준비: 세션 소유자와 세션 생성, 모듈 전역 패치, 웹소켓 연결
+    """
+    @staticmethod
+    def create_owner_session():
+        user = User.objects.create(username="owner1", nickname="owner", email="owner@example.com", birth=datetime.date(2000, 1, 1))
+        return user, ChatSession.objects.create(user_id=user)
+
+    def start_patches(self, *patchers):
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def patch_user_context_cache(self):
+        self.start_patches(mock.patch.object(user_context, "user_context_cache", UserContextCache(load_user_context)))
+
+    def patch_chat_generation(self, backend, chatbot_message):
+        """
+        backend("local"/"channels")와 가짜 챗봇 응답으로 생성하고, 대화 내역과 스트림 버퍼는 메모리 저장소 사용
+        """
+        self.start_patches(
+            mock.patch.dict(consumers.CHAT_GENERATION, {"backend": backend}),
+            mock.patch.object(generation, "get_chatbot_message", chatbot_message),
+            mock.patch.object(history, "history_store", MemoryHistoryStore()),
+            mock.patch.object(stream_buffer, "stream_buffer", MemoryStreamBuffer()),
+        )
+        self.patch_user_context_cache()
+
+    async def connect(self):
+        """
+        세션 소유자로 프로토콜 2 웹소켓에 연결하고 연결 확인 메시지까지 받은 communicator 반환
+        """
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/chat/{self.session.id}/?protocol=2")
+        communicator.scope["user"] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())["protocol"], 2)
+        return communicator
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class ChatConsumerTestCase(ChatSessionTestMixin, TransactionTestCase):
+    """
+    메모리 채널 레이어로 ChatConsumer에 연결하는 웹소켓 테스트 기반 클래스 (Redis 채널 레이어 없이 실행)
+    """
+    def setUp(self):
+        self.user, self.session = self.create_owner_session()
+
+
+class UserContextLoaderTests(ChatSessionTestMixin, TestCase):
+    """
+    웹소켓 연결 시 사용자 컨텍스트 조회 쿼리 수 확인
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.session = cls.create_owner_session()
+        cls.other = User.objects.create(username="other1", nickname="other", email="other@example.com", birth=datetime.date(2000, 1, 1))
+        for appid, playtime in ((10, 30), (20, 300), (30, 0)):
+            game = Game.objects.create(appid=appid, title=f"Game {appid}", genre="Action")
+            UserLibraryGame.objects.create(user=cls.user, game=game, playtime=playtime)
+            UserPreferredGame.objects.create(user=cls.user, game=game)
+            UserPreferredTag.objects.create(user=cls.user, tag=Tag.objects.create(name=f"Tag {appid}"))
+
+    def setUp(self):
+        self.patch_user_context_cache()
+
+    def test_load_user_context_query_count_is_constant(self):
+        with self.assertNumQueries(3):
+            context = load_user_context(self.user.id)
+
+        self.assertEqual(context["appid"], [20, 10, 30])
+        self.assertEqual(context["game"][0], "Game 20 (플레이 시간: 300분) (appid: 20)")
+        self.assertCountEqual(context["tags"], ["Tag 10", "Tag 20", "Tag 30"])
+        self.assertCountEqual(context["preferred_games"], ["Game 10", "Game 20", "Game 30"])
+
+    def test_load_chat_context_uses_cache_until_invalidated(self):
+        with self.assertNumQueries(4):
+            session, context = load_chat_context(self.session.id, self.user)
+        self.assertEqual(session.id, self.session.id)
+
+        # 세션 조회만 실행되고 사용자 정보는 캐시에서 가져옴
+        with self.assertNumQueries(1):
+            load_chat_context(self.session.id, self.user)
+
+        invalidate_user_context(self.user.id)
+        with self.assertNumQueries(4):
+            load_chat_context(self.session.id, self.user)
+
+    def test_non_owner_skips_user_context_queries(self):
+        with self.assertNumQueries(1):
+            session, context = load_chat_context(self.session.id, self.other)
+        self.assertIsNone(session)
+        self.assertIsNone(context)
+
+
+class RedisHistoryStoreTests(TestCase):
+    """
+    fakeredis 클라이언트로 Redis 대화 내역 저장소 동작 확인
+    """
+    def setUp(self):
+        self.client = fakeredis.FakeRedis()
+        self.store = RedisHistoryStore(client=self.client, ttl=60, max_messages=4)
+        patcher = mock.patch.object(history, "history_store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def exchange(self, index):
+        return [HumanMessage(content=f"질문 {index}"), AIMessage(content=f"답변 {index}")]
+
+    def test_add_messages_keeps_only_recent_max_messages(self):
+        session_history = self.store.get(1)
+        for index in range(3):
+            session_history.add_messages(self.exchange(index))
+
+        self.assertEqual(self.client.llen("chatmate:history:1"), 4)
+        self.assertEqual(
+            [message.content for message in session_history.messages],
+            ["질문 1", "답변 1", "질문 2", "답변 2"],
+        )
+
+    def test_add_messages_refreshes_ttl(self):
+        session_history = self.store.get(1)
+        session_history.add_messages(self.exchange(0))
+        self.client.expire("chatmate:history:1", 5)
+
+        session_history.add_messages(self.exchange(1))
+        self.assertGreater(self.client.ttl("chatmate:history:1"), 5)
+
+    def test_delete_messages_removes_exchange(self):
+        session_history = self.store.get(1)
+        session_history.add_messages(self.exchange(0) + self.exchange(1))
+
+        self.assertTrue(delete_messages_from_history(1, "질문 0"))
+        self.assertEqual([message.content for message in session_history.messages], ["질문 1", "답변 1"])
+        self.assertFalse(delete_messages_from_history(1, "없는 질문"))
+        self.assertFalse(delete_messages_from_history(2, "질문 1"))
+
+    def test_update_retries_when_list_changes_during_transaction(self):
+        session_history = self.store.get(1)
+        session_history.add_messages(self.exchange(0))
+        calls = []
+
+        def remove_first_exchange(messages):
+            calls.append([message.content for message in messages])
+            if len(calls) == 1:
+                # WATCH 중인 키를 다른 연결에서 수정하면 트랜잭션이 실패하고 다시 읽어야 함
+                self.client.rpush("chatmate:history:1", *[json.dumps(message_to_dict(message)) for message in self.exchange(1)])
+            return messages[2:]
+
+        self.assertTrue(session_history.update(remove_first_exchange))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[1], ["질문 0", "답변 0", "질문 1", "답변 1"])
+        self.assertEqual([message.content for message in session_history.messages], ["질문 1", "답변 1"])
+
+    def test_collect_unsummarized_messages_uses_prompt_window(self):
+        self.store.get(1).add_messages(self.exchange(0) + self.exchange(1))
+        summary = "이전에 추천한 게임 목록과 사용자의 취향 " * 10
+        self.store.set_summary(1, {"text": summary, "last": None})
+
+        # 요약 없이는 네 메시지가 모두 들어가지만 요약을 넣으면 마지막 교환만 남는 예산
+        max_tokens = (
+            count_message_tokens(SystemMessage(content=f"이전 대화 요약: {summary}"))
+            + sum(count_message_tokens(message) for message in self.exchange(1))
+        )
+        with mock.patch.dict(history.CHAT_HISTORY_WINDOW, {"max_tokens": max_tokens, "max_turns": 10}):
+            previous_summary, dropped = collect_unsummarized_messages(1)
+            window = [message.content for message in get_prompt_history(1).messages if not isinstance(message, SystemMessage)]
+
+        self.assertEqual(previous_summary, summary)
+        self.assertEqual([message.content for message in dropped], ["질문 0", "답변 0"])
+        self.assertEqual(window, ["질문 1", "답변 1"])
+
+    def test_bring_session_history_hydrates_from_db_when_key_is_missing(self):
+        user = User.objects.create(username="owner1", nickname="owner", email="owner@example.com", birth=datetime.date(2000, 1, 1))
+        session = ChatSession.objects.create(user_id=user)
+        ChatMessage.objects.create(session_id=session, user_message="질문 0", chatbot_message="답변 0")
+
+        bring_session_history(session.id)
+        self.assertEqual(
+            [message.content for message in self.store.get(session.id).messages],
+            ["질문 0", "답변 0"],
+        )
+        self.assertGreater(self.client.ttl(f"chatmate:history:{session.id}"), 0)
+
+        # 이미 Redis에 있으면 DB를 다시 조회하지 않음
+        with self.assertNumQueries(0):
+            bring_session_history(session.id)
+
+
+
+class CachedEmbeddingsTests(SimpleTestCase):
+    """
+    DeterministicFakeEmbedding을 감싼 임베딩 캐시의 LRU/Redis 계층과 통계 확인
+    """
+    def setUp(self):
+        self.underlying = mock.Mock(wraps=DeterministicFakeEmbedding(size=8))
+        self.client = fakeredis.FakeRedis()
+
+    def cached(self, **kwargs):
+        return CachedEmbeddings(self.underlying, namespace="fake", **kwargs)
+
+    def test_local_lru_hit_skips_underlying(self):
+        cached = self.cached(maxsize=2)
+        first = cached.embed_query("배틀로얄 게임")
+        self.assertEqual(cached.embed_query("배틀로얄 게임"), first)
+        self.assertEqual(self.underlying.embed_documents.call_count, 1)
+
+        # maxsize를 넘으면 가장 오래 쓰지 않은 항목부터 밀려나 다시 임베딩
+        cached.embed_documents(["퍼즐 게임", "레이싱 게임"])
+        cached.embed_query("배틀로얄 게임")
+        self.assertEqual(self.underlying.embed_documents.call_count, 3)
+
+    def test_redis_round_trip_keeps_float32_vector(self):
+        writer = self.cached(redis_client=self.client)
+        vector = writer.embed_query("오픈월드 RPG")
+        self.assertEqual(len(self.client.keys("chatmate:embedding:*")), 1)
+
+        # 로컬 캐시가 비어 있는 다른 워커는 Redis에 저장된 float32 바이트를 그대로 사용
+        reader = self.cached(redis_client=self.client)
+        self.assertEqual(reader.embed_query("오픈월드 RPG"), vector)
+        self.assertEqual(self.underlying.embed_documents.call_count, 1)
+        self.assertEqual((reader.redis_hits, reader.misses), (1, 0))
+
+        expected = DeterministicFakeEmbedding(size=8).embed_query("오픈월드 RPG")
+        self.assertEqual(vector, [float(value) for value in np.asarray(expected, dtype=np.float32)])
+
+    def test_embed_documents_batches_unique_misses(self):
+        cached = self.cached()
+        cached.embed_query("액션")
+        vectors = cached.embed_documents(["액션", "전략", "전략", "공포"])
+
+        self.assertEqual(self.underlying.embed_documents.call_count, 2)
+        self.assertEqual(self.underlying.embed_documents.call_args.args[0], ["전략", "공포"])
+        self.assertEqual(vectors[1], vectors[2])
+        self.assertEqual(len(vectors), 4)
+
+    def test_stats_counts_hits_and_misses(self):
+        cached = self.cached(redis_client=self.client)
+        cached.embed_documents(["액션", "전략"])
+        cached.embed_documents(["액션", "전략"])
+        cached.clear()
+        cached.embed_query("액션")
+
+        stats = cached.stats()
+        self.assertEqual((stats["hits"], stats["redis_hits"], stats["misses"]), (2, 1, 2))
+        self.assertEqual(stats["hit_rate"], 3 / 5)
+        self.assertGreater(stats["saved_tokens"], 0)
+        self.assertEqual(stats["size"], 1)
+
+
+
+class FakeClock:
+    """
+    time.monotonic/sleep 대신 사용하는 가짜 시계 (sleep하면 시간이 바로 흐름)
+    """
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class IngestionPipelineTests(SimpleTestCase):
+    """
+    DB와 임베딩 API 없이 적재 파이프라인의 문서 생성, 재시도, 요청 제한, 순서대로 적재 확인
+    """
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(ingestion, "time", mock.Mock(
+            monotonic=self.clock.monotonic, sleep=self.clock.sleep, perf_counter=time.perf_counter,
+        ))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_build_documents_skips_missing_appid_and_nulls_nan_metadata(self):
+        data = pd.read_csv(io.StringIO("appid,name,genres\n570,Dota 2,Action\n,Unknown,RPG\n10,Counter-Strike,\n"))
+        documents = build_documents(data)
+
+        self.assertEqual([document.metadata for document in documents], [
+            {"appid": 570, "genres": "Action"},
+            {"appid": 10, "genres": None},
+        ])
+        self.assertTrue(all(type(document.metadata["appid"]) is int for document in documents))
+        self.assertEqual(documents[0].page_content, "appid: 570 | name: Dota 2 | genres: Action")
+
+    def test_embed_batch_retries_with_exponential_backoff(self):
+        embeddings = mock.Mock()
+        embeddings.embed_documents.side_effect = [RuntimeError("rate limited"), RuntimeError("timeout"), [[0.1]]]
+        rate_limiter = mock.Mock()
+
+        self.assertEqual(embed_batch(embeddings, ["game"], rate_limiter, retries=3), [[0.1]])
+        self.assertEqual(rate_limiter.acquire.call_count, 3)
+        self.assertEqual(self.clock.sleeps, [1, 2])
+
+    def test_embed_batch_raises_after_last_retry(self):
+        embeddings = mock.Mock()
+        embeddings.embed_documents.side_effect = RuntimeError("down")
+
+        with self.assertRaises(RuntimeError):
+            embed_batch(embeddings, ["game"], mock.Mock(), retries=2)
+        self.assertEqual(embeddings.embed_documents.call_count, 2)
+        self.assertEqual(self.clock.sleeps, [1])
+
+    def test_rate_limiter_waits_for_the_oldest_call_to_expire(self):
+        rate_limiter = RateLimiter(max_calls=2, period=60.0)
+        rate_limiter.acquire()
+        self.clock.now = 10.0
+        rate_limiter.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+
+        # 세 번째 호출은 첫 호출이 period 밖으로 나갈 때까지 대기
+        rate_limiter.acquire()
+        self.assertEqual(self.clock.sleeps, [50.0])
+        self.assertEqual(self.clock.now, 60.0)
+
+    def test_embed_and_write_flushes_batches_in_order(self):
+        documents = [Document(page_content=f"game {index}", metadata={"appid": index}) for index in range(7)]
+        first_batch_started = threading.Event()
+        release_first_batch = threading.Event()
+
+        class SlowFirstBatchEmbeddings:
+            def embed_documents(self, texts):
+                if texts[0] == "game 0":
+                    first_batch_started.set()
+                    release_first_batch.wait(5)
+                return [[float(text.split()[1])] for text in texts]
+
+        written = []
+
+        def write(batch_end, batch, vectors):
+            written.append((batch_end, [document.metadata["appid"] for document in batch], vectors))
+
+        # 첫 배치를 늦게 끝내서 뒤 배치의 임베딩이 먼저 끝나도 적재는 배치 순서대로 되는지 확인
+        release_later = threading.Timer(0.05, release_first_batch.set)
+        release_later.start()
+        self.addCleanup(release_later.cancel)
+        rows, seconds = embed_and_write(
+            documents, SlowFirstBatchEmbeddings(), write, batch_size=2, concurrency=2, max_calls_per_minute=100,
+        )
+
+        self.assertTrue(first_batch_started.is_set())
+        self.assertEqual(rows, 7)
+        self.assertEqual([batch_end for batch_end, _, _ in written], [2, 4, 6, 7])
+        self.assertEqual([appids for _, appids, _ in written], [[0, 1], [2, 3], [4, 5], [6]])
+        self.assertEqual(written[1][2], [[2.0], [3.0]])
+
+    def test_embed_and_write_resumes_from_offset(self):
+        documents = [Document(page_content=f"game {index}", metadata={"appid": index}) for index in range(5)]
+        embeddings = mock.Mock()
+        embeddings.embed_documents.side_effect = lambda texts: [[0.0]] * len(texts)
+        rows_done = []
+
+        rows, _ = embed_and_write(
+            documents, embeddings, lambda batch_end, batch, vectors: rows_done.append(batch_end),
+            batch_size=2, concurrency=1, max_calls_per_minute=100, offset=3,
+        )
+
+        self.assertEqual(rows, 2)
+        self.assertEqual(rows_done, [5])
+        self.assertEqual(embeddings.embed_documents.call_args.args[0], ["game 3", "game 4"])
+
+
+
+class IncrementalSyncCheckpointTests(TestCase):
+    """
+    증분 동기화 후 전체 적재가 같은 CSV를 다시 적재하지 않는지 확인
+    """
+    def setUp(self):
+        fd, self.csv_path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("appid,name,genres\n570,Dota 2,Action\n10,Counter-Strike,Action\n")
+        self.addCleanup(os.remove, self.csv_path)
+        self.embeddings = DeterministicFakeEmbedding(size=4)
+
+        # 내용이 모두 manifest와 같아 다시 임베딩하거나 삭제할 게임이 없는 상태
+        for document in build_documents(pd.read_csv(self.csv_path)):
+            EmbeddingManifest.objects.create(
+                appid=document.metadata["appid"], content_hash=content_hash(document.page_content, "fake"),
+            )
+        IngestionCheckpoint.objects.create(name=ingestion.COLLECTION_NAME, source_hash="old", rows_done=1)
+
+        patcher = mock.patch.object(ingestion, "open_collection", return_value="collection")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sync_stamps_checkpoint_so_full_ingestion_is_skipped(self):
+        stats = run_incremental_sync(embeddings=self.embeddings, model_name="fake", csv_path=self.csv_path)
+        self.assertEqual((stats["unchanged"], stats["added"], stats["deleted"]), (2, 0, 0))
+
+        checkpoint = IngestionCheckpoint.objects.get(name=ingestion.COLLECTION_NAME)
+        self.assertEqual((checkpoint.source_hash, checkpoint.rows_done, checkpoint.completed),
+                         (file_hash(self.csv_path), 2, True))
+
+        with mock.patch.object(ingestion, "embed_and_write") as embed_and_write_mock:
+            stats = run_ingestion(embeddings=self.embeddings, model_name="fake", csv_path=self.csv_path)
+        embed_and_write_mock.assert_not_called()
+        self.assertEqual((stats["rows"], stats["resumed_from"]), (0, 2))
+        self.assertEqual(EmbeddingManifest.objects.count(), 2)
+
+    def test_dry_run_leaves_checkpoint_untouched(self):
+        run_incremental_sync(embeddings=self.embeddings, model_name="fake", csv_path=self.csv_path, dry_run=True)
+        self.assertEqual(IngestionCheckpoint.objects.get(name=ingestion.COLLECTION_NAME).source_hash, "old")
+
+
+
+class ChatReadinessAPITests(SimpleTestCase):
+    """
+    인증 없이 호출되는 readiness probe가 DB 오류 내용을 노출하지 않는지 확인
+    """
+    def test_connection_error_returns_generic_reason(self):
+        error = RuntimeError('password authentication failed for user "myuser"')
+        with mock.patch.object(vectorstore, "get_vector_store", side_effect=error), \
+                self.assertLogs("chatmate.vectorstore", level="ERROR") as logs:
+            response = self.client.get("/api/v1/chat/ready/")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {"ready": False, "reason": "벡터 스토어에 연결할 수 없습니다."})
+        self.assertIn("password authentication failed", "\n".join(logs.output))
+
+
+
+class ResponseStreamerTests(SimpleTestCase):
+    """
+    가짜 send로 스트리밍 프레임(스냅샷/delta, seq, 청크 합치기) 확인
+    """
+    def setUp(self):
+        self.frames = []
+
+    async def send(self, text_data):
+        self.frames.append(json.loads(text_data))
+
+    async def test_snapshot_protocol_sends_full_response_every_chunk(self):
+        streamer = ResponseStreamer(self.send, SNAPSHOT_PROTOCOL, flush_interval=1, min_chunk_chars=100)
+        for chunk in ["안녕", "하세요", ""]:
+            await streamer.push(chunk)
+        self.assertEqual(await streamer.close(), "안녕하세요")
+        await streamer.send_final(message_id=7)
+
+        self.assertEqual(self.frames, [
+            {"response": "안녕", "is_streaming": True},
+            {"response": "안녕하세요", "is_streaming": True},
+            {"response": "안녕하세요", "is_streaming": False, "message_id": 7},
+        ])
+
+    async def test_small_chunks_are_coalesced_after_flush_interval(self):
+        streamer = ResponseStreamer(self.send, DELTA_PROTOCOL, flush_interval=0.01, min_chunk_chars=100)
+        for chunk in ["a", "b", "c"]:
+            await streamer.push(chunk)
+        self.assertEqual(self.frames, [])
+
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.frames, [{"delta": "abc", "seq": 3, "is_streaming": True}])
+
+    async def test_seq_counts_chunks_not_frames(self):
+        streamer = ResponseStreamer(self.send, DELTA_PROTOCOL, flush_interval=10, min_chunk_chars=4)
+        for chunk in ["ab", "cdef", "ghij"]:
+            await streamer.push(chunk)
+        await streamer.close()
+        await streamer.send_final(message_id=1)
+
+        # 두 청크를 합친 첫 프레임 다음 seq는 1이 아니라 2, 이어서 3
+        self.assertEqual(self.frames, [
+            {"delta": "abcdef", "seq": 2, "is_streaming": True},
+            {"delta": "ghij", "seq": 3, "is_streaming": True},
+            {"is_streaming": False, "seq": 3, "length": 10, "message_id": 1},
+        ])
+
+    async def test_close_flushes_pending_delta_and_cancels_timer(self):
+        streamer = ResponseStreamer(self.send, DELTA_PROTOCOL, flush_interval=10, min_chunk_chars=100)
+        await streamer.push("남은 ")
+        await streamer.push("응답")
+
+        self.assertEqual(await streamer.close(), "남은 응답")
+        self.assertIsNone(streamer._timer)
+        self.assertEqual(self.frames, [{"delta": "남은 응답", "seq": 2, "is_streaming": True}])
+        self.assertEqual(streamer.frames, 1)
+
+    async def test_discard_drops_pending_delta(self):
+        streamer = ResponseStreamer(self.send, DELTA_PROTOCOL, flush_interval=0.01, min_chunk_chars=100)
+        await streamer.push("버려질 응답")
+        streamer.discard()
+
+        await asyncio.sleep(0.05)
+        await streamer.flush()
+        self.assertEqual(self.frames, [])
+
+
+
+class GenerationSchedulerTests(SimpleTestCase):
+    """
+    워커 단위 동시 생성 제한, 대기열 한도, 취소 집계 확인
+    """
+    async def hold_slot(self, scheduler, entered, release):
+        async with scheduler.slot():
+            entered.set()
+            await release.wait()
+
+    async def test_rejects_when_queue_is_full(self):
+        scheduler = GenerationScheduler(max_concurrent=1, max_queued=1)
+        release = asyncio.Event()
+        running = asyncio.create_task(self.hold_slot(scheduler, asyncio.Event(), release))
+        waiting = asyncio.create_task(self.hold_slot(scheduler, asyncio.Event(), release))
+        await asyncio.sleep(0)
+        self.assertEqual((scheduler.active, scheduler.queued), (1, 1))
+
+        with self.assertRaises(SchedulerBusy):
+            async with scheduler.slot():
+                pass
+        self.assertEqual(scheduler.stats()["rejected"], 1)
+
+        release.set()
+        await asyncio.gather(running, waiting)
+        stats = scheduler.stats()
+        self.assertEqual((stats["active"], stats["queue_depth"], stats["completed"]), (0, 0, 2))
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        scheduler = GenerationScheduler(max_concurrent=1, max_queued=4)
+        release = asyncio.Event()
+        running = asyncio.create_task(self.hold_slot(scheduler, asyncio.Event(), release))
+        waiting = asyncio.create_task(self.hold_slot(scheduler, asyncio.Event(), release))
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.queued, 1)
+
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual((scheduler.queued, scheduler.stats_counter["cancelled"]), (0, 1))
+
+        # 취소된 대기자가 슬롯을 가져가지 않으므로 다음 생성이 바로 실행됨
+        release.set()
+        await running
+        entered = asyncio.Event()
+        await self.hold_slot(scheduler, entered, release)
+        self.assertTrue(entered.is_set())
+        self.assertEqual((scheduler.active, scheduler.stats_counter["completed"]), (0, 2))
+
+
+class SessionGenerationsTests(SimpleTestCase):
+    """
+    연결 하나의 진행 중인 생성 작업 교체/취소 확인
+    """
+    async def wait_forever(self):
+        await asyncio.Event().wait()
+
+    async def test_oldest_task_is_cancelled_past_max_in_flight(self):
+        generations = SessionGenerations(max_in_flight=2)
+        self.assertEqual(generations.start(("message", 1), self.wait_forever()), 0)
+        self.assertEqual(generations.start(("message", 2), self.wait_forever()), 0)
+        first = generations.tasks[("message", 1)]
+
+        self.assertEqual(generations.start(("message", 3), self.wait_forever()), 1)
+        await asyncio.sleep(0)
+        self.assertTrue(first.cancelled())
+        self.assertEqual(list(generations.tasks), [("message", 2), ("message", 3)])
+        generations.cancel_all()
+
+    async def test_same_key_replaces_running_task(self):
+        generations = SessionGenerations(max_in_flight=2)
+        generations.start(("message", 1), self.wait_forever())
+        generations.start(("modify", 10), self.wait_forever())
+        original = generations.tasks[("modify", 10)]
+
+        # 같은 메시지를 다시 수정하면 이전 수정 생성만 취소되고 다른 메시지의 생성은 유지
+        self.assertEqual(generations.start(("modify", 10), self.wait_forever()), 1)
+        await asyncio.sleep(0)
+        self.assertTrue(original.cancelled())
+        self.assertIsNot(generations.tasks[("modify", 10)], original)
+        self.assertFalse(generations.tasks[("message", 1)].done())
+
+        # 교체된 작업의 종료 콜백이 새 작업을 목록에서 지우지 않음
+        self.assertEqual(len(generations.tasks), 2)
+        self.assertTrue(generations.cancel(("modify", 10)))
+        self.assertFalse(generations.cancel(("modify", 10)))
+        generations.cancel_all()
+
+
+async def fake_chatbot_message(user_input, session_id, tag=None, appid=None, preferred_games=None):
+    for chunk in ["생성 워커", "에서 ", "보낸 ", "응답입니다."]:
+        await asyncio.sleep(0)
+        yield chunk
+
+
+class ChannelGenerationWorkerTests(ChatConsumerTestCase):
+    """
+    웹소켓 연결(ChatConsumer)과 생성 워커(GenerationWorker)를 메모리 채널 레이어로 연결한 종단 간 테스트
+    """
+    def setUp(self):
+        super().setUp()
+        self.patch_chat_generation("channels", fake_chatbot_message)
+
+    async def make_worker(self):
+        worker = workers.GenerationWorker()
+        worker.channel_layer = get_channel_layer()
+        worker.channel_name = await worker.channel_layer.new_channel()
+        return worker
+
+    async def test_generation_runs_in_worker_and_streams_back(self):
+        worker = Worker(
+            application=workers.generation_worker_application(),
+            channels=[consumers.CHAT_GENERATION["channel"]],
+            channel_layer=get_channel_layer(),
+        )
+        worker_task = asyncio.create_task(worker.handle())
+
+        communicator = await self.connect()
+        await communicator.send_json_to({"message": "추천해 줘"})
+        self.assertEqual((await communicator.receive_json_from())["status"], "processing")
+
+        deltas = []
+        while True:
+            frame = await communicator.receive_json_from(timeout=5)
+            if not frame["is_streaming"]:
+                break
+            deltas.append(frame["delta"])
+
+        self.assertEqual("".join(deltas), "생성 워커에서 보낸 응답입니다.")
+        saved = await database_sync_to_async(ChatMessage.objects.get)(pk=frame["message_id"])
+        self.assertEqual(saved.chatbot_message, "생성 워커에서 보낸 응답입니다.")
+
+        await communicator.disconnect()
+        worker_task.cancel()
+
+    async def test_cancel_before_started_reaches_worker(self):
+        started = asyncio.Event()
+
+        async def endless_chatbot_message(user_input, session_id, tag=None, appid=None, preferred_games=None):
+            started.set()
+            yield "앞부분 "
+            await asyncio.Event().wait()
+
+        communicator = await self.connect()
+        await communicator.send_json_to({"message": "추천해 줘"})
+        self.assertEqual((await communicator.receive_json_from())["status"], "processing")
+
+        # 워커가 작업을 받기 전에 연결이 끊기면 (스트림 버퍼 미사용) worker_channel을 모르므로 작업 채널로 취소가 전달됨
+        with mock.patch.dict(consumers.CHAT_STREAM_BUFFER, {"enabled": False}), \
+                mock.patch.object(generation, "get_chatbot_message", endless_chatbot_message):
+            await communicator.disconnect()
+
+            worker = await self.make_worker()
+            channel = consumers.CHAT_GENERATION["channel"]
+            await worker.dispatch(await worker.channel_layer.receive(channel))
+            task = next(iter(worker.tasks.values()))
+            await asyncio.wait_for(started.wait(), 5)
+
+            cancel = await asyncio.wait_for(worker.channel_layer.receive(channel), 5)
+            self.assertEqual(cancel["type"], "generation.cancel")
+            await worker.dispatch(cancel)
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        self.assertEqual(worker.tasks, {})
+        self.assertFalse(await database_sync_to_async(ChatMessage.objects.exists)())
+
+    async def test_broadcast_cancel_is_recorded_before_generate(self):
+        worker = await self.make_worker()
+
+        # 다른 워커가 받은 작업의 취소는 그룹으로 다시 알리고, 모든 워커가 기록해 두었다가 작업을 시작하지 않음
+        await worker.generation_cancel({"type": "generation.cancel", "generation_id": "g1", "broadcast": True})
+        self.assertIn("g1", worker.cancelled)
+        await worker.channel_layer.group_add(workers.CANCEL_GROUP, worker.channel_name)
+        await worker.generation_cancel({"type": "generation.cancel", "generation_id": "g2", "broadcast": True})
+        self.assertEqual(await worker.channel_layer.receive(worker.channel_name),
+                         {"type": "generation.cancel", "generation_id": "g2"})
+
+        await worker.generate({"type": "generate", "generation_id": "g1"})
+        self.assertEqual(worker.tasks, {})
+        self.assertNotIn("g1", worker.cancelled)
+
+
+class ResumableStreamTests(ChatConsumerTestCase):
+    """
+    응답 생성 중 연결이 끊긴 뒤 재연결하여 generation_id와 마지막 seq로 나머지 응답을 이어받는지 확인
+    """
+    def setUp(self):
+        super().setUp()
+        self.release = asyncio.Event()
+        self.calls = []
+
+        async def gated_chatbot_message(user_input, session_id, tag=None, appid=None, preferred_games=None):
+            self.calls.append(user_input)
+            yield "앞부분 "
+            await self.release.wait()
+            yield "뒷부분"
+
+        self.patch_chat_generation("local", gated_chatbot_message)
+        self.start_patches(mock.patch.dict(consumers.CHAT_STREAM_BUFFER, {"enabled": True}))
+
+    async def test_resume_after_reconnect_without_regenerating(self):
+        communicator = await self.connect()
+        await communicator.send_json_to({"message": "추천해 줘"})
+        generation_id = (await communicator.receive_json_from())["generation_id"]
+        first = await communicator.receive_json_from(timeout=5)
+        self.assertEqual((first["delta"], first["seq"]), ("앞부분 ", 1))
+
+        # 응답 도중 연결이 끊겨도 생성은 계속됨
+        await communicator.disconnect()
+        self.release.set()
+
+        communicator = await self.connect()
+        await communicator.send_json_to({"type": "resume", "generation_id": generation_id, "last_seq": first["seq"]})
+        rest = await communicator.receive_json_from(timeout=5)
+        final = await communicator.receive_json_from(timeout=5)
+        await communicator.disconnect()
+
+        self.assertEqual((rest["delta"], rest["seq"]), ("뒷부분", 2))
+        self.assertFalse(final["is_streaming"])
+        saved = await database_sync_to_async(ChatMessage.objects.get)(pk=final["message_id"])
+        self.assertEqual(saved.chatbot_message, "앞부분 뒷부분")
+        self.assertEqual(self.calls, ["추천해 줘"])
+
+    async def test_resume_unknown_generation_reports_expired(self):
+        communicator = await self.connect()
+        await communicator.send_json_to({"type": "resume", "generation_id": "missing", "last_seq": 0})
+        self.assertEqual((await communicator.receive_json_from(timeout=5))["status"], "expired")
+        await communicator.disconnect()
+
+    async def test_resume_rejects_invalid_last_seq(self):
+        communicator = await self.connect()
+        for last_seq in ("abc", None, -1):
+            await communicator.send_json_to({"type": "resume", "generation_id": "missing", "last_seq": last_seq})
+            frame = await communicator.receive_json_from(timeout=5)
+            self.assertEqual(frame["status"], "error")
+        await communicator.disconnect()
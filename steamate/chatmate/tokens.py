@@ -0,0 +1,73 @@
+import logging
+import threading
+from collections import defaultdict, deque
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+# tiktoken 인코더 (처음 사용할 때 로드, 사용할 수 없으면 False)
+_encoding = None
+
+# 메시지마다 역할/구분자로 추가되는 토큰 수 (OpenAI chat 포맷 기준 근사치)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def count_tokens(text):
+    """
+    로컬 토크나이저로 계산한 토큰 수 (tiktoken을 쓸 수 없으면 UTF-8 4바이트당 1토큰으로 근사)
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return max(1, len(text.encode("utf-8")) // 4)
+
+
+def count_message_tokens(message):
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+class PromptTokenMeter(BaseCallbackHandler):
+    """
+    LLM에 전달되는 프롬프트 토큰 수를 단계(metadata["stage"])별로 기록하는 콜백
+    chain 호출 시 config={"callbacks": [meter], "metadata": {"stage": "..."}}로 연결
+    """
+    # 토큰 계산은 가벼우므로 이벤트 루프에서 바로 실행
+    run_inline = True
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, metadata=None, **kwargs):
+        stage = (metadata or {}).get("stage", "unknown")
+        tokens = sum(count_message_tokens(message) for batch in messages for message in batch)
+        with self._lock:
+            self._samples[stage].append(tokens)
+        logger.debug(f"prompt tokens {stage}: {tokens}")
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def stats(self):
+        result = {}
+        with self._lock:
+            for stage, samples in self._samples.items():
+                values = sorted(samples)
+                if not values:
+                    continue
+                result[stage] = {
+                    "count": len(values),
+                    "avg": sum(values) / len(values),
+                    "p95": values[max(0, int(round(0.95 * len(values))) - 1)],
+                    "max": values[-1],
+                }
+        return result
@@ -1,10 +1,13 @@
 from django.urls import path
-from .views import ChatSessionAPIView, ChatMessageAPIView
+from .views import ChatSessionAPIView, ChatMessageAPIView, EmbeddingCacheStatsAPIView, ChatPipelineStatsAPIView, ChatReadinessAPIView
 
 
 urlpatterns = [
     path('', ChatSessionAPIView.as_view()),
     path('<int:session_id>/', ChatSessionAPIView.as_view()),
     path('<int:session_id>/message/', ChatMessageAPIView.as_view()),
-    path('<int:session_id>/message/<int:message_id>/', ChatMessageAPIView.as_view())
+    path('<int:session_id>/message/<int:message_id>/', ChatMessageAPIView.as_view()),
+    path('embedding-cache-stats/', EmbeddingCacheStatsAPIView.as_view()),
+    path('pipeline-stats/', ChatPipelineStatsAPIView.as_view()),
+    path('ready/', ChatReadinessAPIView.as_view()),
 ]
\ No newline at end of file
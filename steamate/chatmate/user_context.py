@@ -0,0 +1,134 @@
+import json
+import logging
+import threading
+from cachetools import TTLCache
+from django.conf import settings
+from account.models import UserLibraryGame, UserPreferredGame, UserPreferredTag
+from .models import ChatSession
+
+logger = logging.getLogger(__name__)
+
+
+def load_user_context(user_id):
+    """
+    챗봇 프롬프트에 필요한 사용자 정보를 DB에서 조회 (관계 테이블을 JOIN한 쿼리 3번)
+    - tags: 선호 태그 이름
+    - appid: 라이브러리 게임 appid (플레이 시간 내림차순)
+    - game: "제목 (플레이 시간: N분) (appid: N)" 형식의 라이브러리 게임 목록
+    - preferred_games: 선호 게임 제목
+    """
+    tags = list(UserPreferredTag.objects.filter(user_id=user_id).values_list('tag__name', flat=True))
+    library = list(
+        UserLibraryGame.objects.filter(user_id=user_id)
+        .order_by('-playtime')
+        .values_list('game__appid', 'game__title', 'playtime')
+    )
+    preferred_games = list(UserPreferredGame.objects.filter(user_id=user_id).values_list('game__title', flat=True))
+    return {
+        'tags': tags,
+        'appid': [appid for appid, _, _ in library],
+        'game': [f"{title} (플레이 시간: {playtime}분) (appid: {appid})" for appid, title, playtime in library],
+        'preferred_games': preferred_games,
+    }
+
+
+class UserContextCache:
+    """
+    사용자별 챗봇 컨텍스트 캐시
+    redis_url이 있으면 워커 간에 공유되는 Redis에만 저장하여 다른 프로세스(Celery 등)에서 무효화해도 바로 반영되고,
+    없으면 프로세스 로컬 TTLCache를 사용 (단일 워커 개발 환경용, 다른 프로세스의 무효화는 ttl 후 반영)
+    """
+    redis_prefix = "chatmate:user_context:"
+
+    def __init__(self, loader, maxsize=10000, ttl=600, redis_url=None):
+        self.loader = loader
+        self.ttl = ttl
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._redis_url = redis_url
+        self._redis = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def redis(self):
+        if self._redis is None and self._redis_url:
+            import redis
+            self._redis = redis.Redis.from_url(self._redis_url)
+        return self._redis
+
+    def _get_cached(self, user_id):
+        if not self.redis:
+            with self._lock:
+                return self._local.get(user_id)
+        try:
+            value = self.redis.get(f"{self.redis_prefix}{user_id}")
+        except Exception as e:
+            logger.warning(f"사용자 컨텍스트 Redis 캐시 조회 실패: {e}")
+            return None
+        return json.loads(value) if value else None
+
+    def _set_cached(self, user_id, context):
+        if not self.redis:
+            with self._lock:
+                self._local[user_id] = context
+            return
+        try:
+            self.redis.setex(f"{self.redis_prefix}{user_id}", self.ttl, json.dumps(context))
+        except Exception as e:
+            logger.warning(f"사용자 컨텍스트 Redis 캐시 저장 실패: {e}")
+
+    def get(self, user_id):
+        context = self._get_cached(user_id)
+        if context is not None:
+            self.hits += 1
+            return context
+        self.misses += 1
+        context = self.loader(user_id)
+        self._set_cached(user_id, context)
+        return context
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._local.pop(user_id, None)
+        if not self.redis:
+            return
+        try:
+            self.redis.delete(f"{self.redis_prefix}{user_id}")
+        except Exception as e:
+            logger.warning(f"사용자 컨텍스트 Redis 캐시 삭제 실패: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._local),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+user_context_cache = UserContextCache(
+    load_user_context,
+    **getattr(settings, "CHAT_USER_CONTEXT_CACHE", {}),
+)
+
+
+def invalidate_user_context(user_id):
+    """
+    라이브러리 동기화나 선호 게임/태그 변경 후 호출하여 다음 연결에서 새로 조회하도록 함
+    """
+    user_context_cache.invalidate(user_id)
+
+
+def load_chat_context(session_id, user):
+    """
+    웹소켓 연결 시 한 번의 동기 호출로 권한 확인과 사용자 컨텍스트 조회를 처리
+    세션이 없거나 소유자가 아니면 사용자 정보를 조회하지 않고 (None, None) 반환
+    """
+    if user.is_anonymous:
+        return None, None
+    session = ChatSession.objects.filter(pk=session_id).first()
+    if session is None or session.user_id_id != user.id:
+        return None, None
+    return session, user_context_cache.get(user.id)
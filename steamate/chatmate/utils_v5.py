@@ -1,15 +1,20 @@
 from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
-from .prompt import decompose_query, generate_pseudo_document
-from .vectorstore import initialize_vectorstore
-from .history import get_session_history
-from config.settings import OPENAI_API_KEY, TAVILY_API_KEY
+from .prompt import adecompose_query, agenerate_pseudo_document, asummarize_history
+from .vectorstore import get_vector_store
+from .history import get_prompt_history, history_store, collect_unsummarized_messages, message_fingerprint
+from .tokens import PromptTokenMeter
+from .response_cache import ResponseCache, LatencyRecorder, make_cache_key
+from config.settings import OPENAI_API_KEY, TAVILY_API_KEY, CHAT_RESPONSE_CACHE, CHAT_SPECULATIVE_ROUTING, CHAT_HISTORY_WINDOW
+from langchain_core.messages import get_buffer_string
 from langchain_core.runnables import RunnableWithMessageHistory
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from .prompt import main_prompt, choice_prompt, game_info_agent_prompt, agent_prompt
 from langchain_community.tools import TavilySearchResults
+import asyncio
 import logging
 import sys
+import time
 
 # 로깅 설정
 logging.basicConfig(
@@ -49,9 +54,6 @@ choice_chat = ChatOpenAI(
 # 파서 설정
 str_outputparser = StrOutputParser()
 
-# 벡터 스토어 초기화
-vector_store = initialize_vectorstore()
-
 # 게임 정보 검색 도구 생성
 search = TavilySearchResults(
     name="game_info_search",
@@ -81,37 +83,216 @@ main_chain = main_prompt | chat | str_outputparser
 choice_chain = choice_prompt | choice_chat
 
 agent_chain = agent_prompt | chat | str_outputparser
-# 체인을 묶어 기억해줄 객체
+# 체인을 묶어 기억해줄 객체 (프롬프트에는 토큰 예산에 맞춰 자른 대화 내역만 전달)
 chain_with_history = RunnableWithMessageHistory(
     main_chain,
-    get_session_history,
+    get_prompt_history,
     input_messages_key="input",
     history_messages_key="chat_history",
 )
 
 agent_with_history = RunnableWithMessageHistory(
     agent_chain,
-    get_session_history,
+    get_prompt_history,
     input_messages_key="input",
     history_messages_key="chat_history",
 )
 
+# 라우팅/검색 질의 생성 결과 캐시와 첫 토큰까지의 시간(TTFT) 기록
+response_cache = ResponseCache(**CHAT_RESPONSE_CACHE)
+ttft_recorder = LatencyRecorder()
+
+# 라우팅과 가상 문서 생성을 동시에 실행하는 모드, 결과별 횟수를 기록하여 효과를 확인
+speculative_routing = CHAT_SPECULATIVE_ROUTING
+speculation_stats = {"recommendation": 0, "search": 0, "cancelled": 0}
+
+# 단계별 프롬프트 토큰 수 기록
+prompt_token_meter = PromptTokenMeter()
+
+# 실행 중인 대화 요약 작업 (가비지 컬렉션으로 취소되지 않도록 참조 유지)
+summary_tasks = set()
+
+
+def stage_config(stage):
+    """
+    LLM 호출에 단계 이름을 붙여 프롬프트 토큰 수를 단계별로 기록하는 config
+    """
+    return {"callbacks": [prompt_token_meter], "metadata": {"stage": stage}}
+
+
+async def route_needs_search(user_input):
+    """
+    게임 정보 검색(Tavily 에이전트)이 필요한 질문인지 판단, 결과는 입력 텍스트 기준으로 캐시
+    반환값: (검색 필요 여부, 캐시 적중 여부)
+    """
+    key = make_cache_key(user_input)
+    cached = response_cache.get("route", key)
+    if cached is not None:
+        return cached, True
+
+    choice_response = await choice_chain.ainvoke({"input": user_input}, config=stage_config("route"))
+    needs_search = bool(choice_response.additional_kwargs.get('tool_calls'))
+    response_cache.set("route", key, needs_search)
+    return needs_search, False
+
+
+async def build_sub_queries(user_input, tag, preferred_games, history_messages):
+    """
+    가상 문서 생성 -> 서브 쿼리 분해 결과를 캐시
+    가상 문서 프롬프트는 대화 내역도 참고하므로 키에 대화 내역을 포함 (첫 메시지끼리 주로 적중)
+    반환값: (서브 쿼리 목록, 캐시 적중 여부)
+    """
+    history = get_buffer_string(history_messages)
+    key = make_cache_key(user_input, tag, preferred_games, history)
+    cached = response_cache.get("sub_queries", key)
+    if cached is not None:
+        return list(cached), True
+
+    pseudo_doc = await agenerate_pseudo_document(
+        user_input, chat.with_config(**stage_config("pseudo_doc")), str_outputparser, tag, preferred_games, history,
+    )
+    sub_queries = await adecompose_query(pseudo_doc, chat.with_config(**stage_config("decompose")), str_outputparser)
+    response_cache.set("sub_queries", key, tuple(sub_queries))
+    return sub_queries, False
+
+
+async def speculative_route(user_input, tag, preferred_games, history_messages):
+    """
+    라우팅 호출과 추천 경로의 서브 쿼리 생성을 동시에 시작하고, 라우팅 결과에 따라 진 쪽을 취소
+    추천 경로(흔한 경우)는 라우팅 왕복 시간만큼 첫 토큰이 빨라지고,
+    검색 경로는 이미 시작된 가상 문서 생성 비용만 버려짐
+    반환값: (검색 필요 여부, 라우팅 캐시 적중 여부, 추천 경로면 build_sub_queries 결과 아니면 None)
+    """
+    sub_queries_task = asyncio.create_task(build_sub_queries(user_input, tag, preferred_games, history_messages))
+    try:
+        needs_search, route_hit = await route_needs_search(user_input)
+    except BaseException:
+        sub_queries_task.cancel()
+        raise
+
+    if not needs_search:
+        speculation_stats["recommendation"] += 1
+        return needs_search, route_hit, await sub_queries_task
+
+    speculation_stats["search"] += 1
+    if sub_queries_task.done():
+        # 이미 끝난 작업의 예외는 사용하지 않더라도 회수해야 경고가 남지 않음
+        if not sub_queries_task.cancelled():
+            sub_queries_task.exception()
+    else:
+        sub_queries_task.cancel()
+        speculation_stats["cancelled"] += 1
+    return needs_search, route_hit, None
+
+
+def get_speculation_stats():
+    routed = speculation_stats["recommendation"] + speculation_stats["search"]
+    return {
+        "enabled": speculative_routing,
+        **speculation_stats,
+        # 추측 실행이 그대로 쓰인 비율 (낮으면 모드를 끄는 편이 비용상 유리)
+        "win_rate": speculation_stats["recommendation"] / routed if routed else 0.0,
+    }
+
+
+async def retrieve_documents(queries, k, exclude_appids):
+    """
+    여러 검색어를 embed_documents 한 번으로 임베딩한 뒤 pgvector 검색을 동시에 실행
+    결과는 검색어 순서를 유지하며 appid 기준으로 중복 제거 (appid가 없으면 문서 내용 기준)
+    """
+    queries = [query for query in queries if query and query.strip()]
+    if not queries:
+        return []
+
+    # 첫 호출에서는 PGVector 연결을 만들기 때문에 이벤트 루프 밖에서 가져옴
+    vector_store = await asyncio.to_thread(get_vector_store)
+    vectors = await vector_store.embeddings.aembed_documents(queries)
+    search_filter = {"appid": {"$nin": exclude_appids}}
+    results = await asyncio.gather(*(
+        vector_store.asimilarity_search_by_vector(vector, k=k, filter=search_filter)
+        for vector in vectors
+    ))
+
+    documents = {}
+    for docs in results:
+        for doc in docs:
+            key = doc.metadata.get("appid", doc.page_content)
+            documents.setdefault(str(key), doc)
+    return list(documents.values())
+
 
 async def get_chatbot_message(user_input, session_id, tag, appid, preferred_games):
-    # 1. Get chat history
-    chat_history = get_session_history(session_id)
+    """
+    응답을 스트리밍하면서 첫 청크까지의 시간을 캐시 적중 여부별로 기록
+    """
+    start = time.perf_counter()
+    cache_state = {"hit": True, "speculative": speculative_routing}
+    first_chunk = True
+    async for chunk in generate_chatbot_message(user_input, session_id, tag, appid, preferred_games, cache_state):
+        if first_chunk:
+            first_chunk = False
+            label = "cache_hit" if cache_state["hit"] else "cache_miss"
+            if cache_state["speculative"]:
+                label = f"speculative_{label}"
+            ttft = time.perf_counter() - start
+            ttft_recorder.record(label, ttft)
+            logger.info(f"TTFT {ttft * 1000:.0f}ms ({label})")
+        yield chunk
+
+    # 응답이 끝난 뒤 프롬프트 창 밖으로 밀려난 대화를 백그라운드에서 요약
+    schedule_history_summary(session_id)
+
+
+def schedule_history_summary(session_id):
+    if not CHAT_HISTORY_WINDOW["summarize"]:
+        return
+    task = asyncio.create_task(summarize_older_history(session_id))
+    summary_tasks.add(task)
+    task.add_done_callback(summary_tasks.discard)
+
+
+async def summarize_older_history(session_id):
+    """
+    아직 요약되지 않은 밀려난 메시지가 summary_min_messages개 이상이면 기존 요약에 합쳐 저장
+    """
+    try:
+        previous_summary, messages = await asyncio.to_thread(collect_unsummarized_messages, session_id)
+        if len(messages) < CHAT_HISTORY_WINDOW["summary_min_messages"]:
+            return
+        summary = await asummarize_history(
+            previous_summary, messages, chat.with_config(**stage_config("summary")), str_outputparser,
+        )
+        await asyncio.to_thread(history_store.set_summary, session_id, {
+            "text": summary,
+            "last": message_fingerprint(messages[-1]),
+        })
+    except Exception as e:
+        logger.warning(f"대화 요약 중 오류 (session {session_id}): {e}")
+
+
+async def generate_chatbot_message(user_input, session_id, tag, appid, preferred_games, cache_state):
+    # LLM 호출과 벡터 검색은 모두 ainvoke로 실행하여 다른 웹소켓 연결의 이벤트 루프를 막지 않음
+    # 1. Get chat history (토큰 예산 안의 최근 대화 + 이전 대화 요약)
+    history_messages = await get_prompt_history(session_id).aget_messages()
     
-    choice_response = choice_chain.invoke({"input": user_input})
+    planned = None
+    if cache_state["speculative"]:
+        needs_search, route_hit, planned = await speculative_route(user_input, tag, preferred_games, history_messages)
+    else:
+        needs_search, route_hit = await route_needs_search(user_input)
+    cache_state["hit"] = route_hit
     
-    if choice_response.additional_kwargs.get('tool_calls'):
+    if needs_search:
         
+        vector_store = await asyncio.to_thread(get_vector_store)
         retriever = vector_store.as_retriever(search_kwargs={"k": 3})
         
-        context = retriever.invoke(user_input) 
-        
-        chat_history_message = chat_history.messages
+        context = await retriever.ainvoke(user_input) 
         
-        agent_response = agent_executor.invoke({"input": user_input, "chat_history": chat_history_message})
+        agent_response = await agent_executor.ainvoke(
+            {"input": user_input, "chat_history": history_messages},
+            config=stage_config("agent"),
+        )
         
         
         async for chunk in agent_with_history.astream(
@@ -120,32 +301,23 @@ async def get_chatbot_message(user_input, session_id, tag, appid, preferred_game
                 "context": context,
                 "agent_response": agent_response,
             },
-            config={"configurable": {"session_id": session_id}}
+            config={"configurable": {"session_id": session_id}, **stage_config("agent_answer")}
         ):
             yield chunk
     else:
-        # 5. 스트리밍 응답 생성 및 yield# 2. Generate pseudo document
-        pseudo_doc = generate_pseudo_document(user_input, chat, str_outputparser, tag, preferred_games, chat_history)
-        # 3. Decompose the generated pseudo document into sub-queries
-        sub_queries = decompose_query(pseudo_doc, chat, str_outputparser)
-        # 4. Perform search for each sub-query
-        all_contexts = []
-
-        # 검색 파라미터 설정
-        retriever = vector_store.as_retriever(search_kwargs={"k": 8, "filter": {"appid": {"$nin": appid}}})
-        
-
-        # Search based on sub-queries
-        for sub_query in sub_queries:
-            sub_results = retriever.invoke(sub_query)
-            all_contexts.extend(sub_results)
-        
-        all_contexts.extend(retriever.invoke(user_input))
+        # 2~3. 가상 문서 생성 후 서브 쿼리로 분해 (같은 입력/취향이면 캐시된 결과 사용)
+        if planned is None:
+            planned = await build_sub_queries(user_input, tag, preferred_games, history_messages)
+        sub_queries, sub_queries_hit = planned
+        cache_state["hit"] = route_hit and sub_queries_hit
+        # 4. 서브 쿼리와 원문 입력을 한 번에 임베딩하고 동시에 검색
+        all_contexts = await retrieve_documents([*sub_queries, user_input], k=8, exclude_appids=appid)
 
-        # 4. 검색 결과 통합 및 중복 제거 (page_content 한 번만 접근)
-        context = "\n".join({doc.page_content for doc in all_contexts})
+        # 검색 결과 통합 (retrieve_documents에서 appid 기준으로 중복 제거됨)
+        context = "\n".join(doc.page_content for doc in all_contexts)
     
     
+        # 5. 스트리밍 응답 생성 및 yield
         async for chunk in chain_with_history.astream(
             {
                 "input": user_input,
@@ -153,6 +325,6 @@ async def get_chatbot_message(user_input, session_id, tag, appid, preferred_game
                 "tag": ", ".join(tag),
                 "preferred_games": ", ".join(preferred_games),
             },
-            config={"configurable": {"session_id": session_id}}
+            config={"configurable": {"session_id": session_id}, **stage_config("main")}
         ):
-            yield chunk
\ No newline at end of file
+            yield chunk
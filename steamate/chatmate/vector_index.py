@@ -0,0 +1,156 @@
+from django.conf import settings
+from django.db import connection
+
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+COLLECTION_NAME = "games_collection"
+HNSW_INDEX_NAME = "ix_langchain_pg_embedding_hnsw"
+IVFFLAT_INDEX_NAME = "ix_langchain_pg_embedding_ivfflat"
+APPID_INDEX_NAME = "ix_langchain_pg_embedding_appid"
+APPID_COLUMN_INDEX_NAME = "ix_langchain_pg_embedding_appid_int"
+
+
+def get_index_options():
+    """
+    settings.PGVECTOR_INDEX에 기본값을 채워 반환
+    """
+    options = {
+        "method": "hnsw",
+        "dimensions": 1536,
+        "hnsw_m": 16,
+        "hnsw_ef_construction": 64,
+        "ivfflat_lists": 100,
+    }
+    options.update(getattr(settings, "PGVECTOR_INDEX", {}))
+    return options
+
+
+def embedding_table_exists(cursor):
+    cursor.execute("SELECT to_regclass(%s)", [EMBEDDING_TABLE])
+    return cursor.fetchone()[0] is not None
+
+
+def ensure_embedding_dimensions(cursor, dimensions):
+    """
+    langchain이 만든 embedding 컬럼은 차원 없는 vector 타입이라 HNSW/IVFFlat 인덱스를 만들 수 없음
+    모든 행이 같은 차원이면 vector(dimensions)로 고정
+    """
+    cursor.execute("""
+        SELECT atttypmod FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attname = 'embedding'
+    """, [EMBEDDING_TABLE])
+    typmod = cursor.fetchone()[0]
+    if typmod == dimensions:
+        return False
+    if typmod not in (-1, None):
+        raise ValueError(f"embedding 컬럼 차원({typmod})이 설정({dimensions})과 다릅니다.")
+
+    cursor.execute(f"ALTER TABLE {EMBEDDING_TABLE} ALTER COLUMN embedding TYPE vector({int(dimensions)})")
+    return True
+
+
+def create_appid_index(cursor):
+    """
+    cmetadata->>'appid' 조회를 위한 B-tree 표현식 인덱스
+    """
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS {APPID_INDEX_NAME}
+        ON {EMBEDDING_TABLE} ((cmetadata->>'appid'))
+    """)
+
+
+def ensure_appid_column(cursor):
+    """
+    cmetadata의 appid를 정수형 생성 컬럼(appid)으로 저장하고 인덱스 생성
+    langchain이 INSERT할 때 자동으로 계산되므로 적재 코드 변경 없이 유지됨
+    """
+    cursor.execute(f"""
+        ALTER TABLE {EMBEDDING_TABLE}
+        ADD COLUMN IF NOT EXISTS appid integer
+        GENERATED ALWAYS AS (
+            CASE WHEN cmetadata->>'appid' ~ '^[0-9]+$' THEN (cmetadata->>'appid')::integer END
+        ) STORED
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS {APPID_COLUMN_INDEX_NAME}
+        ON {EMBEDDING_TABLE} (appid)
+    """)
+
+
+def create_ann_index(cursor, method=None, rebuild=False):
+    """
+    코사인 거리(<=>) 검색용 HNSW 또는 IVFFlat 인덱스 생성
+    다른 방식의 인덱스가 있으면 삭제하여 플래너가 하나의 ANN 인덱스만 보도록 유지
+    """
+    options = get_index_options()
+    method = method or options["method"]
+
+    if method == "hnsw":
+        index_name, other_name = HNSW_INDEX_NAME, IVFFLAT_INDEX_NAME
+        with_clause = f"m = {int(options['hnsw_m'])}, ef_construction = {int(options['hnsw_ef_construction'])}"
+    elif method == "ivfflat":
+        index_name, other_name = IVFFLAT_INDEX_NAME, HNSW_INDEX_NAME
+        with_clause = f"lists = {int(options['ivfflat_lists'])}"
+    else:
+        raise ValueError(f"지원하지 않는 인덱스 방식입니다: {method}")
+
+    cursor.execute(f"DROP INDEX IF EXISTS {other_name}")
+    if rebuild:
+        cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS {index_name}
+        ON {EMBEDDING_TABLE} USING {method} (embedding vector_cosine_ops)
+        WITH ({with_clause})
+    """)
+    return index_name
+
+
+def drop_ann_indexes(cursor):
+    """
+    대량 적재 전에 ANN 인덱스만 삭제 (행마다 그래프/리스트를 갱신하지 않도록 적재 후 한 번에 생성)
+    """
+    for index_name in (HNSW_INDEX_NAME, IVFFLAT_INDEX_NAME):
+        cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+def get_collection_id(cursor, name=COLLECTION_NAME):
+    cursor.execute(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = %s", [name])
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def drop_vector_indexes(cursor):
+    for index_name in (HNSW_INDEX_NAME, IVFFLAT_INDEX_NAME, APPID_INDEX_NAME, APPID_COLUMN_INDEX_NAME):
+        cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+def ensure_vector_indexes(method=None, rebuild=False, using_connection=None):
+    """
+    임베딩 테이블이 있으면 차원 고정, 정수형 appid 컬럼, appid 인덱스, ANN 인덱스를 모두 생성
+    테이블이 아직 없으면(벡터 스토어 적재 전) 아무것도 하지 않고 False 반환
+    """
+    db = using_connection or connection
+    with db.cursor() as cursor:
+        if not embedding_table_exists(cursor):
+            return False
+        ensure_embedding_dimensions(cursor, get_index_options()["dimensions"])
+        ensure_appid_column(cursor)
+        create_appid_index(cursor)
+        create_ann_index(cursor, method=method, rebuild=rebuild)
+    return True
+
+
+def get_index_status():
+    """
+    임베딩 테이블의 인덱스 이름, 정의, 크기를 반환
+    """
+    with connection.cursor() as cursor:
+        if not embedding_table_exists(cursor):
+            return []
+        cursor.execute("""
+            SELECT indexname, indexdef, pg_size_pretty(pg_relation_size(indexname::regclass))
+            FROM pg_indexes
+            WHERE tablename = %s
+            ORDER BY indexname
+        """, [EMBEDDING_TABLE])
+        return cursor.fetchall()
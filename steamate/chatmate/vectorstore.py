@@ -1,80 +1,91 @@
+import logging
+import threading
 from langchain_openai import OpenAIEmbeddings
-from langchain.schema import Document
 from langchain_community.vectorstores import PGVector # pgvector용 모듈
-from config.settings import CONNECTION_STRING
-import os
-import pandas as pd
+from config.settings import CONNECTION_STRING, PGVECTOR_SESSION_OPTIONS, EMBEDDING_CACHE
+from django.db import connection
+from .vector_index import COLLECTION_NAME, EMBEDDING_TABLE, embedding_table_exists, get_collection_id
+from .embedding_cache import CachedEmbeddings
 
+logger = logging.getLogger(__name__)
 
 # 임베딩 모델 설정
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-small",
+EMBEDDING_MODEL = "text-embedding-3-small"
+base_embeddings = OpenAIEmbeddings(
+    model=EMBEDDING_MODEL,
 )
 
-# 데이터 불러오기
-def load_and_chunk_csv(chunk_size=100):
-    try:
-        file_path = os.path.abspath('chatmate/data/games_v3.csv')
-        data = pd.read_csv(file_path, encoding="utf-8")
-    except Exception as e:
-        print(f"데이터 불러오기 중 오류 :: {e}")
-        return None
-    
-    chunks = []
-    for i in range(0, len(data), chunk_size):
-        chunk = data.iloc[i:i+chunk_size]
-        chunk_documents = [
-            Document(
-                page_content=" | ".join([f"{col}: {value}" for col, value in row.items()]),
-                metadata={"appid": row["appid"], "genres": row["genres"]}
-            )
-            for _, row in chunk.iterrows()
-        ]
-        chunks.append(chunk_documents)
-    
-    return chunks
+# 검색어 임베딩은 반복되는 경우가 많으므로 캐시를 거쳐 호출
+embeddings = CachedEmbeddings(base_embeddings, namespace=EMBEDDING_MODEL, **EMBEDDING_CACHE)
+
+# PGVector 연결에도 ef_search/probes 검색 옵션을 적용
+VECTOR_ENGINE_ARGS = {"connect_args": {"options": PGVECTOR_SESSION_OPTIONS}}
+
+def open_vectorstore(embedding=None):
+    """
+    games 컬렉션에 연결된 PGVector (테이블/컬렉션이 없으면 langchain이 생성)
+    """
+    return PGVector(
+        embedding_function=embedding or embeddings,
+        connection_string=CONNECTION_STRING,
+        collection_name=COLLECTION_NAME,
+        use_jsonb=True,
+        engine_args=VECTOR_ENGINE_ARGS
+    )
+
+
+# 벡터 스토어는 처음 사용할 때 한 번만 연결 (import 시점에는 DB/임베딩 API를 호출하지 않음)
+_vector_store = None
+_vector_store_lock = threading.Lock()
 
-# 벡터 스토어 생성
-def create_vectorstore_from_chunks(chunks):
-    vector_store = None
-    for chunk in chunks:
-        if vector_store is None:
-            vector_store = PGVector.from_documents(
-                documents=chunk,
-                embedding=embeddings,
-                connection_string=CONNECTION_STRING,
-                collection_name="games_collection",
-                use_jsonb=True
-            )
-        else:
-            vector_store.add_documents(chunk)
-    
-    return vector_store
+def get_vector_store():
+    """
+    스레드 안전한 지연 초기화로 PGVector 인스턴스를 반환
+    비어 있는 컬렉션의 적재는 여기서 하지 않음 (python manage.py ingest_games 또는 chatmate.tasks.ingest_games)
+    """
+    global _vector_store
+    if _vector_store is None:
+        with _vector_store_lock:
+            if _vector_store is None:
+                _vector_store = open_vectorstore()
+    return _vector_store
 
 
-# 벡터 스토어 초기화
-def initialize_vectorstore():
-    
-    try: 
-        # 벡터 스토어 로드 시도
-        vector_store = PGVector(
-            embedding_function=embeddings,
-            connection_string=CONNECTION_STRING,
-            collection_name="games_collection",
-            use_jsonb=True
+def get_vectorstore_status():
+    """
+    임베딩 API 호출 없이 SQL로 컬렉션에 문서가 있는지 확인
+    """
+    with connection.cursor() as cursor:
+        if not embedding_table_exists(cursor):
+            return {"ready": False, "reason": "langchain_pg_embedding 테이블이 없습니다."}
+        collection_id = get_collection_id(cursor)
+        if collection_id is None:
+            return {"ready": False, "reason": "games 컬렉션이 없습니다."}
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {EMBEDDING_TABLE} WHERE collection_id = %s)", [collection_id]
         )
-        
-            # 데이터 비어있는지 확인
-        sample = vector_store.similarity_search("test", k=1)
-        if not sample:
-            print("PGVector 벡터 DB가 비어 있습니다. 데이터를 생성합니다.")
-            chunks = load_and_chunk_csv()
-            vector_store = create_vectorstore_from_chunks(chunks)
-        else:
-            print("기존 PGVector 벡터 DB를 로드했습니다.")
-    # 우선 모든에러처리
-    except Exception as e: 
-        print(f"벡터 db 초기화 중 오류 :: {e}")
-    
-    
-    return vector_store
\ No newline at end of file
+        if not cursor.fetchone()[0]:
+            return {"ready": False, "reason": "games 컬렉션이 비어 있습니다. ingest_games로 적재하세요."}
+    return {"ready": True}
+
+
+def warm_up_vectorstore():
+    """
+    워커 시작 후 첫 요청 전에 호출하는 준비 확인 훅 (PGVector 연결을 만들고 컬렉션 상태 반환)
+    인증 없이 호출되는 readiness probe에서도 쓰이므로 DB/드라이버 오류 내용은 로그에만 남기고 응답에는 넣지 않음
+    """
+    try:
+        get_vector_store()
+        return get_vectorstore_status()
+    except Exception:
+        logger.exception("벡터 db 초기화 중 오류")
+        return {"ready": False, "reason": "벡터 스토어에 연결할 수 없습니다."}
+
+
+def run_incremental_sync(*args, **kwargs):
+    """
+    내용 해시 manifest를 기준으로 바뀐 게임만 다시 임베딩하는 증분 동기화
+    구현은 적재 코드와 함께 chatmate.ingestion.run_incremental_sync에 있음 (인자와 반환값 동일)
+    """
+    from .ingestion import run_incremental_sync
+    return run_incremental_sync(*args, **kwargs)
@@ -1,13 +1,17 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 
 from django.shortcuts import get_object_or_404
 
 from .models import ChatSession, ChatMessage
 from .serializers import ChatSessionSerializer, ChatMessageSerializer
 from .history import bring_session_history, delete_messages_from_history
+from .vectorstore import embeddings, warm_up_vectorstore
+from .utils_v5 import response_cache, ttft_recorder, get_speculation_stats, prompt_token_meter
+from .user_context import user_context_cache
+from .scheduler import generation_scheduler
 
 # Create your views here.
 class ChatSessionAPIView(APIView):
@@ -85,4 +89,46 @@ class ChatMessageAPIView(APIView):
     #         # 챗봇 메시지 생성
     #         chatbot_message = get_chatbot_message(request.data["user_message"], session_id, genre=genre, game=game, appid=appid)
     #         serializer.save(session_id=session, chatbot_message=chatbot_message)
-    #         return Response({"message" : "메시지 수정 완료", "data" : serializer.data}, status=status.HTTP_200_OK)
\ No newline at end of file
+    #         return Response({"message" : "메시지 수정 완료", "data" : serializer.data}, status=status.HTTP_200_OK)
+
+
+class EmbeddingCacheStatsAPIView(APIView):
+    """
+    현재 워커의 검색어 임베딩 캐시 적중률과 절약한 시간/비용 추정치 조회 (관리자 전용)
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(embeddings.stats(), status=status.HTTP_200_OK)
+
+
+class ChatPipelineStatsAPIView(APIView):
+    """
+    현재 워커의 라우팅/검색 질의 캐시 적중률, 추측 실행 결과, 첫 토큰 지연 시간, 단계별 프롬프트 토큰 수,
+    사용자 컨텍스트 캐시 적중률, 응답 생성 대기열 깊이/대기 시간 조회 (관리자 전용)
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "response_cache": response_cache.stats(),
+            "speculation": get_speculation_stats(),
+            "ttft": ttft_recorder.stats(),
+            "prompt_tokens": prompt_token_meter.stats(),
+            "user_context": user_context_cache.stats(),
+            "scheduler": generation_scheduler.stats(),
+        }, status=status.HTTP_200_OK)
+
+
+class ChatReadinessAPIView(APIView):
+    """
+    벡터 스토어 연결을 미리 만들고 컬렉션이 적재되어 있는지 확인하는 준비 상태 확인 (배포 readiness probe용)
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        result = warm_up_vectorstore()
+        return Response(
+            result,
+            status=status.HTTP_200_OK if result["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from cachetools import TTLCache
+from channels.consumer import AsyncConsumer
+from channels.routing import ChannelNameRouter
+from config.settings import CHAT_GENERATION
+from .generation import produce_response
+from .scheduler import SchedulerBusy
+
+logger = logging.getLogger(__name__)
+
+# 시작 전에 취소된 generation_id를 모든 생성 워커에 알리는 그룹
+CANCEL_GROUP = f"{CHAT_GENERATION['channel']}.cancel"
+
+
+class GenerationWorker(AsyncConsumer):
+    """
+    채널 레이어의 CHAT_GENERATION["channel"]에서 응답 생성 작업을 받아 실행하는 워커
+    (python manage.py chat_generation_worker 로 웹소켓 서버와 별도 프로세스로 실행)
+
+    생성 결과는 작업에 담긴 세션 그룹으로 group_send하며, ChatConsumer가 받아 클라이언트에 스트리밍
+    - generation.started: 작업 시작 (취소 요청을 보낼 worker_channel 포함)
+    - generation.chunk: 생성된 텍스트 조각
+    - generation.done(message_id 포함) / generation.busy / generation.error: 종료
+    작업마다 별도 asyncio 작업으로 실행하고 동시 실행 수는 워커의 generation_scheduler로 제한
+    DB 저장과 스트림 버퍼 기록도 워커에서 하므로 요청한 웹소켓 연결이 끊겨도 응답은 완성됨
+
+    generation.started 전에 취소된 작업은 웹소켓 쪽이 worker_channel을 모르므로 작업 채널로 취소를 보내고,
+    받은 워커가 그 작업을 실행 중이 아니면 CANCEL_GROUP으로 다시 알려 모든 워커가 취소 목록에 기록 (기록된 작업은 시작하지 않음)
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tasks = {}
+        self.cancelled = TTLCache(maxsize=1000, ttl=CHAT_GENERATION['timeout'])
+
+    async def generate(self, event):
+        generation_id = event['generation_id']
+        # 작업을 받을 때마다 가입하여 그룹 만료(group_expiry)로 취소 알림을 놓치지 않게 함
+        await self.channel_layer.group_add(CANCEL_GROUP, self.channel_name)
+        if self.cancelled.pop(generation_id, None):
+            return
+        task = asyncio.create_task(self.run_generation(event))
+        self.tasks[generation_id] = task
+        task.add_done_callback(lambda done: self.tasks.pop(generation_id, None))
+
+    async def generation_cancel(self, event):
+        generation_id = event['generation_id']
+        task = self.tasks.get(generation_id)
+        if task is not None:
+            task.cancel()
+            return
+        self.cancelled[generation_id] = True
+        if event.get('broadcast'):
+            await self.channel_layer.group_send(CANCEL_GROUP, {
+                'type': 'generation.cancel',
+                'generation_id': generation_id,
+            })
+
+    async def run_generation(self, event):
+        group = event['group']
+        generation_id = event['generation_id']
+
+        async def send_chunk(chunk):
+            await self.channel_layer.group_send(group, {
+                'type': 'generation.chunk',
+                'generation_id': generation_id,
+                'text': chunk,
+            })
+
+        try:
+            await self.channel_layer.group_send(group, {
+                'type': 'generation.started',
+                'generation_id': generation_id,
+                'worker_channel': self.channel_name,
+            })
+            message_id = await produce_response(
+                generation_id, event['session_id'], event['user_message'],
+                event['tags'], event['appid'], event['preferred_games'],
+                on_chunk=send_chunk, message_id=event.get('message_id'),
+            )
+            await self.channel_layer.group_send(group, {
+                'type': 'generation.done',
+                'generation_id': generation_id,
+                'message_id': message_id,
+            })
+        except SchedulerBusy:
+            await self.channel_layer.group_send(group, {
+                'type': 'generation.busy',
+                'generation_id': generation_id,
+            })
+        except asyncio.CancelledError:
+            # 요청한 쪽에서 취소했으므로 알릴 필요 없음
+            raise
+        except Exception as e:
+            logger.exception(f"응답 생성 작업 실패 (generation_id: {generation_id})")
+            await self.channel_layer.group_send(group, {
+                'type': 'generation.error',
+                'generation_id': generation_id,
+                'message': str(e),
+            })
+
+
+def generation_worker_application():
+    return ChannelNameRouter({
+        CHAT_GENERATION['channel']: GenerationWorker.as_asgi(),
+    })
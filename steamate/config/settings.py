@@ -183,6 +183,114 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# 게임 상세 정보 캐시 (redis_url을 지정하면 워커 간 공유 계층 사용)
+GAME_DETAIL_CACHE = {
+    'maxsize': int(os.getenv('GAME_DETAIL_CACHE_SIZE', '20000')),
+    'ttl': int(os.getenv('GAME_DETAIL_CACHE_TTL', '3600')),
+    'redis_url': os.getenv('GAME_DETAIL_CACHE_REDIS_URL'),
+}
+
+# 검색어 임베딩 캐시 (redis_url을 지정하면 워커 간 공유 계층 사용)
+EMBEDDING_CACHE = {
+    'maxsize': int(os.getenv('EMBEDDING_CACHE_SIZE', '5000')),
+    'redis_url': os.getenv('EMBEDDING_CACHE_REDIS_URL'),
+    'redis_ttl': int(os.getenv('EMBEDDING_CACHE_REDIS_TTL', '604800')),
+    'price_per_million_tokens': float(os.getenv('EMBEDDING_PRICE_PER_MILLION_TOKENS', '0.02')),
+}
+
+# 챗봇 대화 내역 저장소 ("redis": 워커 간 공유, "memory": 프로세스 로컬)
+CHAT_HISTORY = {
+    'backend': os.getenv('CHAT_HISTORY_BACKEND', 'redis'),
+    'redis_url': os.getenv('CHAT_HISTORY_REDIS_URL', 'redis://redis:6379/1'),
+    'ttl': int(os.getenv('CHAT_HISTORY_TTL', '1800')),
+    'max_messages': int(os.getenv('CHAT_HISTORY_MAX_MESSAGES', '40')),
+}
+
+# 프롬프트에 넣는 대화 내역 범위 (토큰 예산, 최근 턴 수, 잘린 이전 대화의 백그라운드 요약)
+CHAT_HISTORY_WINDOW = {
+    'max_tokens': int(os.getenv('CHAT_HISTORY_MAX_TOKENS', '2000')),
+    'max_turns': int(os.getenv('CHAT_HISTORY_MAX_TURNS', '10')),
+    'summarize': os.getenv('CHAT_HISTORY_SUMMARIZE', 'True') == 'True',
+    'summary_min_messages': int(os.getenv('CHAT_HISTORY_SUMMARY_MIN_MESSAGES', '4')),
+}
+
+# 웹소켓 연결 시 불러오는 사용자 컨텍스트(선호 태그, 라이브러리, 선호 게임) 캐시
+# redis_url이 있으면 Redis에 저장하여 라이브러리 동기화/선호 변경 시 모든 워커에서 바로 무효화됨
+CHAT_USER_CONTEXT_CACHE = {
+    'maxsize': int(os.getenv('CHAT_USER_CONTEXT_CACHE_SIZE', '10000')),
+    'ttl': int(os.getenv('CHAT_USER_CONTEXT_CACHE_TTL', '600')),
+    'redis_url': os.getenv('CHAT_USER_CONTEXT_CACHE_REDIS_URL', 'redis://redis:6379/1'),
+}
+
+# 챗봇 라우팅/검색 질의 생성 단계 응답 캐시
+CHAT_RESPONSE_CACHE = {
+    'enabled': os.getenv('CHAT_RESPONSE_CACHE_ENABLED', 'True') == 'True',
+    'maxsize': int(os.getenv('CHAT_RESPONSE_CACHE_SIZE', '5000')),
+    'ttl': int(os.getenv('CHAT_RESPONSE_CACHE_TTL', '3600')),
+}
+
+# 라우팅 LLM 호출과 추천 경로의 가상 문서 생성을 동시에 실행 (검색 경로로 판정되면 취소)
+CHAT_SPECULATIVE_ROUTING = os.getenv('CHAT_SPECULATIVE_ROUTING', 'True') == 'True'
+
+# 챗봇 응답 웹소켓 스트리밍 (클라이언트가 ?protocol=2로 연결하면 delta 프레임 사용)
+CHAT_STREAMING = {
+    'default_protocol': int(os.getenv('CHAT_STREAMING_DEFAULT_PROTOCOL', '1')),
+    'flush_interval': float(os.getenv('CHAT_STREAMING_FLUSH_INTERVAL', '0.03')),  # 초
+    'min_chunk_chars': int(os.getenv('CHAT_STREAMING_MIN_CHUNK_CHARS', '24')),
+}
+
+# 챗봇 응답 생성 동시 실행 제한
+# 워커당 동시 생성 수를 넘으면 max_queued_generations개까지 대기, 그 이상은 busy 응답
+# 한 연결에서 max_in_flight_per_session개를 넘는 새 메시지가 오면 가장 오래된 생성을 취소
+CHAT_CONCURRENCY = {
+    'max_concurrent_generations': int(os.getenv('CHAT_MAX_CONCURRENT_GENERATIONS', '32')),
+    'max_queued_generations': int(os.getenv('CHAT_MAX_QUEUED_GENERATIONS', '64')),
+    'max_in_flight_per_session': int(os.getenv('CHAT_MAX_IN_FLIGHT_PER_SESSION', '1')),
+}
+
+# 챗봇 응답 생성 위치
+# "local": 웹소켓 서버 프로세스에서 직접 생성
+# "channels": 채널 레이어의 channel로 작업을 보내고 python manage.py chat_generation_worker 프로세스가 생성
+CHAT_GENERATION = {
+    'backend': os.getenv('CHAT_GENERATION_BACKEND', 'local'),
+    'channel': os.getenv('CHAT_GENERATION_CHANNEL', 'chat-generation'),
+    'timeout': float(os.getenv('CHAT_GENERATION_TIMEOUT', '120')),  # 초
+}
+
+# 웹소켓 서버와 챗봇 응답 생성 워커 사이의 메시지 전달
+# "local" 모드에서는 채널 레이어를 쓰지 않으므로 설정하지 않음 (웹소켓 연결이 Redis 채널 레이어에 의존하지 않도록)
+CHANNEL_LAYERS = {}
+if CHAT_GENERATION['backend'] == 'channels':
+    CHANNEL_LAYERS['default'] = {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [os.getenv('CHANNEL_LAYER_REDIS_URL', 'redis://redis:6379/2')],
+        },
+    }
+
+# 생성 중인 챗봇 응답 버퍼 (웹소켓이 끊겨도 생성을 끝까지 진행하고, 재연결한 클라이언트가 generation_id와 마지막 seq로 이어받음)
+CHAT_STREAM_BUFFER = {
+    'enabled': os.getenv('CHAT_STREAM_BUFFER_ENABLED', 'True') == 'True',
+    'backend': os.getenv('CHAT_STREAM_BUFFER_BACKEND', 'redis'),  # "redis": 워커 간 공유, "memory": 프로세스 로컬
+    'redis_url': os.getenv('CHAT_STREAM_BUFFER_REDIS_URL', 'redis://redis:6379/1'),
+    'ttl': int(os.getenv('CHAT_STREAM_BUFFER_TTL', '300')),
+    'flush_interval': float(os.getenv('CHAT_STREAM_BUFFER_FLUSH_INTERVAL', '0.1')),  # 초
+}
+
+# pgvector ANN 인덱스 설정 (python manage.py vector_index 명령어로 생성/재생성)
+PGVECTOR_INDEX = {
+    'method': os.getenv('PGVECTOR_INDEX_METHOD', 'hnsw'),  # "hnsw" 또는 "ivfflat"
+    'dimensions': 1536,  # text-embedding-3-small
+    'hnsw_m': int(os.getenv('PGVECTOR_HNSW_M', '16')),
+    'hnsw_ef_construction': int(os.getenv('PGVECTOR_HNSW_EF_CONSTRUCTION', '64')),
+    'ivfflat_lists': int(os.getenv('PGVECTOR_IVFFLAT_LISTS', '100')),
+}
+
+# 검색 시 정확도/속도 조절값, 모든 DB 연결(Django, PGVector)에 세션 옵션으로 적용
+PGVECTOR_EF_SEARCH = int(os.getenv('PGVECTOR_EF_SEARCH', '40'))
+PGVECTOR_PROBES = int(os.getenv('PGVECTOR_PROBES', '10'))
+PGVECTOR_SESSION_OPTIONS = f"-c hnsw.ef_search={PGVECTOR_EF_SEARCH} -c ivfflat.probes={PGVECTOR_PROBES}"
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -191,6 +299,9 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'mypassword'),
         'HOST': os.getenv('POSTGRES_HOST', 'db'),
         'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        'OPTIONS': {
+            'options': PGVECTOR_SESSION_OPTIONS,
+        },
     }
 }
 
@@ -208,9 +319,33 @@ CELERY_BEAT_SCHEDULE = {
     'train-collaborative-filtering-every-day': {
         'task': 'pickmate.tasks.train_collaborative_filtering',
         'schedule': crontab(minute=0, hour=0),
+    },
+    'sync-game-embeddings-every-day': {
+        'task': 'chatmate.tasks.sync_game_embeddings',
+        'schedule': crontab(minute=0, hour=3),
     }
 }
 
+# 협업 필터링 모델 파일 변경 여부를 확인하는 주기 (초)
+COLLAB_MODEL_CHECK_INTERVAL = int(os.getenv('COLLAB_MODEL_CHECK_INTERVAL', '5'))
+
+# 학습 평점 정규화 방식 ("log": 사용자별 로그 스케일, "percentile": 사용자별 백분위, "global": 전체 최대값 기준)
+COLLAB_RATING_NORMALIZATION = os.getenv('COLLAB_RATING_NORMALIZATION', 'log')
+
+# surprise SVD 학습 옵션 (사용자별 정규화로 입력이 고르게 분포하므로 epoch 수를 줄일 수 있음)
+COLLAB_SVD_OPTIONS = {
+    'n_epochs': int(os.getenv('COLLAB_SVD_EPOCHS', '20')),
+}
+
+# 협업 필터링 학습 엔진 ("surprise": SVD, "als": implicit ALS)
+COLLAB_FILTERING_ENGINE = os.getenv('COLLAB_FILTERING_ENGINE', 'surprise')
+COLLAB_ALS_OPTIONS = {
+    'factors': int(os.getenv('COLLAB_ALS_FACTORS', '32')),
+    'regularization': float(os.getenv('COLLAB_ALS_REGULARIZATION', '0.05')),
+    'alpha': float(os.getenv('COLLAB_ALS_ALPHA', '40')),
+    'iterations': int(os.getenv('COLLAB_ALS_ITERATIONS', '15')),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,117 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy import sparse
+
+
+def build_interaction_matrix(rating_arrays):
+    """
+    stream_user_game_ratings의 압축 배열로 사용자 x 게임 CSR 행렬을 구성
+    """
+    shape = (len(rating_arrays.user_ids), len(rating_arrays.app_ids))
+    matrix = sparse.csr_matrix(
+        (rating_arrays.ratings, (rating_arrays.user_codes, rating_arrays.app_codes)),
+        shape=shape, dtype=np.float32,
+    )
+    matrix.sum_duplicates()
+    return matrix
+
+
+def _row_blocks(indptr, max_nnz):
+    """
+    블록당 nonzero 수가 max_nnz를 넘지 않도록 행 범위를 나눔
+    """
+    n_rows = len(indptr) - 1
+    blocks = []
+    start = 0
+    while start < n_rows:
+        end = int(np.searchsorted(indptr, indptr[start] + max_nnz, side="right")) - 1
+        end = min(max(end, start + 1), n_rows)
+        blocks.append((start, end))
+        start = end
+    return blocks
+
+
+class ImplicitALS:
+    """
+    암시적 피드백(implicit feedback) ALS (Hu, Koren, Volinsky 2008)
+    플레이 시간을 평점이 아닌 선호 신뢰도 c = 1 + alpha * r로 보고 사용자/게임 요인을 번갈아 갱신
+    각 갱신은 k x k 행렬을 만들지 않는 켤레 기울기법(CG)을 블록 단위로 배치 실행하며,
+    블록은 스레드 풀에서 병렬로 처리되고 NumPy/BLAS 연산은 GIL을 놓고 모든 코어를 사용
+    """
+    def __init__(self, factors=32, regularization=0.05, alpha=40.0, iterations=15, cg_steps=3,
+                 n_threads=None, block_nnz=200_000, random_state=0):
+        self.factors = factors
+        self.regularization = regularization
+        self.alpha = alpha
+        self.iterations = iterations
+        self.cg_steps = cg_steps
+        self.n_threads = n_threads or os.cpu_count() or 1
+        self.block_nnz = block_nnz
+        self.random_state = random_state
+        self.user_factors = None
+        self.item_factors = None
+
+    def _solve_block(self, matrix, fixed, gram, target, start, end):
+        indptr = matrix.indptr[start:end + 1]
+        lo, hi = indptr[0], indptr[-1]
+        local_indptr = indptr - lo
+        cols = matrix.indices[lo:hi]
+        weights = self.alpha * matrix.data[lo:hi]  # c - 1
+        rows = np.repeat(np.arange(end - start), np.diff(local_indptr))
+        fixed_rows = fixed[cols]
+        shape = (end - start, fixed.shape[0])
+
+        def apply_A(x):
+            # (YtY + lambda*I) x + Y^T (C - I) Y x 를 희소 연산으로 계산
+            dots = np.einsum("ij,ij->i", fixed_rows, x[rows]) * weights
+            return x @ gram + sparse.csr_matrix((dots, cols, local_indptr), shape=shape) @ fixed
+
+        b = sparse.csr_matrix((1 + weights, cols, local_indptr), shape=shape) @ fixed
+
+        # 이전 반복의 값에서 출발하는 warm start CG
+        x = target[start:end].copy()
+        r = b - apply_A(x)
+        p = r.copy()
+        rs_old = np.einsum("ij,ij->i", r, r)
+        for _ in range(self.cg_steps):
+            Ap = apply_A(p)
+            pAp = np.einsum("ij,ij->i", p, Ap)
+            step = np.divide(rs_old, pAp, out=np.zeros_like(rs_old), where=pAp > 0)
+            x += step[:, None] * p
+            r -= step[:, None] * Ap
+            rs_new = np.einsum("ij,ij->i", r, r)
+            beta = np.divide(rs_new, rs_old, out=np.zeros_like(rs_new), where=rs_old > 0)
+            p = r + beta[:, None] * p
+            rs_old = rs_new
+
+        target[start:end] = x
+
+    def _solve(self, matrix, fixed, target, executor):
+        gram = fixed.T @ fixed + self.regularization * np.eye(self.factors, dtype=np.float32)
+        blocks = _row_blocks(matrix.indptr, self.block_nnz)
+        futures = [
+            executor.submit(self._solve_block, matrix, fixed, gram, target, start, end)
+            for start, end in blocks
+        ]
+        for future in futures:
+            future.result()
+
+    def fit(self, matrix):
+        """
+        사용자 x 게임 CSR 행렬(값은 0~1 선호도)로 학습
+        """
+        matrix = sparse.csr_matrix(matrix, dtype=np.float32)
+        item_matrix = matrix.T.tocsr()
+        n_users, n_items = matrix.shape
+
+        rng = np.random.default_rng(self.random_state)
+        self.user_factors = (rng.standard_normal((n_users, self.factors)) * 0.01).astype(np.float32)
+        self.item_factors = (rng.standard_normal((n_items, self.factors)) * 0.01).astype(np.float32)
+
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            for _ in range(self.iterations):
+                self._solve(matrix, self.item_factors, self.user_factors, executor)
+                self._solve(item_matrix, self.user_factors, self.item_factors, executor)
+
+        return self
@@ -0,0 +1,157 @@
+import json
+import logging
+import threading
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# 로컬 캐시에서 "정보 없음"을 표시하는 값 (None은 캐시 미스와 구분할 수 없으므로 별도 사용)
+MISSING = object()
+
+
+class GameDetailCache:
+    """
+    게임 상세 정보(name, genres, description)를 appid 기준으로 보관하는 프로세스 로컬 LRU 캐시
+    redis_url이 있으면 워커 간에 공유되는 Redis 계층을 두 번째 단계로 사용
+    로컬 항목은 ttl이 지나면 만료되므로 다른 프로세스에서 무효화한 값도 결국 반영됨
+    """
+    redis_prefix = "pickmate:game_detail:"
+
+    def __init__(self, loader, maxsize=20000, ttl=3600, redis_url=None, redis_ttl=86400, warm_up_loader=None):
+        self.loader = loader
+        self.warm_up_loader = warm_up_loader
+        self.maxsize = maxsize
+        self.redis_ttl = redis_ttl
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._warmed = False
+        self._redis_url = redis_url
+        self._redis = None
+        self.hits = 0
+        self.misses = 0
+        self.redis_hits = 0
+
+    @property
+    def redis(self):
+        if self._redis is None and self._redis_url:
+            import redis
+            self._redis = redis.Redis.from_url(self._redis_url)
+        return self._redis
+
+    def _redis_get_many(self, appids):
+        if not self.redis or not appids:
+            return {}
+        try:
+            values = self.redis.mget([self.redis_prefix + appid for appid in appids])
+        except Exception as e:
+            logger.warning(f"게임 정보 Redis 캐시 조회 실패: {e}")
+            return {}
+        return {appid: json.loads(value) for appid, value in zip(appids, values) if value is not None}
+
+    def _redis_set_many(self, details):
+        if not self.redis or not details:
+            return
+        try:
+            pipeline = self.redis.pipeline()
+            for appid, detail in details.items():
+                pipeline.setex(self.redis_prefix + appid, self.redis_ttl, json.dumps(detail))
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"게임 정보 Redis 캐시 저장 실패: {e}")
+
+    def _store_local(self, details):
+        with self._lock:
+            for appid, detail in details.items():
+                self._local[appid] = detail if detail is not None else MISSING
+
+    def get_many(self, appids):
+        """
+        appid 목록의 상세 정보를 {appid(str): detail} 형태로 반환 (정보가 없는 게임은 제외)
+        로컬 -> Redis -> DB 순서로 조회하고, 아래 단계에서 찾은 값은 위 단계에 채움
+        """
+        if not self._warmed:
+            self.warm_up()
+
+        appids = [str(appid) for appid in dict.fromkeys(appids)]
+        result = {}
+        missing = []
+
+        with self._lock:
+            for appid in appids:
+                detail = self._local.get(appid)
+                if detail is None:
+                    missing.append(appid)
+                    continue
+                self.hits += 1
+                if detail is not MISSING:
+                    result[appid] = detail
+
+        if missing:
+            from_redis = self._redis_get_many(missing)
+            self.redis_hits += len(from_redis)
+            self._store_local(from_redis)
+            for appid, detail in from_redis.items():
+                if detail is not None:
+                    result[appid] = detail
+
+            missing = [appid for appid in missing if appid not in from_redis]
+
+        if missing:
+            self.misses += len(missing)
+            loaded = self.loader(missing)
+            # DB에도 없는 게임은 None으로 저장하여 반복 조회를 막음
+            details = {appid: loaded.get(appid) for appid in missing}
+            self._store_local(details)
+            self._redis_set_many(details)
+            result.update(loaded)
+
+        return result
+
+    def warm_up(self):
+        """
+        워커에서 처음 사용할 때 maxsize 범위 안의 게임 정보를 한 번에 로드
+        """
+        self._warmed = True
+        if self.warm_up_loader is None:
+            return 0
+        try:
+            details = self.warm_up_loader(self.maxsize)
+        except Exception as e:
+            logger.warning(f"게임 정보 캐시 워밍업 실패: {e}")
+            return 0
+        self._store_local(details)
+        return len(details)
+
+    def invalidate(self, appids=None):
+        """
+        지정한 appid(없으면 전체)의 캐시 항목을 로컬과 Redis에서 삭제
+        """
+        with self._lock:
+            if appids is None:
+                self._local.clear()
+            else:
+                for appid in appids:
+                    self._local.pop(str(appid), None)
+
+        if not self.redis:
+            return
+        try:
+            if appids is None:
+                keys = list(self.redis.scan_iter(match=self.redis_prefix + "*", count=1000))
+            else:
+                keys = [self.redis_prefix + str(appid) for appid in appids]
+            if keys:
+                self.redis.delete(*keys)
+        except Exception as e:
+            logger.warning(f"게임 정보 Redis 캐시 삭제 실패: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "size": len(self._local),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.redis_hits) / lookups if lookups else 0.0,
+        }
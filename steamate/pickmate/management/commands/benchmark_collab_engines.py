@@ -0,0 +1,43 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from pickmate.ml_utils import fit_collaborative_model
+from pickmate.utils import RatingArrays
+
+
+def make_synthetic_ratings(n_rows, n_users, n_games, seed=0):
+    """
+    실제 라이브러리처럼 인기 게임에 플레이가 몰리도록 합성 학습 데이터를 생성
+    """
+    rng = np.random.default_rng(seed)
+    user_codes = rng.integers(0, n_users, size=n_rows, dtype=np.int32)
+    app_codes = np.minimum(rng.zipf(1.3, size=n_rows) - 1, n_games - 1).astype(np.int32)
+    playtime = rng.lognormal(mean=6, sigma=2, size=n_rows).astype(np.float32)
+    ratings = playtime / playtime.max()
+    return RatingArrays(user_codes, app_codes, ratings, list(range(n_users)), list(range(n_games)))
+
+
+class Command(BaseCommand):
+    """
+    python manage.py benchmark_collab_engines --rows 1000000 명령어로
+    surprise SVD와 implicit ALS 엔진의 학습 시간을 합성 데이터로 비교
+    """
+    help = "Report fit time per collaborative filtering engine on synthetic data"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=50_000)
+        parser.add_argument("--games", type=int, default=20_000)
+        parser.add_argument("--engines", nargs="+", default=["surprise", "als"])
+
+    def handle(self, *args, **options):
+        rating_arrays = make_synthetic_ratings(options["rows"], options["users"], options["games"])
+        self.stdout.write(
+            f"synthetic data: {options['rows']:,} rows, {options['users']:,} users, {options['games']:,} games"
+        )
+
+        for engine in options["engines"]:
+            start = time.perf_counter()
+            fit_collaborative_model(rating_arrays, engine=engine)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{engine:<9} fit: {elapsed:8.2f}s")
@@ -0,0 +1,49 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from pickmate.ml_utils import (load_collaborative_filtering_model, load_collaborative_factors,
+                               predict_collaborative_score, hybrid_score)
+
+
+class Command(BaseCommand):
+    """
+    python manage.py benchmark_collab_scoring --user-id 1 --candidates 5000 명령어로
+    후보별 model.predict 루프와 SVDFactors 배치 점수 계산의 소요 시간을 비교
+    """
+    help = "Compare per-item SVD predict calls with vectorized batch scoring"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, required=True)
+        parser.add_argument("--candidates", type=int, default=5000)
+        parser.add_argument("--runs", type=int, default=20)
+
+    def handle(self, *args, **options):
+        user_id = options["user_id"]
+        runs = options["runs"]
+
+        model = load_collaborative_filtering_model()
+        factors = load_collaborative_factors()
+
+        # 학습된 게임 중에서 후보를 뽑고, 모자라면 반복하여 채움
+        rng = np.random.default_rng(0)
+        appids = [str(appid) for appid in rng.choice(factors.item_ids, size=options["candidates"])]
+        content_scores = rng.random(len(appids), dtype=np.float32)
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            loop_scores = [
+                hybrid_score(content, predict_collaborative_score(user_id, int(appid), model))
+                for content, appid in zip(content_scores, appids)
+            ]
+        loop_ms = (time.perf_counter() - start) * 1000 / runs
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            batch_scores = hybrid_score(content_scores, factors.score(user_id, appids))
+        batch_ms = (time.perf_counter() - start) * 1000 / runs
+
+        max_diff = float(np.max(np.abs(np.asarray(loop_scores, dtype=np.float32) - batch_scores)))
+        self.stdout.write(f"candidates: {len(appids)}")
+        self.stdout.write(f"per-item predict: {loop_ms:.3f}ms/request")
+        self.stdout.write(f"batch scoring:    {batch_ms:.3f}ms/request")
+        self.stdout.write(f"max |difference|: {max_diff:.6f}")
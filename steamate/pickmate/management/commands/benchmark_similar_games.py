@@ -0,0 +1,80 @@
+import time
+import statistics
+from django.core.management.base import BaseCommand
+from django.db import connection
+from pickmate.utils import get_combined_similar_games, get_combined_similar_games_per_seed
+
+
+class QueryCounter:
+    """
+    connection.execute_wrapper로 실행된 쿼리(DB 왕복) 수를 집계
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    """
+    python manage.py benchmark_similar_games --user-id 1 명령어로
+    기준 게임별 KNN 루프와 단일 배치 쿼리의 DB 왕복 수, p95 지연 시간을 비교
+    """
+    help = "Compare round trips and p95 latency of per-seed vs batched similar game search"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, required=True)
+        parser.add_argument("--runs", type=int, default=30)
+        parser.add_argument("--top-n", type=int, default=10)
+        parser.add_argument("--limit-per-game", type=int, default=10)
+
+    def measure(self, func, user_id, runs, top_n, limit_per_game):
+        latencies = []
+        counter = QueryCounter()
+        result = None
+
+        with connection.execute_wrapper(counter):
+            for _ in range(runs):
+                start = time.perf_counter()
+                result = func(user_id, top_n, limit_per_game)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        latencies.sort()
+        p95 = latencies[max(0, int(round(0.95 * len(latencies))) - 1)]
+        return {
+            "round_trips": counter.count / runs,
+            "p50": statistics.median(latencies),
+            "p95": p95,
+            "result": result,
+        }
+
+    def handle(self, *args, **options):
+        user_id = options["user_id"]
+        runs = options["runs"]
+        top_n = options["top_n"]
+        limit_per_game = options["limit_per_game"]
+
+        # 첫 실행 시 커넥션/캐시 효과를 제외하기 위한 워밍업
+        get_combined_similar_games(user_id, top_n, limit_per_game)
+
+        per_seed = self.measure(get_combined_similar_games_per_seed, user_id, runs, top_n, limit_per_game)
+        batched = self.measure(get_combined_similar_games, user_id, runs, top_n, limit_per_game)
+
+        for name, stats in (("per-seed loop", per_seed), ("batched", batched)):
+            self.stdout.write(
+                f"{name:<14} round trips/request: {stats['round_trips']:.1f}  "
+                f"p50: {stats['p50']:.2f}ms  p95: {stats['p95']:.2f}ms"
+            )
+
+        # 기준 게임 랜덤 추천(라이브러리가 빈 사용자)은 실행마다 결과가 달라지므로 appid 집합만 비교
+        per_seed_appids = {str(game["appid"]) for game in per_seed["result"]}
+        batched_appids = {str(game["appid"]) for game in batched["result"]}
+        if per_seed_appids == batched_appids:
+            self.stdout.write(self.style.SUCCESS("두 방식의 추천 appid 집합이 일치합니다."))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"추천 appid 집합이 다릅니다. (per-seed only: {len(per_seed_appids - batched_appids)}, "
+                f"batched only: {len(batched_appids - per_seed_appids)})"
+            ))
@@ -0,0 +1,77 @@
+import time
+import tracemalloc
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import connection
+from pickmate.utils import stream_user_game_ratings
+
+SYNTHETIC_TABLE = "pickmate_bench_userlibrarygame"
+
+
+class Command(BaseCommand):
+    """
+    python manage.py benchmark_training_extraction --rows 1000000 10000000 50000000 명령어로
+    합성 라이브러리 테이블에서 학습 데이터 추출 시 최대 메모리와 처리량을 측정
+    """
+    help = "Report peak memory and throughput of training data extraction on synthetic tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000])
+        parser.add_argument("--users", type=int, default=200_000)
+        parser.add_argument("--games", type=int, default=50_000)
+        parser.add_argument("--chunk-size", type=int, default=100_000)
+        parser.add_argument(
+            "--include-legacy", action="store_true",
+            help="fetchall + DataFrame 방식도 함께 측정 (행 수가 많으면 메모리 부족 주의)",
+        )
+
+    def create_synthetic_table(self, rows, users, games):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SYNTHETIC_TABLE}")
+            cursor.execute(f"""
+                CREATE UNLOGGED TABLE {SYNTHETIC_TABLE} AS
+                SELECT (random() * %s)::int AS user_id,
+                       (random() * %s)::int AS game_id,
+                       (random() * 100000)::int AS playtime
+                FROM generate_series(1, %s)
+            """, [users, games, rows])
+
+    def drop_synthetic_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SYNTHETIC_TABLE}")
+
+    def legacy_extract(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT user_id, game_id, playtime FROM {SYNTHETIC_TABLE}")
+            rows = cursor.fetchall()
+        data = pd.DataFrame(rows, columns=["user_id", "appid", "playtime"])
+        data["similarity"] = data["playtime"] / data["playtime"].max() if data["playtime"].max() else 0
+        return data
+
+    def measure(self, func, rows):
+        tracemalloc.start()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return f"peak {peak / 1024 ** 2:9.1f}MB  {rows / elapsed:12,.0f} rows/s  ({elapsed:.1f}s)"
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        try:
+            for rows in options["rows"]:
+                self.stdout.write(f"합성 테이블 생성 중: {rows:,} rows")
+                self.create_synthetic_table(rows, options["users"], options["games"])
+
+                result = self.measure(
+                    lambda: stream_user_game_ratings(chunk_size=chunk_size, table=SYNTHETIC_TABLE), rows
+                )
+                self.stdout.write(f"  streaming: {result}")
+
+                if options["include_legacy"]:
+                    self.stdout.write(f"  legacy:    {self.measure(self.legacy_extract, rows)}")
+        finally:
+            self.drop_synthetic_table()
+
+        self.stdout.write(self.style.SUCCESS("측정이 완료되었습니다."))
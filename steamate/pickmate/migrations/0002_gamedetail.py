@@ -0,0 +1,68 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+import re
+
+from django.db import migrations, models
+
+
+# 마이그레이션 시점의 파싱 규칙을 고정하기 위해 pickmate.utils.extract_game_details를 복사해 둠
+NAME_PATTERN = re.compile(r'name:\s(.*?)\s\|')
+GENRES_PATTERN = re.compile(r'genres:\s(.*?)\s\|')
+DESCRIPTION_PATTERN = re.compile(r'description:\s(.*?)(?:\s\||$)')
+
+
+def extract_game_details(document):
+    matches = [pattern.search(document) for pattern in (NAME_PATTERN, GENRES_PATTERN, DESCRIPTION_PATTERN)]
+    return [match.group(1) if match else None for match in matches]
+
+
+def backfill_game_details(apps, schema_editor, batch_size=1000):
+    """
+    기존에 적재된 벡터 스토어 문서를 파싱하여 GameDetail 채우기
+    (현재 모델/유틸 코드가 바뀌어도 동작하도록 과거 모델과 schema_editor의 연결만 사용)
+    """
+    GameDetail = apps.get_model("pickmate", "GameDetail")
+    database = schema_editor.connection.alias
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('langchain_pg_embedding')")
+        if cursor.fetchone()[0] is None:
+            return
+
+        cursor.execute("SELECT cmetadata->>'appid', document FROM langchain_pg_embedding")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            game_details = {}
+            for appid, document in rows:
+                if not (appid and appid.isdigit() and document):
+                    continue
+                name, genres, description = extract_game_details(document)
+                game_details[int(appid)] = GameDetail(appid=int(appid), name=name, genres=genres, description=description)
+            GameDetail.objects.using(database).bulk_create(
+                game_details.values(),
+                update_conflicts=True,
+                unique_fields=["appid"],
+                update_fields=["name", "genres", "description"],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pickmate', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameDetail',
+            fields=[
+                ('appid', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(blank=True, max_length=255, null=True)),
+                ('genres', models.TextField(blank=True, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_game_details, migrations.RunPython.noop),
+    ]
@@ -1,36 +1,99 @@
 import pickle
-from surprise import Dataset, Reader, SVD
+from collections import defaultdict
+from surprise import SVD, Trainset, Prediction
 import pandas as pd
-from .utils import get_user_game_data, get_combined_similar_games
+import numpy as np
+from .als import ImplicitALS, build_interaction_matrix
+from .utils import (get_user_game_data, get_combined_similar_games, get_game_details,
+                    stream_user_game_ratings)
 import os
+import tempfile
+import threading
+import time
 from django.conf import settings
 
+MODEL_PATH = os.path.join(settings.BASE_DIR, 'pickmate', 'models', 'collab_model.pkl')
+
+
+def save_collaborative_filtering_model(model, model_path=MODEL_PATH):
+    """
+    학습된 모델을 임시 파일에 기록한 뒤 os.replace로 교체
+    요청을 처리 중인 워커가 기록 중인 파일을 읽지 않도록 원자적으로 게시
+    """
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(model_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # mkstemp는 0600으로 만들므로 다른 사용자로 실행되는 워커도 읽을 수 있게 기존 모델 파일 권한으로 맞춤
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, model_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def build_trainset(rating_arrays, rating_scale=(0, 1)):
+    """
+    stream_user_game_ratings의 압축 배열로 surprise Trainset을 직접 구성
+    Dataset.load_from_df를 거치지 않으므로 DataFrame과 raw_ratings 리스트를 만들지 않음
+    """
+    ur = defaultdict(list)
+    ir = defaultdict(list)
+    for u, i, r in zip(rating_arrays.user_codes.tolist(),
+                       rating_arrays.app_codes.tolist(),
+                       rating_arrays.ratings.tolist()):
+        ur[u].append((i, r))
+        ir[i].append((u, r))
+
+    raw2inner_id_users = {raw_id: code for code, raw_id in enumerate(rating_arrays.user_ids)}
+    raw2inner_id_items = {raw_id: code for code, raw_id in enumerate(rating_arrays.app_ids)}
+
+    return Trainset(
+        ur, ir,
+        len(rating_arrays.user_ids), len(rating_arrays.app_ids), len(rating_arrays.ratings),
+        rating_scale, raw2inner_id_users, raw2inner_id_items,
+    )
+
+
+def fit_collaborative_model(rating_arrays, engine=None):
+    """
+    COLLAB_FILTERING_ENGINE 설정에 따라 협업 필터링 모델을 학습
+    - surprise: 정규화된 플레이 시간을 명시적 평점으로 보는 surprise SVD (단일 스레드)
+    - als: 희소 행렬 기반 implicit ALS, 요청 경로에서 바로 쓰는 SVDFactors로 반환
+    """
+    engine = engine or getattr(settings, "COLLAB_FILTERING_ENGINE", "surprise")
+
+    if engine == "surprise":
+        model = SVD(**getattr(settings, "COLLAB_SVD_OPTIONS", {}))
+        model.fit(build_trainset(rating_arrays))  # similarity는 0~1 사이 값
+        return model
+
+    if engine == "als":
+        options = getattr(settings, "COLLAB_ALS_OPTIONS", {})
+        als = ImplicitALS(**options).fit(build_interaction_matrix(rating_arrays))
+        return SVDFactors.from_als(als, rating_arrays)
+
+    raise ValueError(f"지원하지 않는 협업 필터링 엔진입니다: {engine}")
+
+
 def train_collaborative_filtering():
     """
     협업 필터링 모델을 실제 사용자 데이터를 기반으로 학습하고 저장
     """
     try:
-        # 사용자 실제 데이터 사용
-        user_game_data = get_user_game_data()  # 모든 사용자 데이터 가져오기
+        # 사용자 실제 데이터를 청크 단위로 읽어 압축 배열로 구성
+        rating_arrays = stream_user_game_ratings()
         
-        if user_game_data.empty:
+        if not len(rating_arrays.ratings):
             raise ValueError("학습할 데이터가 없습니다.")
 
-        reader = Reader(rating_scale=(0, 1))  # similarity는 0~1 사이 값
-        data = Dataset.load_from_df(user_game_data[["user_id", "appid", "similarity"]], reader)
-        trainset = data.build_full_trainset()
-
-        # SVD 모델 학습
-        model = SVD()
-        model.fit(trainset)
-
-        # 모델 저장 경로 설정
-        model_path = os.path.join(settings.BASE_DIR, 'pickmate', 'models', 'collab_model.pkl')
-        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        # 설정된 엔진(surprise SVD 또는 implicit ALS)으로 모델 학습
+        model = fit_collaborative_model(rating_arrays)
 
         # 모델 저장
-        with open(model_path, "wb") as f:
-            pickle.dump(model, f)
+        save_collaborative_filtering_model(model)
 
         print("✅ 협업 필터링 모델이 성공적으로 학습되고 저장되었습니다.")
         return model
@@ -39,18 +102,198 @@ def train_collaborative_filtering():
         raise
 
 
+class SVDFactors:
+    """
+    학습된 SVD 모델의 잠재 요인(pu, qi), 편향(bu, bi), 전역 평균과 raw id -> inner id 매핑을
+    NumPy 배열로 내보낸 점수 계산기
+    surprise의 model.predict와 같은 규칙으로 후보 게임 전체를 한 번의 행렬-벡터 곱으로 계산
+    """
+    def __init__(self, pu, qi, bu, bi, global_mean, user_ids, item_ids, rating_scale=(0, 1)):
+        self.pu = np.ascontiguousarray(pu, dtype=np.float32)
+        self.qi = np.ascontiguousarray(qi, dtype=np.float32)
+        self.bu = np.ascontiguousarray(bu, dtype=np.float32)
+        self.bi = np.ascontiguousarray(bi, dtype=np.float32)
+        self.global_mean = float(global_mean)
+        self.rating_scale = rating_scale
+
+        # 사용자는 요청당 한 명이므로 dict, 게임은 searchsorted로 한 번에 찾도록 정렬된 배열로 보관
+        self.user_index = {int(raw_id): inner_id for inner_id, raw_id in enumerate(user_ids)}
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        order = np.argsort(item_ids, kind="stable")
+        self.item_ids = item_ids[order]
+        self.item_inner_ids = order
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        surprise SVD 모델에서 요인과 id 매핑을 추출
+        ALS 엔진이 저장한 모델은 이미 SVDFactors이므로 그대로 사용
+        """
+        if isinstance(model, cls):
+            return model
+
+        trainset = model.trainset
+        user_ids = [trainset.to_raw_uid(inner_id) for inner_id in range(trainset.n_users)]
+        item_ids = [trainset.to_raw_iid(inner_id) for inner_id in range(trainset.n_items)]
+
+        # biased=False로 학습된 경우 편향은 0으로 두면 predict와 같은 결과
+        if getattr(model, "biased", True):
+            bu, bi = model.bu, model.bi
+        else:
+            bu, bi = np.zeros(trainset.n_users), np.zeros(trainset.n_items)
+
+        return cls(
+            model.pu, model.qi, bu, bi, trainset.global_mean,
+            user_ids, item_ids, rating_scale=trainset.rating_scale,
+        )
+
+    @classmethod
+    def from_als(cls, als, rating_arrays):
+        """
+        ImplicitALS의 사용자/게임 요인으로 구성 (편향과 전역 평균 없이 내적만 사용)
+        """
+        return cls(
+            als.user_factors, als.item_factors,
+            np.zeros(len(rating_arrays.user_ids)), np.zeros(len(rating_arrays.app_ids)), 0.0,
+            rating_arrays.user_ids, rating_arrays.app_ids,
+        )
+
+    def item_indices(self, appids):
+        """
+        appid 목록을 inner id 배열로 변환 (학습에 없던 게임이나 "None"처럼 정수가 아닌 appid는 -1)
+        """
+        numeric = pd.to_numeric(pd.Series(appids, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+        valid = np.isfinite(numeric) & (numeric == np.floor(numeric))
+        appids = np.where(valid, numeric, -1).astype(np.int64)
+        if not len(self.item_ids):
+            return np.full(len(appids), -1, dtype=np.int64)
+        positions = np.searchsorted(self.item_ids, appids)
+        positions = np.minimum(positions, len(self.item_ids) - 1)
+        found = valid & (self.item_ids[positions] == appids)
+        return np.where(found, self.item_inner_ids[positions], -1)
+
+    def score(self, user_id, appids):
+        """
+        한 사용자에 대해 후보 게임 전체의 협업 필터링 점수를 계산
+        """
+        item_idx = self.item_indices(appids)
+        known_item = item_idx >= 0
+        safe_idx = np.where(known_item, item_idx, 0)
+
+        scores = np.full(len(item_idx), self.global_mean, dtype=np.float32)
+        if len(self.bi):
+            scores += np.where(known_item, self.bi[safe_idx], 0)
+
+        user_idx = self.user_index.get(int(user_id))
+        if user_idx is not None:
+            scores += self.bu[user_idx]
+            if len(self.qi):
+                scores += np.where(known_item, self.qi[safe_idx] @ self.pu[user_idx], 0)
+
+        return np.clip(scores, *self.rating_scale)
+
+    def predict(self, uid, iid, r_ui=None):
+        """
+        surprise 모델의 predict와 같은 형태(Prediction)로 게임 하나의 점수를 반환
+        ALS 엔진이 저장한 모델도 predict_collaborative_score에서 그대로 쓸 수 있음
+        """
+        est = float(self.score(uid, [iid])[0])
+        return Prediction(uid, iid, r_ui, est, {"was_impossible": False})
+
+
+class CollaborativeModelRegistry:
+    """
+    워커 프로세스마다 협업 필터링 모델을 한 번만 로드하여 보관하는 레지스트리
+    모델 파일의 mtime/크기를 버전으로 사용하고, 새 모델이 게시되면 다시 로드하여 교체
+    교체 중에도 진행 중인 요청은 기존 모델을 그대로 사용
+    """
+    def __init__(self, model_path=MODEL_PATH, check_interval=None):
+        self.model_path = model_path
+        self.check_interval = (
+            check_interval if check_interval is not None
+            else getattr(settings, "COLLAB_MODEL_CHECK_INTERVAL", 5)
+        )
+        self._entry = None  # (version, model, factors) 튜플을 통째로 교체
+        self._last_checked = 0.0
+        self._lock = threading.Lock()
+
+    def _version(self):
+        stat = os.stat(self.model_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _current_entry(self):
+        entry = self._entry
+        now = time.monotonic()
+
+        # 최근에 확인했다면 파일 상태를 다시 보지 않고 바로 반환
+        if entry is not None and now - self._last_checked < self.check_interval:
+            return entry
+
+        try:
+            version = self._version()
+        except FileNotFoundError:
+            if entry is not None:
+                return entry
+            raise FileNotFoundError("협업 필터링 모델 파일이 없습니다. 먼저 모델을 학습해주세요.")
+        self._last_checked = now
+
+        if entry is not None and entry[0] == version:
+            return entry
+
+        # 이미 로드된 모델이 있으면 다른 스레드가 교체하는 동안 기다리지 않고 기존 모델 사용
+        if not self._lock.acquire(blocking=entry is None):
+            return entry
+        try:
+            entry = self._entry
+            if entry is None or entry[0] != version:
+                with open(self.model_path, "rb") as f:
+                    model = pickle.load(f)
+                # 요청마다 변환하지 않도록 로드 시점에 NumPy 요인으로 내보내기
+                entry = (version, model, SVDFactors.from_model(model))
+                self._entry = entry
+            return entry
+        finally:
+            self._lock.release()
+
+    def get(self):
+        return self._current_entry()[1]
+
+    def get_factors(self):
+        return self._current_entry()[2]
+
+    def expire(self):
+        """
+        다음 조회 때 확인 주기와 관계없이 모델 파일 버전을 다시 확인하도록 표시
+        """
+        self._last_checked = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._entry = None
+            self._last_checked = 0.0
+
+
+model_registry = CollaborativeModelRegistry()
+
+
 def load_collaborative_filtering_model():
     """
     저장된 협업 필터링 모델을 로드
+    프로세스 단위 레지스트리에 캐시된 모델을 반환하고, 파일이 갱신되면 다시 로드
     """
     try:
-        model_path = os.path.join(settings.BASE_DIR, 'pickmate', 'models', 'collab_model.pkl')
-        if not os.path.exists(model_path):
-            raise FileNotFoundError("협업 필터링 모델 파일이 없습니다. 먼저 모델을 학습해주세요.")
-            
-        with open(model_path, "rb") as f:
-            model = pickle.load(f)
-        return model
+        return model_registry.get()
+    except Exception as e:
+        print(f"❌ 협업 필터링 모델 로드 중 오류 발생: {str(e)}")
+        raise
+
+
+def load_collaborative_factors():
+    """
+    현재 협업 필터링 모델의 NumPy 요인(SVDFactors)을 반환
+    """
+    try:
+        return model_registry.get_factors()
     except Exception as e:
         print(f"❌ 협업 필터링 모델 로드 중 오류 발생: {str(e)}")
         raise
@@ -69,6 +312,7 @@ def predict_collaborative_score(user_id, game_id, model):
 def hybrid_score(content_score, collaborative_score, alpha=0.7):
     """
     콘텐츠 기반 추천 점수 (pgvector)와 협업 필터링 점수를 결합
+    스칼라와 NumPy 배열 모두 처리하므로 후보 전체를 한 번에 결합할 수 있음
     """
     content_score = content_score if content_score is not None else 0
     collaborative_score = collaborative_score if collaborative_score is not None else 0
@@ -89,27 +333,51 @@ def get_hybrid_recommendations(user_id, top_n=10):
     # pgvector 추천 결과 가져오기
     similar_games = get_combined_similar_games(user_id, top_n)
 
-    # 협업 필터링 모델 로드
-    collaborative_model = load_collaborative_filtering_model()  
+    # 사용자가 이미 가지고 있는 게임은 추천 목록에서 제외
+    candidates = [game for game in similar_games if str(game["appid"]) not in owned_game_ids]
+    excluded_count = len(similar_games) - len(candidates)
+    if excluded_count:
+        print(f"Excluding {excluded_count} games as user already owns them.")  # 제외되는 게임 로그 추가
+
+    if not candidates:
+        return []
 
-    hybrid_recommendations = []
-    for game in similar_games:
-        appid = str(game["appid"])  # appid를 문자열로 변환
+    # 협업 필터링 모델 요인 로드
+    collaborative_factors = load_collaborative_factors()
 
-        # 사용자가 이미 가지고 있는 게임은 추천 목록에서 제외
-        if appid in owned_game_ids:
-            print(f"Excluding game {appid} as user already owns it.")  # 제외되는 게임 로그 추가
-            continue
+    appids = [str(game["appid"]) for game in candidates]  # appid를 문자열로 변환
+    content_scores = np.array(
+        [game["similarity"] if game["similarity"] is not None else 0 for game in candidates],
+        dtype=np.float32,
+    )
+    collaborative_scores = collaborative_factors.score(user_id, appids)
+    final_scores = hybrid_score(content_scores, collaborative_scores)
 
-        content_score = game["similarity"]
-        collaborative_score = predict_collaborative_score(user_id, appid, collaborative_model)
-        final_score = hybrid_score(content_score, collaborative_score)
+    # 추천 목록 정렬 후 상위 20개 반환 (동점일 때 기존 sorted와 같은 순서를 유지하도록 stable 정렬)
+    top_indices = np.argsort(-final_scores, kind="stable")[:20]
+    return [{"appid": appids[i], "final_score": float(final_scores[i])} for i in top_indices]
 
-        hybrid_recommendations.append({
+
+def get_enriched_recommendations(user_id, top_n=10):
+    """
+    하이브리드 추천 목록에 게임 이름, 장르, 설명을 붙여 API 응답 형태로 반환
+    """
+    hybrid_recommendations = get_hybrid_recommendations(user_id, top_n=top_n)
+    appid_list = [str(game["appid"]) for game in hybrid_recommendations]  # appid 리스트 추출
+
+    # 게임 상세 정보 가져오기
+    game_details = get_game_details(appid_list)
+
+    enriched_recommendations = []
+    for game in hybrid_recommendations:
+        appid = str(game["appid"])
+        details = game_details.get(appid, {})
+        enriched_recommendations.append({
             "appid": appid,
-            "final_score": final_score
+            "name": details.get("name"),
+            "genres": details.get("genres"),
+            "description": details.get("description"),
+            "final_score": game["final_score"]
         })
 
-    # 추천 목록 정렬 후 상위 20개 반환
-    return sorted(hybrid_recommendations, key=lambda x: x["final_score"], reverse=True)[:20]
-
+    return enriched_recommendations
@@ -1,3 +1,26 @@
 from django.db import models
 
 # Create your models here.
+class GameDetail(models.Model):
+    """
+    벡터 스토어 문서(document)에서 적재 시점에 한 번 파싱해 둔 게임 정보
+    langchain_pg_embedding의 정수형 appid 컬럼과 같은 키를 사용
+    """
+    appid = models.IntegerField(primary_key=True)
+    name = models.CharField(max_length=255, blank=True, null=True)
+    genres = models.TextField(blank=True, null=True)
+    description = models.TextField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.appid} - {self.name}"
+
+class UserRecommendation(models.Model):
+    """
+    사용자별로 미리 계산해 둔 하이브리드 추천 결과
+    """
+    user = models.OneToOneField("account.User", on_delete=models.CASCADE, related_name="recommendation")
+    recommendations = models.JSONField(default=list)
+    generated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.generated_at}"
@@ -1,10 +1,15 @@
 import pickle
-from surprise import Dataset, Reader, SVD
 import pandas as pd
-from .utils import get_user_game_data
+from .utils import stream_user_game_ratings
+from .ml_utils import save_collaborative_filtering_model, fit_collaborative_model, get_enriched_recommendations, model_registry
+from .models import UserRecommendation
 import os
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
 
 @ shared_task
 def train_collaborative_filtering():
@@ -12,29 +17,69 @@ def train_collaborative_filtering():
     협업 필터링 모델을 실제 사용자 데이터를 기반으로 학습하고 저장
     """
     try:
-        # 사용자 실제 데이터 사용
-        user_game_data = get_user_game_data()  # 모든 사용자 데이터 가져오기
+        # 사용자 실제 데이터를 청크 단위로 읽어 압축 배열로 구성
+        rating_arrays = stream_user_game_ratings()
         
-        if user_game_data.empty:
+        if not len(rating_arrays.ratings):
             raise ValueError("학습할 데이터가 없습니다.")
 
-        reader = Reader(rating_scale=(0, 1))  # similarity는 0~1 사이 값
-        data = Dataset.load_from_df(user_game_data[["user_id", "appid", "similarity"]], reader)
-        trainset = data.build_full_trainset()
-
-        # SVD 모델 학습
-        model = SVD()
-        model.fit(trainset)
-
-        # 모델 저장 경로 설정
-        model_path = os.path.join(settings.BASE_DIR, 'pickmate', 'models', 'collab_model.pkl')
-        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        # 설정된 엔진(surprise SVD 또는 implicit ALS)으로 모델 학습
+        model = fit_collaborative_model(rating_arrays)
 
-        # 모델 저장
-        with open(model_path, "wb") as f:
-            pickle.dump(model, f)
+        # 모델 저장 (임시 파일 기록 후 교체하여 워커의 레지스트리가 새 모델을 로드)
+        save_collaborative_filtering_model(model)
 
         print("✅ 협업 필터링 모델이 성공적으로 학습되고 저장되었습니다.")
     except Exception as e:
         print(f"❌ 협업 필터링 모델 학습 중 오류 발생: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+    # 새 모델로 모든 사용자의 추천 결과를 다시 계산
+    refresh_all_user_recommendations.delay()
+
+
+def save_user_recommendations(user_id, recommendations):
+    """
+    계산된 추천 결과를 UserRecommendation 테이블에 저장
+    """
+    materialized, _ = UserRecommendation.objects.update_or_create(
+        user_id=user_id,
+        defaults={"recommendations": recommendations}
+    )
+    return materialized
+
+
+@shared_task
+def refresh_user_recommendations(user_id):
+    """
+    한 사용자의 하이브리드 추천 결과를 다시 계산하여 저장
+    라이브러리 동기화, 선호 게임 수정, 모델 재학습 후 호출
+    """
+    # 방금 게시된 모델을 바로 사용하도록 모델 파일 버전을 다시 확인
+    model_registry.expire()
+    try:
+        recommendations = get_enriched_recommendations(user_id, top_n=10)
+    except Exception as e:
+        logger.error(f"추천 결과 갱신 실패 (user_id: {user_id}): {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+    save_user_recommendations(user_id, recommendations)
+    return {"status": "success", "count": len(recommendations)}
+
+
+@shared_task
+def refresh_all_user_recommendations():
+    """
+    라이브러리 게임이 있거나 이미 추천 결과가 저장된 모든 사용자의 추천 결과를 갱신
+    """
+    User = get_user_model()
+    user_ids = (
+        User.objects.filter(library_games__isnull=False).values_list("id", flat=True)
+        .union(UserRecommendation.objects.values_list("user_id", flat=True))
+    )
+
+    count = 0
+    for user_id in user_ids:
+        refresh_user_recommendations.delay(user_id)
+        count += 1
+    return f"{count}명의 추천 결과 갱신 요청"
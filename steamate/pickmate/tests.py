@@ -1,3 +1,125 @@
-from django.test import TestCase
+from unittest import mock
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+from surprise import SVD
+from . import ml_utils
+from .als import ImplicitALS, build_interaction_matrix
+from .ml_utils import SVDFactors, build_trainset, fit_collaborative_model, get_hybrid_recommendations, hybrid_score
+from .utils import RatingArrays
 
-# Create your tests here.
+
+def make_rating_arrays():
+    """
+    사용자 3명 x 게임 4개의 작은 학습 데이터 (user_ids[code], app_ids[code]가 원래 id)
+    """
+    return RatingArrays(
+        user_codes=np.array([0, 0, 0, 1, 1, 2, 2], dtype=np.int32),
+        app_codes=np.array([0, 1, 2, 1, 3, 0, 3], dtype=np.int32),
+        ratings=np.array([1.0, 0.4, 0.1, 0.9, 0.3, 0.2, 0.8], dtype=np.float32),
+        user_ids=[1, 2, 3],
+        app_ids=[570, 730, 440, 10],
+    )
+
+
+class SVDFactorsTests(SimpleTestCase):
+    """
+    NumPy로 내보낸 SVD 요인의 점수가 surprise SVD.predict와 같은지 확인
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model = SVD(n_factors=4, n_epochs=30, random_state=0)
+        cls.model.fit(build_trainset(make_rating_arrays()))
+        cls.factors = SVDFactors.from_model(cls.model)
+
+    def test_score_matches_surprise_predict(self):
+        appids = [570, 730, 440, 10, 999]
+        for user_id in (1, 2, 3, 42):
+            expected = [self.model.predict(user_id, appid).est for appid in appids]
+            np.testing.assert_allclose(self.factors.score(user_id, appids), expected, rtol=1e-5, atol=1e-5)
+
+    def test_predict_matches_surprise_predict(self):
+        for user_id, appid in ((1, 730), (2, 570), (42, 10), (3, 999)):
+            self.assertAlmostEqual(
+                self.factors.predict(user_id, appid).est, self.model.predict(user_id, appid).est, places=5
+            )
+            self.assertAlmostEqual(
+                ml_utils.predict_collaborative_score(user_id, appid, self.factors),
+                self.model.predict(user_id, appid).est, places=5,
+            )
+
+    def test_item_indices_maps_unknown_and_non_numeric_appids_to_minus_one(self):
+        indices = self.factors.item_indices(["570", "570.0", 730, "999", "None", None, "abc", "570.5"])
+        self.assertEqual(indices[:3].tolist(), [self.model.trainset.to_inner_iid(570)] * 2 + [self.model.trainset.to_inner_iid(730)])
+        self.assertEqual(indices[3:].tolist(), [-1] * 5)
+
+    def test_unknown_appids_score_global_mean(self):
+        scores = self.factors.score(42, ["None", "999"])
+        np.testing.assert_allclose(scores, [self.model.trainset.global_mean] * 2, rtol=1e-5)
+
+
+class ImplicitALSTests(SimpleTestCase):
+    """
+    작은 사용자 x 게임 행렬로 implicit ALS 학습과 SVDFactors 변환 확인
+    """
+    def test_fit_produces_user_and_item_factors(self):
+        matrix = build_interaction_matrix(make_rating_arrays())
+        self.assertEqual(matrix.shape, (3, 4))
+
+        als = ImplicitALS(factors=4, iterations=5, n_threads=2, block_nnz=2).fit(matrix)
+        self.assertEqual(als.user_factors.shape, (3, 4))
+        self.assertEqual(als.item_factors.shape, (4, 4))
+        self.assertTrue(np.isfinite(als.user_factors).all() and np.isfinite(als.item_factors).all())
+
+        # 플레이한 게임의 선호도가 플레이하지 않은 게임보다 높게 복원됨
+        preferences = als.user_factors @ als.item_factors.T
+        self.assertGreater(preferences[0, 0], preferences[0, 3])
+
+    @override_settings(COLLAB_ALS_OPTIONS={"factors": 4, "iterations": 5, "n_threads": 1})
+    def test_fit_collaborative_model_als_scores_known_games(self):
+        model = fit_collaborative_model(make_rating_arrays(), engine="als")
+        self.assertIsInstance(model, SVDFactors)
+        self.assertEqual(model.pu.shape, (3, 4))
+        self.assertEqual(model.qi.shape, (4, 4))
+
+        self.assertGreater(ml_utils.predict_collaborative_score(1, 570, model), 0)
+        self.assertGreater(ml_utils.predict_collaborative_score(2, "730", model), 0)
+        self.assertEqual(ml_utils.predict_collaborative_score(42, 570, model), 0)
+
+
+class HybridRecommendationTests(SimpleTestCase):
+    """
+    후보 게임의 하이브리드 점수 정렬과 이미 가진 게임 제외 확인
+    """
+    def setUp(self):
+        factors = SVDFactors(
+            pu=[[1.0]], qi=[[0.9], [0.1], [0.5]], bu=[0.0], bi=[0.0, 0.0, 0.0], global_mean=0.0,
+            user_ids=[1], item_ids=[570, 730, 440],
+        )
+        similar_games = [
+            {"appid": 570, "similarity": 0.5},
+            {"appid": 730, "similarity": 0.9},
+            {"appid": 440, "similarity": 0.5},
+            {"appid": 10, "similarity": None},
+            {"appid": 20, "similarity": 0.7},
+        ]
+        for patcher in (
+            mock.patch.object(ml_utils, "get_user_game_data",
+                              return_value=pd.DataFrame({"user_id": [1], "appid": [20], "playtime": [30]})),
+            mock.patch.object(ml_utils, "get_combined_similar_games", return_value=similar_games),
+            mock.patch.object(ml_utils, "load_collaborative_factors", return_value=factors),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_orders_by_hybrid_score_and_excludes_owned_games(self):
+        recommendations = get_hybrid_recommendations(1)
+
+        self.assertEqual([game["appid"] for game in recommendations], ["730", "570", "440", "10"])
+        self.assertAlmostEqual(recommendations[0]["final_score"], hybrid_score(0.9, 0.1), places=5)
+        self.assertAlmostEqual(recommendations[-1]["final_score"], 0.0, places=5)
+
+    def test_returns_empty_list_when_every_candidate_is_owned(self):
+        ml_utils.get_combined_similar_games.return_value = [{"appid": 20, "similarity": 0.7}]
+        self.assertEqual(get_hybrid_recommendations(1), [])
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import HybridRecommendationAPIView
+from .views import HybridRecommendationAPIView, GameDetailCacheStatsAPIView
 
 urlpatterns = [
     path('recommend/', HybridRecommendationAPIView.as_view(), name='recommend'),
+    path('cache-stats/', GameDetailCacheStatsAPIView.as_view(), name='cache-stats'),
 ]
@@ -1,4 +1,8 @@
 from django.db import connection
+from django.conf import settings
+from collections import namedtuple
+import numpy as np
+from .cache import GameDetailCache
 import pandas as pd
 import random
 import re
@@ -34,11 +38,86 @@ def get_top_played_games(user_id, limit=10):
     # 게임이 있으면 해당 게임들 반환, 게임이 없으면 랜덤 추천
     return [row[0] for row in rows]
 
+def merge_similarity_scores(rows, combined_recommendations=None):
+    """
+    (appid, similarity) 행 목록을 appid 기준으로 누적하여 결합
+    """
+    if combined_recommendations is None:
+        combined_recommendations = {}
+
+    for row in rows:
+        appid = row[0]
+        similarity = row[1] if row[1] is not None else 0  # None 값을 0으로 대체
+
+        if appid in combined_recommendations:
+            combined_recommendations[appid] += similarity  # 유사도 점수 누적
+        else:
+            combined_recommendations[appid] = similarity
+
+    return combined_recommendations
+
+def sort_similarity_scores(combined_recommendations):
+    """
+    결합된 유사도 점수를 정렬하여 추천 목록 형태로 반환
+    """
+    sorted_recommendations = sorted(combined_recommendations.items(), key=lambda x: x[1], reverse=True)
+
+    return [{"appid": appid, "similarity": similarity} for appid, similarity in sorted_recommendations]
+
+def fetch_batched_neighbors(game_ids, limit_per_game=10):
+    """
+    여러 기준 게임의 임베딩을 한 번에 조회하고, LATERAL JOIN으로 게임별 KNN 검색을 단일 쿼리로 실행
+    (seed_appid, appid, similarity) 행 목록을 반환
+    """
+    if not game_ids:
+        return []
+
+    query = """
+    WITH seeds AS (
+        SELECT DISTINCT ON (appid) appid AS seed_appid, embedding
+        FROM langchain_pg_embedding
+        WHERE appid = ANY(%s)
+    )
+    SELECT seeds.seed_appid, neighbors.appid, neighbors.similarity
+    FROM seeds
+    CROSS JOIN LATERAL (
+        SELECT e.appid, e.embedding <=> seeds.embedding AS similarity
+        FROM langchain_pg_embedding AS e
+        ORDER BY similarity
+        LIMIT %s
+    ) AS neighbors;
+    """
+
+    with connection.cursor() as cursor:
+        # 정수형 appid 생성 컬럼과 비교하므로 JSONB 추출 없이 인덱스로 조회
+        cursor.execute(query, [[int(game_id) for game_id in game_ids], limit_per_game])
+        return cursor.fetchall()
+
 def get_combined_similar_games(user_id, top_n=10, limit_per_game=10):
     """
     사용자가 가장 많이 플레이한 TOP 10 게임을 기준으로 `pgvector`에서 유사한 게임을 검색하고 결합
+    모든 기준 게임의 KNN 검색을 단일 쿼리로 처리
     """
     top_games = get_top_played_games(user_id, top_n)  # 사용자가 가장 많이 플레이한 10개 게임 조회
+    rows = fetch_batched_neighbors(top_games, limit_per_game)
+
+    # 기준 게임 순서대로 결합하여 기존 결과와 동일한 순서를 유지
+    rows_by_seed = {}
+    for seed_appid, appid, similarity in rows:
+        rows_by_seed.setdefault(seed_appid, []).append((appid, similarity))
+
+    combined_recommendations = {}
+    for game_id in top_games:
+        merge_similarity_scores(rows_by_seed.get(int(game_id), []), combined_recommendations)
+
+    # 유사도가 높은 순으로 정렬 후 반환
+    return sort_similarity_scores(combined_recommendations)
+
+def get_combined_similar_games_per_seed(user_id, top_n=10, limit_per_game=10):
+    """
+    기준 게임마다 개별 KNN 쿼리를 실행하는 기존 방식 (벤치마크 비교용)
+    """
+    top_games = get_top_played_games(user_id, top_n)
     combined_recommendations = {}
 
     for game_id in top_games:
@@ -50,24 +129,14 @@ def get_combined_similar_games(user_id, top_n=10, limit_per_game=10):
         ORDER BY similarity
         LIMIT %s;
         """
-        
+
         with connection.cursor() as cursor:
             cursor.execute(query, [str(game_id), limit_per_game])  # JSONB 값 비교를 위해 문자열 변환
             results = cursor.fetchall()
 
-        for row in results:
-            appid = row[0]
-            similarity = row[1] if row[1] is not None else 0  # None 값을 0으로 대체
-            
-            if appid in combined_recommendations:
-                combined_recommendations[appid] += similarity  # 유사도 점수 누적
-            else:
-                combined_recommendations[appid] = similarity
+        merge_similarity_scores(results, combined_recommendations)
 
-    # 유사도가 높은 순으로 정렬 후 반환
-    sorted_recommendations = sorted(combined_recommendations.items(), key=lambda x: x[1], reverse=True)
-    
-    return [{"appid": appid, "similarity": similarity} for appid, similarity in sorted_recommendations]
+    return sort_similarity_scores(combined_recommendations)
 
 
 
@@ -97,6 +166,100 @@ def get_user_game_data(user_id=None):
 
     return data
 
+# 학습 데이터를 담는 압축 배열 (codes는 0부터 시작하는 연속 정수, ids[code]가 원래 id)
+RatingArrays = namedtuple("RatingArrays", ["user_codes", "app_codes", "ratings", "user_ids", "app_ids"])
+
+
+class IdEncoder:
+    """
+    원래 id(user_id, appid)를 0부터 시작하는 int32 코드로 변환
+    청크마다 고유값만 dict로 조회하므로 행 수가 아닌 고유 id 수에 비례하여 동작
+    """
+    def __init__(self):
+        self.index = {}
+        self.raw_ids = []
+
+    def encode(self, raw):
+        uniques, inverse = np.unique(raw, return_inverse=True)
+        codes = np.empty(len(uniques), dtype=np.int32)
+        for position, raw_id in enumerate(uniques.tolist()):
+            code = self.index.get(raw_id)
+            if code is None:
+                code = len(self.raw_ids)
+                self.index[raw_id] = code
+                self.raw_ids.append(raw_id)
+            codes[position] = code
+        return codes[inverse]
+
+
+# 평점 정규화 방식별 SQL 식 (PostgreSQL 윈도 함수로 사용자 단위 정규화)
+RATING_NORMALIZATION_SQL = {
+    # 사용자별 로그 스케일: ln(1 + playtime) / 사용자의 최대 ln(1 + playtime)
+    "log": """
+        COALESCE(
+            ln(1 + playtime::float8)
+            / NULLIF(MAX(ln(1 + playtime::float8)) OVER (PARTITION BY user_id), 0),
+            0
+        )
+    """,
+    # 사용자별 백분위: 해당 사용자의 라이브러리 안에서 플레이 시간 누적 분포 (0, 1]
+    # 동점은 모두 같은 값을 받으므로 플레이하지 않은 게임(0분)은 log 방식과 같이 0으로 둠
+    "percentile": """
+        CASE WHEN playtime > 0
+            THEN CUME_DIST() OVER (PARTITION BY user_id ORDER BY playtime)
+            ELSE 0
+        END
+    """,
+    # 기존 방식: 전체 데이터의 최대 플레이 시간으로 나눔
+    "global": "COALESCE(playtime::float8 / NULLIF(MAX(playtime) OVER (), 0), 0)",
+}
+
+
+def stream_user_game_ratings(chunk_size=100_000, table="account_userlibrarygame", normalization=None):
+    """
+    전체 사용자 플레이 데이터를 서버 사이드 커서로 chunk_size 행씩 읽어
+    int32 사용자/게임 코드와 float32 평점 배열로 반환
+    전체 행을 파이썬 튜플 리스트나 DataFrame으로 만들지 않아 학습 워커의 메모리 사용량을 줄임
+    플레이 시간 정규화는 PostgreSQL 안에서 계산하고 최종 평점만 전송
+    """
+    normalization = normalization or getattr(settings, "COLLAB_RATING_NORMALIZATION", "log")
+    if normalization not in RATING_NORMALIZATION_SQL:
+        raise ValueError(f"지원하지 않는 평점 정규화 방식입니다: {normalization}")
+
+    query = f"""
+        SELECT user_id, game_id, ({RATING_NORMALIZATION_SQL[normalization]})::real AS rating
+        FROM {connection.ops.quote_name(table)}
+    """
+
+    user_encoder = IdEncoder()
+    app_encoder = IdEncoder()
+    user_chunks, app_chunks, rating_chunks = [], [], []
+
+    # chunked_cursor는 PostgreSQL에서 이름 있는(server-side) 커서를 사용
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            # id는 2^53 미만이므로 float64로 한 번에 변환해도 손실 없음
+            chunk = np.array(rows, dtype=np.float64)
+            user_chunks.append(user_encoder.encode(chunk[:, 0].astype(np.int64)))
+            app_chunks.append(app_encoder.encode(chunk[:, 1].astype(np.int64)))
+            rating_chunks.append(chunk[:, 2].astype(np.float32))
+            del rows, chunk
+
+    if not rating_chunks:
+        empty_codes = np.empty(0, dtype=np.int32)
+        return RatingArrays(empty_codes, empty_codes, np.empty(0, dtype=np.float32), [], [])
+
+    user_codes = np.concatenate(user_chunks)
+    app_codes = np.concatenate(app_chunks)
+    ratings = np.concatenate(rating_chunks)
+    del user_chunks, app_chunks, rating_chunks
+
+    return RatingArrays(user_codes, app_codes, ratings, user_encoder.raw_ids, app_encoder.raw_ids)
+
 def extract_game_details(document):
     """
     document 컬럼에서 게임의 name, genres, description을 추출하는 함수
@@ -111,29 +274,85 @@ def extract_game_details(document):
 
     return name, genres, description
 
-def get_game_details(appid_list):
+def fetch_game_details(appid_list):
     """
-    특정 게임 ID(appid) 리스트에 해당하는 게임의 이름, 장르, 설명을 가져옴.
+    특정 게임 ID(appid) 리스트에 해당하는 게임의 이름, 장르, 설명을 DB에서 가져옴.
+    적재 시점에 파싱해 둔 pickmate_gamedetail 테이블에서 appid로 조회하므로 요청마다 정규식을 실행하지 않음
     """
     if not appid_list:
         return {}
 
-    # '%s' 대신 개별 값으로 IN 절에 바인딩 (PostgreSQL에서 JSONB 비교)
-    placeholders = ', '.join(['%s'] * len(appid_list))  # "%s, %s, %s" 형태로 변환
-    query = f"""
-        SELECT cmetadata->>'appid' AS appid, document
-        FROM langchain_pg_embedding
-        WHERE cmetadata->>'appid' IN ({placeholders});
+    query = """
+        SELECT appid, name, genres, description
+        FROM pickmate_gamedetail
+        WHERE appid = ANY(%s);
     """
 
     with connection.cursor() as cursor:
-        cursor.execute(query, appid_list)  # 리스트를 개별 값으로 바인딩
+        cursor.execute(query, [[int(appid) for appid in appid_list]])
         rows = cursor.fetchall()
 
     game_details = {}
-    for row in rows:
-        appid, document = row
-        name, genres, description = extract_game_details(document)
-        game_details[appid] = {"name": name, "genres": genres, "description": description}
+    for appid, name, genres, description in rows:
+        game_details[str(appid)] = {"name": name, "genres": genres, "description": description}
+
+    return game_details
+
+def fetch_all_game_details(limit):
+    """
+    캐시 워밍업용으로 최대 limit개의 게임 상세 정보를 한 번에 가져옴
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT appid, name, genres, description
+            FROM pickmate_gamedetail
+            ORDER BY appid
+            LIMIT %s;
+        """, [limit])
+        rows = cursor.fetchall()
+
+    return {
+        str(appid): {"name": name, "genres": genres, "description": description}
+        for appid, name, genres, description in rows
+    }
+
+# 게임 상세 정보 캐시 (프로세스 로컬 LRU + 선택적 Redis 계층)
+game_detail_cache = GameDetailCache(
+    fetch_game_details,
+    warm_up_loader=fetch_all_game_details,
+    **getattr(settings, "GAME_DETAIL_CACHE", {}),
+)
+
+def get_game_details(appid_list):
+    """
+    특정 게임 ID(appid) 리스트에 해당하는 게임의 이름, 장르, 설명을 가져옴.
+    게임 정보는 거의 바뀌지 않으므로 캐시에서 먼저 찾고 없는 게임만 DB에서 조회
+    """
+    if not appid_list:
+        return {}
+    return game_detail_cache.get_many(appid_list)
+
+def save_game_details(documents):
+    """
+    벡터 스토어에 적재되는 Document 목록을 한 번만 파싱하여 pickmate_gamedetail에 저장(upsert)
+    """
+    from .models import GameDetail
+
+    game_details = {}
+    for document in documents:
+        appid = document.metadata.get("appid")
+        if appid is None:
+            continue
+        name, genres, description = extract_game_details(document.page_content)
+        game_details[int(appid)] = GameDetail(appid=int(appid), name=name, genres=genres, description=description)
 
-    return game_details
\ No newline at end of file
+    if game_details:
+        GameDetail.objects.bulk_create(
+            game_details.values(),
+            update_conflicts=True,
+            unique_fields=["appid"],
+            update_fields=["name", "genres", "description"],
+        )
+        # 새로 적재된 게임 정보가 바로 보이도록 캐시 무효화
+        game_detail_cache.invalidate(game_details.keys())
+    return len(game_details)
@@ -1,12 +1,11 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
-from .ml_utils import get_hybrid_recommendations
-from .utils import get_game_details
-from django.core.exceptions import ObjectDoesNotExist
-
-from .utils import get_game_details
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from .models import UserRecommendation
+from .tasks import save_user_recommendations
+from .ml_utils import get_enriched_recommendations
+from .utils import game_detail_cache
 
 class HybridRecommendationAPIView(APIView):
     permission_classes = [IsAuthenticated]
@@ -15,38 +14,27 @@ class HybridRecommendationAPIView(APIView):
         try:
             user_id = request.user.id
 
-            # 추천된 게임 목록 가져오기
-            hybrid_recommendations = get_hybrid_recommendations(user_id, top_n=10)
-            appid_list = [str(game["appid"]) for game in hybrid_recommendations]  # appid 리스트 추출
-
-            # 게임 상세 정보 가져오기
-            game_details = get_game_details(appid_list)
-
-            # 최종 응답 데이터 구성
-            enriched_recommendations = []
-            for game in hybrid_recommendations:
-                appid = str(game["appid"])
-                if appid in game_details:
-                    enriched_recommendations.append({
-                        "appid": appid,
-                        "name": game_details[appid]["name"],
-                        "genres": game_details[appid]["genres"],
-                        "description": game_details[appid]["description"],
-                        "final_score": game["final_score"]
-                    })
-                else:
-                    enriched_recommendations.append({
-                        "appid": appid,
-                        "name": None,
-                        "genres": None,
-                        "description": None,
-                        "final_score": game["final_score"]
-                    })
+            # 미리 계산된 추천 결과가 있으면 그대로 반환
+            materialized = UserRecommendation.objects.filter(user_id=user_id).first()
+            if materialized:
+                return Response({
+                    "message": "하이브리드 추천 조회 성공",
+                    "user_id": user_id,
+                    "recommendations": materialized.recommendations,
+                    "generated_at": materialized.generated_at,
+                    "source": "materialized"
+                }, status=status.HTTP_200_OK)
+
+            # 처음 조회하는 사용자는 즉시 계산하고, 다음 조회를 위해 저장
+            enriched_recommendations = get_enriched_recommendations(user_id, top_n=10)
+            materialized = save_user_recommendations(user_id, enriched_recommendations)
 
             return Response({
                 "message": "하이브리드 추천 조회 성공",
                 "user_id": user_id,
-                "recommendations": enriched_recommendations
+                "recommendations": enriched_recommendations,
+                "generated_at": materialized.generated_at,
+                "source": "live"
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -56,3 +44,12 @@ class HybridRecommendationAPIView(APIView):
                 "recommendations": []
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+class GameDetailCacheStatsAPIView(APIView):
+    """
+    현재 워커의 게임 정보 캐시 적중/미스 통계 조회 (관리자 전용)
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(game_detail_cache.stats(), status=status.HTTP_200_OK)